@@ -0,0 +1,236 @@
+# See documentation:
+# docs/14_benchmarks.md
+
+# ------------------------------------------------------------
+# Ingest-path microbenchmarks
+#
+# Times the hot path without Elasticsearch:
+# preprocess -> read NDJSON -> chunk -> bulk body -> parse response
+# and reports docs/s, MB/s and peak memory (tracemalloc) per case.
+#
+# Results can be stored as baseline (benchmarks/baseline.json, the
+# committed one is a reference run, see docs/14_benchmarks.md) and
+# later runs are compared against it (regression = slower than
+# --max-regression in docs/s).
+# ------------------------------------------------------------
+
+import argparse
+import gc
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks import synthetic
+from scripts import codec, load_to_es
+from scripts.preprocess_brightsky import iter_ndjson_lines, iter_processed_docs, processed_columns
+from scripts.preprocess_hs_wetter import normalize
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+TARGET = "all-data"
+PROCESSED_AT = "2026-01-01T00:00:00+00:00"
+
+# run() returns (documents, bytes) processed in one pass
+Case = Tuple[str, Callable[[], Tuple[int, int]]]
+
+
+@dataclass
+class CaseResult:
+    name: str
+    docs: int
+    bytes: int
+    seconds: float
+    docs_per_s: float
+    mb_per_s: float
+    peak_kib: float
+
+
+def measure(name: str, run: Callable[[], Tuple[int, int]], repeat: int) -> CaseResult:
+    """Best of `repeat` timed runs, plus one run under tracemalloc for the peak."""
+    best = float("inf")
+    docs = nbytes = 0
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        docs, nbytes = run()
+        best = min(best, time.perf_counter() - t0)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return CaseResult(
+        name=name,
+        docs=docs,
+        bytes=nbytes,
+        seconds=round(best, 6),
+        docs_per_s=round(docs / best, 1),
+        mb_per_s=round(nbytes / best / 1e6, 2),
+        peak_kib=round(peak / 1024, 1),
+    )
+
+
+def build_cases(docs: int, stations: int, chunk_size: int, workdir: Path) -> List[Case]:
+    raw = synthetic.brightsky_raw(docs, stations)
+    payloads = synthetic.hs_payloads(docs)
+
+    processed = list(iter_processed_docs(raw, PROCESSED_AT))
+    ndjson = workdir / "processed_bench__brightsky.ndjson"
+    ndjson.write_bytes(b"".join(codec.dumps(d) + b"\n" for d in processed))
+    ndjson_bytes = ndjson.stat().st_size
+    raw_bytes = len(codec.dumps(raw))
+    hs_bytes = sum(len(codec.dumps(p)) for p in payloads)
+
+    dict_chunks = list(load_to_es.chunked(processed, chunk_size))
+    raw_chunks = list(load_to_es.chunked(load_to_es.read_ndjson_raw(ndjson), chunk_size))
+    responses = [synthetic.bulk_response(len(c)) for c in dict_chunks]
+    response_bytes = sum(len(r) for r in responses)
+
+    def preprocess_brightsky() -> Tuple[int, int]:
+        return sum(1 for _ in iter_processed_docs(raw, PROCESSED_AT)), raw_bytes
+
+    def preprocess_brightsky_lines() -> Tuple[int, int]:
+        return sum(1 for _ in iter_ndjson_lines(processed_columns(raw, PROCESSED_AT))), raw_bytes
+
+    def preprocess_hs() -> Tuple[int, int]:
+        return sum(1 for p in payloads if normalize(p, "hs-worms", PROCESSED_AT)), hs_bytes
+
+    def read_ndjson() -> Tuple[int, int]:
+        return sum(1 for _ in load_to_es.read_ndjson(ndjson)), ndjson_bytes
+
+    def read_ndjson_raw() -> Tuple[int, int]:
+        return sum(1 for _ in load_to_es.read_ndjson_raw(ndjson)), ndjson_bytes
+
+    def chunked() -> Tuple[int, int]:
+        return sum(len(c) for c in load_to_es.chunked(iter(processed), chunk_size)), 0
+
+    def build_bulk_body() -> Tuple[int, int]:
+        n = size = 0
+        for c in dict_chunks:
+            size += len(load_to_es.build_bulk_body(TARGET, c).encode("utf-8"))
+            n += len(c)
+        return n, size
+
+    def build_bulk_body_raw() -> Tuple[int, int]:
+        n = size = 0
+        for c in raw_chunks:
+            size += len(load_to_es.build_bulk_body_raw(TARGET, c))
+            n += len(c)
+        return n, size
+
+    def parse_bulk_response() -> Tuple[int, int]:
+        n = 0
+        for r, c in zip(responses, dict_chunks):
+            has_errors, _ = load_to_es.parse_bulk_response(r)
+            if has_errors:
+                raise RuntimeError("synthetic bulk response reported errors")
+            n += len(c)
+        return n, response_bytes
+
+    return [
+        ("iter_processed_docs", preprocess_brightsky),
+        ("iter_ndjson_lines", preprocess_brightsky_lines),
+        ("hs_normalize", preprocess_hs),
+        ("read_ndjson", read_ndjson),
+        ("read_ndjson_raw", read_ndjson_raw),
+        ("chunked", chunked),
+        ("build_bulk_body", build_bulk_body),
+        ("build_bulk_body_raw", build_bulk_body_raw),
+        ("parse_bulk_response", parse_bulk_response),
+    ]
+
+
+def run_suite(
+    docs: int,
+    stations: int = 10,
+    chunk_size: int = load_to_es.CHUNK_SIZE,
+    repeat: int = 3,
+    only: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        cases = build_cases(docs, stations, chunk_size, Path(tmp))
+        results = [measure(name, run, repeat) for name, run in cases if not only or name in only]
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "codec": codec.BACKEND,
+        "params": {"docs": docs, "stations": stations, "chunk_size": chunk_size, "repeat": repeat},
+        "results": {r.name: asdict(r) for r in results},
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Names of cases whose docs/s dropped by more than max_regression (0.2 = 20 %)."""
+    regressions = []
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("docs_per_s"):
+            continue
+        if cur["docs_per_s"] < base["docs_per_s"] * (1 - max_regression):
+            regressions.append(name)
+    return regressions
+
+
+def print_report(current: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    print(f"docs={current['params']['docs']} python={current['python']} codec={current['codec']}")
+    print(f"{'case':<22} {'docs/s':>12} {'MB/s':>8} {'peak KiB':>10} {'vs base':>8}")
+    for name, r in current["results"].items():
+        delta = ""
+        base = (baseline or {}).get("results", {}).get(name)
+        if base and base.get("docs_per_s"):
+            delta = f"{(r['docs_per_s'] / base['docs_per_s'] - 1) * 100:+.0f}%"
+        print(f"{name:<22} {r['docs_per_s']:>12,.0f} {r['mb_per_s']:>8.2f} {r['peak_kib']:>10,.0f} {delta:>8}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Ingest-path microbenchmarks with synthetic weather data.")
+    parser.add_argument("--docs", type=int, default=100_000, help="documents per case (default 100000)")
+    parser.add_argument("--stations", type=int, default=10)
+    parser.add_argument("--chunk-size", type=int, default=load_to_es.CHUNK_SIZE)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case, best is reported")
+    parser.add_argument("--only", nargs="*", help="run only these cases")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--output", type=Path, help="also write results as JSON")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed docs/s drop vs baseline")
+    args = parser.parse_args(argv)
+
+    current = run_suite(args.docs, args.stations, args.chunk_size, args.repeat, args.only)
+    baseline = codec.loads(args.baseline.read_bytes()) if args.baseline.exists() else None
+    print_report(current, baseline)
+
+    if args.output:
+        args.output.write_bytes(codec.dumps(current, indent=True))
+    if args.save_baseline:
+        args.baseline.write_bytes(codec.dumps(current, indent=True))
+        print(f"Baseline saved: {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print("No baseline (run with --save-baseline to store one)")
+        return 0
+    if baseline.get("params") != current["params"]:
+        print(f"Warning: baseline params differ: {baseline.get('params')}")
+    for key in ("python", "codec", "platform"):
+        if baseline.get(key) != current[key]:
+            print(f"Warning: baseline {key} differs: {baseline.get(key)} (re-create it with --save-baseline)")
+    regressions = compare(current, baseline, args.max_regression)
+    if regressions:
+        print(f"Regressions (> {args.max_regression:.0%} slower): {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
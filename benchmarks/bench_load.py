@@ -0,0 +1,114 @@
+# See documentation:
+# docs/14_benchmarks.md
+
+# ------------------------------------------------------------
+# Loader benchmark against the fake Elasticsearch server
+#
+# Runs load_to_es.load_files offline (benchmarks/fake_es.py) with
+# configurable latency / rejection rate and compares loader
+# settings (bulk workers, fixed vs. adaptive chunk size).
+# ------------------------------------------------------------
+
+import argparse
+import dataclasses
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks import synthetic
+from benchmarks.fake_es import FakeEs
+from scripts import codec, load_to_es
+from scripts.config import PROJECT_ROOT
+from scripts.preprocess_brightsky import iter_processed_docs
+
+# name -> Settings overrides
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "sequential": {"bulk_workers": 1},
+    "workers-4": {"bulk_workers": 4},
+    "workers-8": {"bulk_workers": 8},
+    "adaptive-workers-4": {"bulk_workers": 4, "bulk_target_bytes": 1024 * 1024},
+}
+
+
+def setup_cluster(es: FakeEs) -> None:
+    base = PROJECT_ROOT / "db" / "elastic"
+    es.handle("PUT", f"/_ingest/pipeline/{load_to_es.PIPELINE_NAME}", {}, (base / "ingest-pipeline.json").read_bytes())
+    aliases = codec.loads((base / "aliases.json").read_bytes())
+    es.handle("POST", "/_aliases", {}, codec.dumps(aliases))
+
+
+def run_scenario(
+    name: str, processed: Path, docs: int, latency_s: float, reject_rate: float, max_body_bytes: Optional[int]
+) -> Dict[str, Any]:
+    with FakeEs(latency_s=latency_s, reject_rate=reject_rate, max_body_bytes=max_body_bytes) as es:
+        setup_cluster(es)
+        # load_files reads the module settings: swap them for this run only
+        previous = load_to_es.SETTINGS
+        load_to_es.SETTINGS = dataclasses.replace(
+            previous,
+            es_url=es.url,
+            index_name="data-2026",
+            alias_name="all-data",
+            index_partitioning="none",
+            fingerprint_cache=False,
+            processed_dir=processed.parent,
+            bulk_max_retries=50,
+            bulk_retry_base_s=0.01,
+            **SCENARIOS[name],
+        )
+        try:
+            t0 = time.perf_counter()
+            load_to_es.load_files([processed], force=True)
+            seconds = time.perf_counter() - t0
+        finally:
+            load_to_es.SETTINGS = previous
+        if es.count("all-data") != docs:
+            raise RuntimeError(f"{name}: expected {docs} docs, found {es.count('all-data')}")
+        return {
+            "scenario": name,
+            "seconds": round(seconds, 3),
+            "docs_per_s": round(docs / seconds, 1),
+            "bulk_requests": es.stats.bulk_requests,
+            "rejected_items": es.stats.rejected_items,
+            "max_in_flight": es.stats.max_in_flight,
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark load_to_es against the fake ES server.")
+    parser.add_argument("--docs", type=int, default=50_000)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per request")
+    parser.add_argument("--reject-rate", type=float, default=0.0, help="share of bulk items rejected with 429")
+    parser.add_argument("--max-body-bytes", type=int, default=None)
+    parser.add_argument("--scenarios", nargs="*", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--output", type=Path, help="also write results as JSON")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_load_") as tmp:
+        processed = Path(tmp) / "processed" / "processed_bench__brightsky.ndjson"
+        processed.parent.mkdir()
+        raw = synthetic.brightsky_raw(args.docs)
+        processed.write_bytes(b"".join(codec.dumps(d) + b"\n" for d in iter_processed_docs(raw)))
+
+        for name in args.scenarios:
+            results.append(
+                run_scenario(name, processed, args.docs, args.latency, args.reject_rate, args.max_body_bytes)
+            )
+
+    print(f"docs={args.docs} latency={args.latency}s reject_rate={args.reject_rate}")
+    print(f"{'scenario':<20} {'docs/s':>10} {'seconds':>8} {'requests':>9} {'rejected':>9} {'in-flight':>9}")
+    for r in results:
+        print(
+            f"{r['scenario']:<20} {r['docs_per_s']:>10,.0f} {r['seconds']:>8.2f} "
+            f"{r['bulk_requests']:>9} {r['rejected_items']:>9} {r['max_in_flight']:>9}"
+        )
+    if args.output:
+        args.output.write_bytes(codec.dumps({"params": vars(args) | {"output": str(args.output)}, "results": results}, indent=True))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
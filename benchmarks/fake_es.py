@@ -0,0 +1,586 @@
+# See documentation:
+# docs/14_benchmarks.md
+
+# ------------------------------------------------------------
+# In-process Elasticsearch stand-in for offline load tests
+#
+# Implements the subset of the REST API the pipeline uses:
+# _bulk (?pipeline, ?filter_path), _settings, _refresh, _count,
+# _search, _index_template, _ingest/pipeline, _aliases,
+# index creation and _cluster/health.
+#
+# Failure injection:
+# - latency_s (+ jitter_s) per request
+# - reject_rate: share of bulk items answered with 429
+#   (es_rejected_execution_exception); decided per (seed, _id, attempt),
+#   so runs are reproducible regardless of thread scheduling
+# - max_body_bytes: larger requests get 413 (http.max_content_length)
+#
+# Not a search engine: queries support match_all/term/terms/range/bool,
+# aggregations terms/date_histogram (nested), max/min/avg/sum/stats,
+# cardinality and top_hits; anything else is answered with 400.
+# Documents become visible on _refresh or when refresh_interval is not -1.
+# ------------------------------------------------------------
+
+import argparse
+import gzip
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from scripts import codec
+
+Response = Tuple[int, Any]
+
+
+@dataclass
+class FakeIndex:
+    settings: Dict[str, Any] = field(default_factory=dict)
+    docs: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    pending: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    @property
+    def refresh_disabled(self) -> bool:
+        return str(self.settings.get("refresh_interval")) == "-1"
+
+
+@dataclass
+class FakeEsStats:
+    requests: int = 0
+    bulk_requests: int = 0
+    bulk_items: int = 0
+    rejected_items: int = 0
+    too_large: int = 0
+    bytes_received: int = 0
+    max_in_flight: int = 0
+    paths: Counter = field(default_factory=Counter)
+
+
+def _error(status: int, type_: str, reason: str) -> Response:
+    return status, {"error": {"type": type_, "reason": reason}, "status": status}
+
+
+def _ingest_timestamp() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _normalize_date(value: Any) -> str:
+    """ISO8601 date processor: stored as UTC with milliseconds (like ES)."""
+    ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _matches(doc: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    if not query or "match_all" in query:
+        return True
+    if "term" in query:
+        (f, v), = query["term"].items()
+        v = v.get("value") if isinstance(v, dict) else v
+        return str(doc.get(f)) == str(v)
+    if "terms" in query:
+        (f, values), = query["terms"].items()
+        return str(doc.get(f)) in {str(v) for v in values}
+    if "range" in query:
+        (f, bounds), = query["range"].items()
+        value = doc.get(f)
+        if value is None:
+            return False
+        ops = {"gte": lambda a, b: a >= b, "gt": lambda a, b: a > b, "lte": lambda a, b: a <= b, "lt": lambda a, b: a < b}
+        for op, bound in bounds.items():
+            if op in ops:
+                a, b = value, bound
+                if isinstance(a, str) or isinstance(b, str):
+                    # dates: compare as UTC instants
+                    a, b = _normalize_date(a), _normalize_date(b)
+                if not ops[op](a, b):
+                    return False
+        return True
+    if "bool" in query:
+        b = query["bool"]
+        as_list = lambda x: x if isinstance(x, list) else [x]  # noqa: E731
+        return (
+            all(_matches(doc, q) for q in as_list(b.get("filter", [])) + as_list(b.get("must", [])))
+            and not any(_matches(doc, q) for q in as_list(b.get("must_not", [])))
+        )
+    raise ValueError(f"Unsupported query: {sorted(query)}")
+
+
+def _instant(value: Any) -> datetime:
+    return datetime.fromisoformat(_normalize_date(value).replace("Z", "+00:00"))
+
+
+def _sort_docs(docs: List[Dict[str, Any]], sort: List[Any]) -> List[Dict[str, Any]]:
+    docs = list(docs)
+    for spec in reversed(sort or []):
+        (f, opts), = (spec.items() if isinstance(spec, dict) else [(spec, "asc")])
+        order = opts.get("order", "asc") if isinstance(opts, dict) else opts
+        docs.sort(key=lambda d: (d.get(f) is None, d.get(f)), reverse=(order == "desc"))
+    return docs
+
+
+def _metric(docs: List[Dict[str, Any]], kind: str, field_name: str) -> Dict[str, Any]:
+    values = [d[field_name] for d in docs if d.get(field_name) is not None]
+    if kind == "cardinality":
+        return {"value": len({str(v) for v in values})}
+    if kind == "stats":
+        if not values:
+            return {"count": 0, "min": None, "max": None, "avg": None, "sum": 0.0}
+        nums = [float(v) for v in values]
+        return {"count": len(nums), "min": min(nums), "max": max(nums), "avg": sum(nums) / len(nums), "sum": sum(nums)}
+    if kind == "sum":
+        return {"value": float(sum(values))}
+    if not values:
+        return {"value": None}
+    if kind == "avg":
+        return {"value": sum(float(v) for v in values) / len(values)}
+    if isinstance(values[0], str):
+        # date field: epoch millis plus value_as_string, like ES
+        instants = [_instant(v) for v in values]
+        best = max(instants) if kind == "max" else min(instants)
+        return {"value": best.timestamp() * 1000, "value_as_string": _normalize_date(best.isoformat())}
+    return {"value": float(max(values) if kind == "max" else min(values))}
+
+
+# calendar_interval -> truncation of a UTC instant
+_CALENDAR = {
+    "minute": lambda t: t.replace(second=0, microsecond=0),
+    "hour": lambda t: t.replace(minute=0, second=0, microsecond=0),
+    "day": lambda t: t.replace(hour=0, minute=0, second=0, microsecond=0),
+    "week": lambda t: (t - timedelta(days=t.weekday())).replace(hour=0, minute=0, second=0, microsecond=0),
+    "month": lambda t: t.replace(day=1, hour=0, minute=0, second=0, microsecond=0),
+}
+_CALENDAR.update({"1m": _CALENDAR["minute"], "1h": _CALENDAR["hour"], "1d": _CALENDAR["day"], "1w": _CALENDAR["week"], "1M": _CALENDAR["month"]})
+
+METRIC_AGGS = ("max", "min", "avg", "sum", "stats", "cardinality")
+
+
+def _date_histogram(docs: List[Dict[str, Any]], spec: Dict[str, Any]) -> List[Tuple[datetime, List[Dict[str, Any]]]]:
+    interval = spec.get("calendar_interval")
+    if interval not in _CALENDAR:
+        raise ValueError(f"Unsupported date_histogram calendar_interval: {interval!r}")
+    if spec.get("time_zone", "UTC") not in ("UTC", "Z", "+00:00"):
+        raise ValueError(f"Unsupported date_histogram time_zone: {spec['time_zone']!r}")
+    if spec.get("min_doc_count", 1) != 1:
+        raise ValueError("Only min_doc_count=1 is supported")
+    groups: Dict[datetime, List[Dict[str, Any]]] = {}
+    for d in docs:
+        if d.get(spec["field"]) is not None:
+            groups.setdefault(_CALENDAR[interval](_instant(d[spec["field"]])), []).append(d)
+    return sorted(groups.items())
+
+
+def _aggregate(docs: List[Dict[str, Any]], spec: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Bucket (terms, date_histogram; with sub-aggregations) and metric
+    aggregations. Unsupported aggregations raise ValueError (-> 400).
+    """
+    out: Dict[str, Any] = {}
+    for name, agg in spec.items():
+        sub = agg.get("aggs") or agg.get("aggregations") or {}
+        kinds = [k for k in agg if k not in ("aggs", "aggregations")]
+        if len(kinds) != 1:
+            raise ValueError(f"Aggregation [{name}] must define exactly one type, got {kinds}")
+        kind = kinds[0]
+        if kind == "terms":
+            field_name = agg["terms"]["field"]
+            groups: Dict[str, List[Dict[str, Any]]] = {}
+            for d in docs:
+                if d.get(field_name) is not None:
+                    groups.setdefault(str(d[field_name]), []).append(d)
+            ranked = sorted(groups.items(), key=lambda kv: (-len(kv[1]), kv[0]))[: agg["terms"].get("size", 10)]
+            out[name] = {"buckets": [{"key": k, "doc_count": len(g), **_aggregate(g, sub)} for k, g in ranked]}
+        elif kind == "date_histogram":
+            out[name] = {
+                "buckets": [
+                    {
+                        "key_as_string": _normalize_date(start.isoformat()),
+                        "key": int(start.timestamp() * 1000),
+                        "doc_count": len(g),
+                        **_aggregate(g, sub),
+                    }
+                    for start, g in _date_histogram(docs, agg["date_histogram"])
+                ]
+            }
+        elif kind in METRIC_AGGS:
+            if sub:
+                raise ValueError(f"Metric aggregation [{name}] cannot have sub-aggregations")
+            out[name] = _metric(docs, kind, agg[kind]["field"])
+        elif kind == "top_hits":
+            top = _sort_docs(docs, agg["top_hits"].get("sort") or [])[: agg["top_hits"].get("size", 3)]
+            out[name] = {
+                "hits": {
+                    "total": {"value": len(docs), "relation": "eq"},
+                    "hits": [{"_id": d.get("doc_id"), "_source": d} for d in top],
+                }
+            }
+        else:
+            raise ValueError(f"Unsupported aggregation type [{kind}] in [{name}]")
+    return out
+
+
+class FakeEs:
+    """
+    In-memory cluster state plus an HTTP server on 127.0.0.1.
+
+    Usage:
+        with FakeEs(latency_s=0.01, reject_rate=0.05) as es:
+            settings = Settings(es_url=es.url, ...)
+            es.stats.rejected_items
+    """
+
+    def __init__(
+        self,
+        latency_s: float = 0.0,
+        jitter_s: float = 0.0,
+        reject_rate: float = 0.0,
+        max_body_bytes: Optional[int] = None,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        self.reject_rate = reject_rate
+        self.max_body_bytes = max_body_bytes
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.host = host
+        self.port = port
+
+        self.indices: Dict[str, FakeIndex] = {}
+        self.aliases: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.templates: Dict[str, Any] = {}
+        self.pipelines: Dict[str, Any] = {}
+        self.stats = FakeEsStats()
+        self._attempts: Counter = Counter()
+
+        self._lock = threading.RLock()
+        self._in_flight = 0
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------
+    # server lifecycle
+
+    @property
+    def url(self) -> str:
+        if self._server is None:
+            raise RuntimeError("FakeEs not started")
+        return f"http://{self.host}:{self._server.server_address[1]}"
+
+    def start(self) -> "FakeEs":
+        self._server = ThreadingHTTPServer((self.host, self.port), _make_handler(self))
+        self._server.daemon_threads = True
+        server = self._server
+        self._thread = threading.Thread(target=lambda: server.serve_forever(poll_interval=0.05), name="fake-es", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeEs":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    # ------------------------------------------------------------
+    # state helpers
+
+    def resolve(self, name: str, write: bool = False) -> List[str]:
+        """Concrete indices for an index/alias name (write=True: the write index only)."""
+        with self._lock:
+            if name in self.aliases:
+                members = self.aliases[name]
+                if not write:
+                    return sorted(members)
+                writers = [i for i, opts in members.items() if opts.get("is_write_index")]
+                if not writers and len(members) == 1:
+                    writers = list(members)
+                if len(writers) != 1:
+                    raise LookupError(f"no write index is defined for alias [{name}]")
+                return writers
+            if name in ("_all", "*"):
+                return sorted(self.indices)
+            if name.endswith("*"):
+                return sorted(i for i in self.indices if i.startswith(name[:-1]))
+            if write:
+                self.indices.setdefault(name, FakeIndex())  # auto_create_index
+            return [name] if name in self.indices else []
+
+    def visible_docs(self, target: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            out = []
+            for name in sorted({i for t in target.split(",") for i in self.resolve(t)}):
+                out.extend(self.indices[name].docs.values())
+            return out
+
+    def count(self, target: str = "_all") -> int:
+        return len(self.visible_docs(target))
+
+    # ------------------------------------------------------------
+    # request dispatch
+
+    def handle(self, method: str, path: str, params: Dict[str, str], body: bytes) -> Response:
+        parts = [p for p in path.split("/") if p]
+        with self._lock:
+            self.stats.requests += 1
+            self.stats.bytes_received += len(body)
+            self.stats.paths[f"{method} /{'/'.join(p for p in parts if p.startswith('_'))}"] += 1
+
+        if self.max_body_bytes is not None and len(body) > self.max_body_bytes:
+            with self._lock:
+                self.stats.too_large += 1
+            return _error(413, "content_too_long_exception", f"request body exceeds {self.max_body_bytes} bytes")
+
+        with self._lock:
+            jitter = self.rng.uniform(0, self.jitter_s) if self.jitter_s else 0.0
+        delay = self.latency_s + jitter
+        if delay > 0:
+            time.sleep(delay)
+
+        payload = codec.loads(body) if body.strip() and not path.endswith("_bulk") else None
+
+        if parts == ["_cluster", "health"]:
+            return 200, {"status": "green", "number_of_nodes": 1}
+        if parts[:1] == ["_index_template"] and len(parts) == 2 and method == "PUT":
+            self.templates[parts[1]] = payload
+            return 200, {"acknowledged": True}
+        if parts[:2] == ["_ingest", "pipeline"] and len(parts) == 3 and method == "PUT":
+            self.pipelines[parts[2]] = payload
+            return 200, {"acknowledged": True}
+        if parts == ["_aliases"] and method == "POST":
+            return self._aliases(payload or {})
+        if parts[-1:] == ["_bulk"]:
+            default_index = parts[0] if len(parts) == 2 else None
+            return self._bulk(body, default_index, params)
+        if parts[-1:] == ["_refresh"]:
+            return self._refresh(parts[0] if len(parts) == 2 else "_all")
+        if len(parts) == 2 and parts[1] == "_settings" and method == "PUT":
+            return self._settings(parts[0], payload or {})
+        if parts[-1:] == ["_count"]:
+            target = parts[0] if len(parts) == 2 else "_all"
+            query = (payload or {}).get("query")
+            return 200, {"count": sum(1 for d in self.visible_docs(target) if _matches(d, query))}
+        if parts[-1:] == ["_search"]:
+            return self._search(parts[0] if len(parts) == 2 else "_all", payload or {})
+        if len(parts) == 1 and method == "PUT":
+            return self._create_index(parts[0], payload or {})
+        return _error(400, "illegal_argument_exception", f"fake ES does not support {method} {path}")
+
+    def _create_index(self, name: str, body: Dict[str, Any]) -> Response:
+        with self._lock:
+            if name in self.indices:
+                return _error(400, "resource_already_exists_exception", f"index [{name}] already exists")
+            self.indices[name] = FakeIndex(settings=dict((body.get("settings") or {}).get("index", body.get("settings") or {})))
+            for alias, opts in (body.get("aliases") or {}).items():
+                self.aliases.setdefault(alias, {})[name] = opts or {}
+        return 200, {"acknowledged": True, "index": name}
+
+    def _aliases(self, body: Dict[str, Any]) -> Response:
+        with self._lock:
+            for action in body.get("actions", []):
+                (kind, spec), = action.items()
+                index, alias = spec["index"], spec["alias"]
+                if kind == "add":
+                    self.indices.setdefault(index, FakeIndex())
+                    opts = {k: v for k, v in spec.items() if k not in ("index", "alias")}
+                    self.aliases.setdefault(alias, {})[index] = opts
+                elif kind == "remove":
+                    self.aliases.get(alias, {}).pop(index, None)
+        return 200, {"acknowledged": True}
+
+    def _settings(self, target: str, body: Dict[str, Any]) -> Response:
+        settings = body.get("index", body)
+        with self._lock:
+            names = self.resolve(target)
+            if not names:
+                return _error(404, "index_not_found_exception", f"no such index [{target}]")
+            for name in names:
+                idx = self.indices[name]
+                idx.settings.update(settings)
+                if not idx.refresh_disabled:
+                    idx.docs.update(idx.pending)
+                    idx.pending.clear()
+        return 200, {"acknowledged": True}
+
+    def _refresh(self, target: str) -> Response:
+        with self._lock:
+            names = self.resolve(target)
+            for name in names:
+                idx = self.indices[name]
+                idx.docs.update(idx.pending)
+                idx.pending.clear()
+        return 200, {"_shards": {"total": len(names), "successful": len(names), "failed": 0}}
+
+    def _search(self, target: str, body: Dict[str, Any]) -> Response:
+        try:
+            docs = [d for d in self.visible_docs(target) if _matches(d, body.get("query"))]
+            aggs = _aggregate(docs, body.get("aggs") or body.get("aggregations") or {})
+        except ValueError as e:
+            return _error(400, "parsing_exception", str(e))
+        docs = _sort_docs(docs, body.get("sort") or [])
+
+        result: Dict[str, Any] = {
+            "took": 1,
+            "hits": {
+                "total": {"value": len(docs), "relation": "eq"},
+                "hits": [{"_id": d.get("doc_id"), "_source": d} for d in docs[: body.get("size", 10)]],
+            },
+        }
+        if aggs:
+            result["aggregations"] = aggs
+        return 200, result
+
+    def _run_pipeline(self, name: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+        for processor in self.pipelines[name].get("processors", []):
+            (kind, spec), = processor.items()
+            if kind == "date" and spec["field"] in doc:
+                doc[spec.get("target_field", spec["field"])] = _normalize_date(doc[spec["field"]])
+            elif kind == "set":
+                value = spec.get("value")
+                doc[spec["field"]] = _ingest_timestamp() if value == "{{_ingest.timestamp}}" else value
+        return doc
+
+    def _bulk(self, body: bytes, default_index: Optional[str], params: Dict[str, str]) -> Response:
+        started = time.perf_counter()
+        pipeline = params.get("pipeline")
+        if pipeline and pipeline not in self.pipelines:
+            return _error(400, "illegal_argument_exception", f"pipeline with id [{pipeline}] does not exist")
+
+        lines = [ln for ln in body.split(b"\n") if ln.strip()]
+        if len(lines) % 2:
+            return _error(400, "illegal_argument_exception", "The bulk request must be terminated by a newline [\\n]")
+
+        items: List[Dict[str, Any]] = []
+        rejected = 0
+        for action_line, source_line in zip(lines[0::2], lines[1::2]):
+            (op, meta), = codec.loads(action_line).items()
+            index_name = meta.get("_index") or default_index
+            doc_id = meta.get("_id")
+            item: Dict[str, Any] = {"_index": index_name, "_id": doc_id}
+
+            if self._reject(doc_id):
+                rejected += 1
+                item.update(status=429, error={"type": "es_rejected_execution_exception", "reason": "rejected execution (fake)"})
+                items.append({op: item})
+                continue
+
+            try:
+                doc = codec.loads(source_line)
+                if pipeline:
+                    doc = self._run_pipeline(pipeline, doc)
+                with self._lock:
+                    (concrete,) = self.resolve(index_name, write=True)
+                    idx = self.indices[concrete]
+                    exists = doc_id in idx.docs or doc_id in idx.pending
+                    if idx.refresh_disabled:
+                        idx.pending[doc_id] = doc
+                    else:
+                        idx.docs[doc_id] = doc
+                item.update(_index=concrete, result="updated" if exists else "created", status=200 if exists else 201)
+            except (LookupError, ValueError) as e:
+                item.update(status=400, error={"type": "illegal_argument_exception", "reason": str(e)})
+            items.append({op: item})
+
+        with self._lock:
+            self.stats.bulk_requests += 1
+            self.stats.bulk_items += len(items)
+            self.stats.rejected_items += rejected
+
+        errors = any("error" in next(iter(it.values())) for it in items)
+        took = int((time.perf_counter() - started) * 1000)
+        if "filter_path" in params:
+            items = [{op: {k: v for k, v in r.items() if k in ("status", "error")}} for it in items for op, r in it.items()]
+        return 200, {"took": took, "errors": errors, "items": items}
+
+    def _reject(self, doc_id: Optional[str]) -> bool:
+        if self.reject_rate <= 0:
+            return False
+        with self._lock:
+            self._attempts[doc_id] += 1
+            attempt = self._attempts[doc_id]
+        return random.Random(f"{self.seed}|{doc_id}|{attempt}").random() < self.reject_rate
+
+    def _enter(self) -> None:
+        with self._lock:
+            self._in_flight += 1
+            self.stats.max_in_flight = max(self.stats.max_in_flight, self._in_flight)
+
+    def _leave(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+
+def _make_handler(es: FakeEs) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real cluster
+
+        def _dispatch(self) -> None:
+            url = urlsplit(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+
+            es._enter()
+            try:
+                status, out = es.handle(self.command, url.path, params, body)
+            except Exception as e:
+                status, out = _error(500, "exception", f"{type(e).__name__}: {e}")
+            finally:
+                es._leave()
+
+            data = codec.dumps(out)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+                data = gzip.compress(data)
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_PUT = do_POST = do_DELETE = _dispatch
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the fake Elasticsearch server (point ES_URL at it).")
+    parser.add_argument("--port", type=int, default=9201)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="additional random latency (seconds)")
+    parser.add_argument("--reject-rate", type=float, default=0.0, help="share of bulk items rejected with 429")
+    parser.add_argument("--max-body-bytes", type=int, default=None, help="reject larger requests with 413")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    es = FakeEs(args.latency, args.jitter, args.reject_rate, args.max_body_bytes, args.seed, port=args.port).start()
+    print(f"Fake ES on {es.url} (latency {args.latency}s, reject rate {args.reject_rate}, max body {args.max_body_bytes})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        es.stop()
+        print(f"Stats: {es.stats}")
+
+
+if __name__ == "__main__":
+    main()
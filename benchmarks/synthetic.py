@@ -0,0 +1,87 @@
+# See documentation:
+# docs/14_benchmarks.md
+
+# ------------------------------------------------------------
+# Synthetic weather data for benchmarks
+#
+# Same shape as the raw layer (data/raw/raw_<run_id>__<provider>.json):
+# - BrightSky: payload.weather with hourly records per station
+# - HS-Worms: one API payload per reading
+# Seeded, so every run sees identical data.
+# ------------------------------------------------------------
+
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+CONDITIONS = ("dry", "fog", "rain", "sleet", "snow", "hail", "thunderstorm")
+ICONS = ("clear-day", "clear-night", "partly-cloudy-day", "partly-cloudy-night", "cloudy", "fog", "wind", "rain")
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def brightsky_record(rng: random.Random, source_id: int, ts: datetime) -> Dict[str, Any]:
+    temperature = round(rng.gauss(8.0, 6.0), 1)
+    return {
+        "timestamp": ts.isoformat(),
+        "source_id": source_id,
+        "temperature": temperature,
+        "relative_humidity": rng.randint(30, 100),
+        "dew_point": round(temperature - rng.uniform(0.0, 8.0), 1),
+        "pressure_msl": round(rng.gauss(1013.0, 8.0), 1),
+        "precipitation": round(rng.expovariate(4.0), 1) if rng.random() < 0.3 else 0.0,
+        "wind_speed": round(rng.uniform(0.0, 40.0), 1),
+        "wind_direction": rng.randrange(0, 360, 10),
+        "wind_gust_speed": round(rng.uniform(0.0, 70.0), 1),
+        "wind_gust_direction": rng.randrange(0, 360, 10),
+        "cloud_cover": rng.randrange(0, 101, 25),
+        "sunshine": float(rng.choice((0, 0, 15, 30, 60))),
+        "visibility": rng.randrange(1000, 75000, 1000),
+        "condition": rng.choice(CONDITIONS),
+        "icon": rng.choice(ICONS),
+        # not every station reports solar radiation
+        "solar": round(rng.uniform(0.0, 0.8), 3) if source_id % 3 == 0 else None,
+        "fallback_source_ids": {},
+    }
+
+
+def brightsky_raw(docs: int, stations: int = 10, seed: int = 42) -> Dict[str, Any]:
+    """Raw BrightSky file with `docs` hourly records spread over `stations` stations."""
+    rng = random.Random(seed)
+    weather: List[Dict[str, Any]] = []
+    for i in range(docs):
+        source_id = 1000 + i % stations
+        ts = START + timedelta(hours=i // stations)
+        weather.append(brightsky_record(rng, source_id, ts))
+    sources = [{"id": 1000 + s, "dwd_station_id": f"{s:05d}", "station_name": f"Station {s}"} for s in range(stations)]
+    return {
+        "fetched_at": "20260101T000000Z",
+        "provider": "brightsky",
+        "endpoint": "https://api.brightsky.dev/weather",
+        "payload": {"weather": weather, "sources": sources},
+    }
+
+
+def hs_payloads(readings: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """HS-Worms API payloads, one reading per minute."""
+    rng = random.Random(seed)
+    start = int(START.timestamp())
+    out = []
+    for i in range(readings):
+        out.append(
+            {
+                "ts": start + 60 * i,
+                "temperature": {"out": round(rng.gauss(8.0, 6.0), 1), "in": round(rng.gauss(21.0, 1.0), 1)},
+                "humidity": {"out": rng.randint(30, 100), "in": rng.randint(30, 60)},
+                "baro": round(rng.gauss(1013.0, 8.0), 1),
+                "wind": {"speed": {"kmh": round(rng.uniform(0.0, 60.0), 1)}, "dir": {"deg": rng.randrange(0, 360)}},
+                "rain": {"rate": 0.0, "day": round(rng.uniform(0.0, 5.0), 1)},
+            }
+        )
+    return out
+
+
+def bulk_response(items: int, took: int = 30) -> bytes:
+    """Bulk response as returned with BULK_FILTER_PATH (all items created)."""
+    item = b'{"index":{"status":201}}'
+    return b'{"took":%d,"errors":false,"items":[' % took + b",".join([item] * items) + b"]}"
@@ -1,9 +1,11 @@
 # See documentation:
 # docs/06_ingestion_pipeline.md
 
+import os
 from pathlib import Path
 import sys
 from datetime import datetime, timedelta
+from typing import Dict, List
 
 # Projekt-Root ermitteln: .../elastic_project
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
@@ -11,19 +13,24 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 from airflow import DAG
-from airflow.operators.python import PythonOperator
+from airflow.decorators import task
 
-from scripts.apply_es import main as apply_es_main
+# Nur die leichte Provider-Registry wird beim Parsen importiert;
+# die Skripte selbst werden erst in den Tasks importiert (kurze Parse-Zeit).
+from scripts.providers import PROVIDERS
 
-# Klar benannte Callables (keine Namenskollision mit Tasks)
-from scripts.fetch_brightsky import main as fetch_brightsky_main
-from scripts.preprocess_brightsky import main as preprocess_brightsky_main
+# Obergrenze paralleler Fetch-/Load-Tasks pro DAG-Run
+FETCH_MAX_PARALLEL = int(os.getenv("FETCH_MAX_PARALLEL", "8"))
+LOAD_MAX_PARALLEL = int(os.getenv("LOAD_MAX_PARALLEL", "4"))
 
-from scripts.fetch_hs_wetter import main as fetch_hs_main
-from scripts.preprocess_hs_wetter import main as preprocess_hs_main
 
-from scripts.load_to_es import main as load_to_es_main
-from scripts.post_checks import main as post_checks_main
+def push_metrics(ti, stage: str, unit: str = "") -> None:
+    # Metriken des Tasks als Prometheus-Textfile (data/metrics/) und als XCom "metrics"
+    from scripts.metrics import flush
+
+    summary = flush(stage, unit)
+    if ti is not None:
+        ti.xcom_push(key="metrics", value=summary)
 
 
 with DAG(
@@ -31,55 +38,102 @@ with DAG(
     start_date=datetime(2025, 12, 1),
     schedule="@daily",
     catchup=False,
-    tags=["elastic_project"],
+    tags=["elastic_project", *PROVIDERS],
     default_args={
         "retries": 5,
         "retry_delay": timedelta(minutes=5),
     },
 ) as dag:
 
-    apply_es = PythonOperator(
-        task_id="apply_es",
-        python_callable=apply_es_main,
-    )
-
-    fetch_brightsky = PythonOperator(
-        task_id="fetch_brightsky",
-        python_callable=fetch_brightsky_main,
-        op_kwargs={"run_id": "{{ ds }}"},
-    )
-
-    preprocess_brightsky = PythonOperator(
-        task_id="preprocess_brightsky",
-        python_callable=preprocess_brightsky_main,
-        op_kwargs={"run_id": "{{ ds }}"},
-    )
-
-    fetch_hs = PythonOperator(
-        task_id="fetch_hs",
-        python_callable=fetch_hs_main,
-        op_kwargs={"run_id": "{{ ds }}"},
-    )
-
-    preprocess_hs = PythonOperator(
-        task_id="preprocess_hs",
-        python_callable=preprocess_hs_main,
-        op_kwargs={"run_id": "{{ ds }}"},
-    )
-
-    load_to_es = PythonOperator(
-        task_id="load_to_es",
-        python_callable=load_to_es_main,
-        op_kwargs={"run_id": "{{ ds }}"},
-    )
-
-    post_checks = PythonOperator(
-        task_id="post_checks",
-        python_callable=post_checks_main,
-    )
-
-    # Ablauf: erst ES konfigurieren, dann beide Quellen, dann laden, dann Checks
-    apply_es >> fetch_brightsky >> preprocess_brightsky
-    apply_es >> fetch_hs >> preprocess_hs
-
-    [preprocess_brightsky, preprocess_hs] >> load_to_es >> post_checks
+    @task
+    def apply_es() -> None:
+        from scripts.apply_es import main
+
+        main()
+
+    @task
+    def plan() -> List[Dict[str, str]]:
+        # ein Eintrag pro Provider und Partition (z. B. BrightSky-Standort)
+        from scripts.providers import plan as provider_plan
+
+        return provider_plan()
+
+    @task(max_active_tis_per_dagrun=FETCH_MAX_PARALLEL)
+    def fetch(item: Dict[str, str], ds: str | None = None, ti=None) -> Dict[str, str]:
+        from scripts.providers import fetch as provider_fetch
+
+        fetched = provider_fetch(ds, item)
+        push_metrics(ti, "fetch", fetched["raw_provider"])
+        return fetched
+
+    @task
+    def preprocess(item: Dict[str, str], ds: str | None = None, ti=None) -> str:
+        from scripts.providers import preprocess as provider_preprocess
+
+        path = provider_preprocess(ds, item)
+        push_metrics(ti, "preprocess", item["raw_provider"])
+        return path
+
+    @task
+    def prepare_load() -> None:
+        from scripts.load_to_es import prepare_load as lte_prepare_load
+
+        lte_prepare_load()
+
+    @task(max_active_tis_per_dagrun=LOAD_MAX_PARALLEL)
+    def load(path: str, ti=None) -> int:
+        from scripts.load_to_es import load_file
+
+        n = load_file(path)
+        # Unit = Provider-Teil des Dateinamens, damit pro Provider genau ein Textfile existiert
+        push_metrics(ti, "load", Path(path).stem.split("__")[-1])
+        return n
+
+    # stellt refresh_interval auch nach fehlgeschlagenen Loads wieder her
+    @task(trigger_rule="all_done")
+    def finalize_load(ti=None) -> None:
+        from scripts.load_to_es import finalize_load as lte_finalize_load
+
+        lte_finalize_load()
+        # refresh-Dauer und End-to-End-Freshness
+        push_metrics(ti, "finalize_load")
+
+    # stündliche/tägliche Rollups nur für die vom Run berührten Buckets
+    @task
+    def rollup(ds: str | None = None, ti=None) -> None:
+        from scripts.rollup import main
+
+        main(ds)
+        push_metrics(ti, "rollup")
+
+    @task
+    def post_checks() -> None:
+        from scripts.post_checks import main
+
+        main()
+
+    # packt abgeschlossene Monate in data/raw/ zu Archiven (nach dem Laden)
+    @task
+    def compact_raw() -> None:
+        from scripts.raw_store import main
+
+        main()
+
+    # Ablauf: ES konfigurieren, dann pro Provider/Partition fetch -> preprocess,
+    # pro processed-Datei laden, dann Checks
+    units = plan()
+    apply_es() >> units
+
+    processed = preprocess.expand(item=fetch.expand(item=units))
+    loaded = load.expand(path=processed)
+    prepared = prepare_load()
+    processed >> prepared >> loaded
+
+    finalized = finalize_load()
+    loaded >> finalized
+
+    rolled = rollup()
+    [loaded, finalized] >> rolled
+
+    # post_checks hängt auch direkt an den Loads, damit ein fehlgeschlagener Load den Run fehlschlagen lässt
+    [loaded, rolled] >> post_checks() >> compact_raw()
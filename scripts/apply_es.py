@@ -5,48 +5,43 @@
 # - Index Template  (db/elastic/index-template.json)
 # - Ingest Pipeline (db/elastic/ingest-pipeline.json)
 # - Alias config    (db/elastic/aliases.json)
+# - Rollup Template (db/elastic/rollup-template.json)
 #
 # Documentation:
 # docs/09_elasticsearch_index_design.md
 # ------------------------------------------------------------
 
-import json
-import urllib.request
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any, Dict, Tuple
 
+from scripts import codec
 from scripts.config import SETTINGS
+from scripts.es_client import get_client
+from scripts.index_routing import ensure_indices, indices_for_range
 
 from scripts.config import PROJECT_ROOT
 BASE = PROJECT_ROOT / "db" / "elastic"
 
 TEMPLATE_NAME = "data-template"
+ROLLUP_TEMPLATE_NAME = "weather-rollup-template"
 PIPELINE_NAME = "standardize-v1"
 
 
 def http_request(method: str, url: str, body: Dict[str, Any] | None = None) -> Tuple[int, Dict[str, Any]]:
-    data = None if body is None else json.dumps(body).encode("utf-8")
-    req = urllib.request.Request(
-        url,
-        data=data,
-        method=method,
-        headers={"Content-Type": "application/json"},
-    )
+    data = None if body is None else codec.dumps(body)
+    status, text = get_client(url).request(method, url, data)
     try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            text = resp.read().decode("utf-8")
-            return resp.status, (json.loads(text) if text else {})
-    except urllib.error.HTTPError as e:
-        text = e.read().decode("utf-8") if e.fp else ""
-        try:
-            payload = json.loads(text) if text else {"error": str(e)}
-        except json.JSONDecodeError:
-            payload = {"error": text or str(e)}
-        return e.code, payload
+        payload = codec.loads(text) if text else {}
+    except ValueError:
+        payload = {"error": text}
+    if status >= 300 and not payload:
+        payload = {"error": f"HTTP {status}"}
+    return status, payload
 
 
 def load_json(path: Path) -> Dict[str, Any]:
-    return json.loads(path.read_text(encoding="utf-8"))
+    return codec.loads(path.read_bytes())
 
 
 def main() -> None:
@@ -57,6 +52,11 @@ def main() -> None:
     st, out = http_request("PUT", f"{es}/_index_template/{TEMPLATE_NAME}", template)
     print("template:", st, out.get("acknowledged", out))
 
+    # rollup indices (weather-rollup-*, scripts/rollup.py)
+    rollup_template = load_json(BASE / "rollup-template.json")
+    st, out = http_request("PUT", f"{es}/_index_template/{ROLLUP_TEMPLATE_NAME}", rollup_template)
+    print("rollup template:", st, out.get("acknowledged", out))
+
     # apply ingest pipeline
     pipeline_path = BASE / "ingest-pipeline.json"
     if pipeline_path.exists():
@@ -67,7 +67,7 @@ def main() -> None:
         print("pipeline: skipped (no db/elastic/ingest-pipeline.json)")
 
 # 3) create indices (write index + optional archive)
-    indices = [SETTINGS.index_name, "data-archive"]
+    indices = [SETTINGS.index_name, "data-archive", "weather-rollup-hourly", "weather-rollup-daily"]
     for index in indices:
         st, out = http_request("PUT", f"{es}/{index}", {})
         print(f"index {index}:", st, out.get("error", "ok"))
@@ -78,6 +78,12 @@ def main() -> None:
     st, out = http_request("POST", f"{es}/_aliases", aliases)
     print("aliases:", st, out.get("acknowledged", out))
 
+    # 4b) time-partitioned indices: current and next month exist before data arrives
+    if SETTINGS.index_partitioning == "monthly":
+        today = datetime.now(timezone.utc).date()
+        months = indices_for_range(today, today + timedelta(days=31), SETTINGS.index_prefix)
+        ensure_indices(es, months, SETTINGS.alias_name)
+
     # 5) mini check
     st, out = http_request("GET", f"{es}/_cluster/health", None)
     print("health:", st, {k: out.get(k) for k in ["status", "number_of_nodes", "active_shards"]})
@@ -0,0 +1,42 @@
+# ------------------------------------------------------------
+# JSON codec used by all pipeline scripts
+#
+# - orjson when installed (optional dependency), stdlib json otherwise
+# - both backends write compact UTF-8 JSON (no spaces, no ASCII escaping),
+#   so files written by either backend are byte-compatible
+# - bytes-in/bytes-out: dumps() returns bytes, loads() accepts bytes or str
+#
+# Documentation:
+# docs/02_architecture.md
+# ------------------------------------------------------------
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def dumps(obj: Any, indent: bool = False) -> bytes:
+    """Serialize obj to compact UTF-8 JSON bytes (2-space indent if requested)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_str(obj: Any) -> str:
+    """Serialize obj to a compact JSON string (for text-based APIs)."""
+    return dumps(obj).decode("utf-8")
+
+
+def loads(data: bytes | bytearray | str) -> Any:
+    """Parse JSON from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
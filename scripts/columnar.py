@@ -0,0 +1,127 @@
+# See documentation:
+# docs/08_preprocessing.md
+
+# ------------------------------------------------------------
+# Columnar processed layer (Parquet)
+#
+# processed_<run_id>__<provider>.parquet next to the NDJSON file.
+# The schema is derived from db/elastic/index-template.json, so the
+# Parquet types follow the Elasticsearch mapping.
+#
+# pyarrow is optional: without it only NDJSON is written/read.
+# ------------------------------------------------------------
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from scripts import codec
+from scripts.config import PROJECT_ROOT
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = None
+    pq = None
+
+TEMPLATE_FILE = PROJECT_ROOT / "db" / "elastic" / "index-template.json"
+PARQUET_COMPRESSION = "zstd"
+ROW_GROUP_SIZE = 64 * 1024
+
+# ES mapping type -> Arrow type name. float is stored as float64 so the
+# values round-trip exactly to the documents written as NDJSON.
+ES_TO_ARROW = {
+    "keyword": "string",
+    "date": "timestamp",
+    "float": "float64",
+    "integer": "int64",
+}
+
+
+def _require() -> None:
+    if pa is None:
+        raise RuntimeError("Parquet processed layer requires pyarrow (pip install pyarrow)")
+
+
+def template_fields(template_path: Path = TEMPLATE_FILE) -> List[Tuple[str, str]]:
+    """(field, ES type) pairs of the index template mapping, in mapping order."""
+    template = codec.loads(template_path.read_bytes())
+    props = template["template"]["mappings"]["properties"]
+    fields = []
+    for name, spec in props.items():
+        es_type = spec.get("type")
+        if es_type not in ES_TO_ARROW:
+            raise ValueError(f"Unsupported mapping type for columnar layer: {name}={es_type}")
+        fields.append((name, es_type))
+    return fields
+
+
+def arrow_schema(template_path: Path = TEMPLATE_FILE) -> "pa.Schema":
+    _require()
+    types = {
+        "string": pa.string(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+        "float64": pa.float64(),
+        "int64": pa.int64(),
+    }
+    return pa.schema([(name, types[ES_TO_ARROW[es_type]]) for name, es_type in template_fields(template_path)])
+
+
+def _to_column(values: List[Any], es_type: str) -> List[Any]:
+    # mirror Elasticsearch coercion: dates from ISO strings, integers truncated
+    if es_type == "date":
+        return [datetime.fromisoformat(v) if v else None for v in values]
+    if es_type == "integer":
+        return [int(v) if v is not None else None for v in values]
+    if es_type == "float":
+        return [float(v) if v is not None else None for v in values]
+    if es_type == "keyword":
+        return [str(v) if v is not None else None for v in values]
+    return values
+
+
+def write_parquet(docs: List[Dict[str, Any]], out_file: Path, template_path: Path = TEMPLATE_FILE) -> Path:
+    """Write processed documents as a typed Parquet file (atomic replace)."""
+    fields = template_fields(template_path)
+    return write_columns({name: [d.get(name) for d in docs] for name, _ in fields}, out_file, template_path)
+
+
+def write_columns(columns: Dict[str, List[Any]], out_file: Path, template_path: Path = TEMPLATE_FILE) -> Path:
+    """
+    Write processed columns (field -> list of values) as a typed Parquet
+    file (atomic replace). Mapping fields without a column become null.
+    """
+    _require()
+    fields = template_fields(template_path)
+    n = len(next(iter(columns.values()), []))
+    table = pa.Table.from_pydict(
+        {name: _to_column(columns.get(name) or [None] * n, es_type) for name, es_type in fields},
+        schema=arrow_schema(template_path),
+    )
+    tmp = out_file.with_name(out_file.name + ".tmp")
+    pq.write_table(table, tmp, compression=PARQUET_COMPRESSION, row_group_size=ROW_GROUP_SIZE)
+    tmp.replace(out_file)
+    return out_file
+
+
+def read_parquet_docs(path: Path, filters: Optional[list] = None) -> Iterable[Dict[str, Any]]:
+    """
+    Stream a processed Parquet file as documents in the NDJSON shape
+    (dates as ISO-8601 strings), memory-mapped batch by batch.
+
+    filters: optional pyarrow predicates, e.g. [("provider", "=", "brightsky")].
+    """
+    _require()
+    if filters:
+        table = pq.read_table(path, filters=filters, memory_map=True)
+        batches = table.to_batches(max_chunksize=ROW_GROUP_SIZE)
+    else:
+        batches = pq.ParquetFile(path, memory_map=True).iter_batches(batch_size=ROW_GROUP_SIZE)
+
+    for batch in batches:
+        for row in batch.to_pylist():
+            for key, value in row.items():
+                if isinstance(value, datetime):
+                    row[key] = value.isoformat()
+            yield row
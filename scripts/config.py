@@ -14,10 +14,51 @@ class Settings:
     raw_dir: Path = PROJECT_ROOT / "data" / "raw"
     processed_dir: Path = PROJECT_ROOT / "data" / "processed"
 
+    # conditional-request cache for source API fetchers (data/http_cache/, opt-in:
+    # every stored response costs a disk write + fsync)
+    http_cache: bool = os.getenv("HTTP_CACHE", "false").lower() in ("1", "true", "yes")
+    # BrightSky URLs contain the date (rarely a hit): opt-in on top of http_cache
+    brightsky_http_cache: bool = os.getenv("BRIGHTSKY_HTTP_CACHE", "false").lower() in ("1", "true", "yes")
+    # cache entries not stored/revalidated within this many seconds are deleted (0 = keep)
+    http_cache_max_age_s: float = float(os.getenv("HTTP_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+    # cached responses younger than this are served without a request (0 = always revalidate)
+    hs_cache_ttl_s: float = float(os.getenv("HS_CACHE_TTL", "30"))
+    brightsky_cache_ttl_s: float = float(os.getenv("BRIGHTSKY_CACHE_TTL", "0"))
+
+    # raw layer: compression of new raw files (none|gzip|xz) and of monthly archives (gzip|xz)
+    raw_compression: str = os.getenv("RAW_COMPRESSION", "none")
+    raw_archive_compression: str = os.getenv("RAW_ARCHIVE_COMPRESSION", "gzip")
+
+    # processed layer: additionally write processed_<run_id>__<provider>.parquet (needs pyarrow)
+    processed_parquet: bool = os.getenv("PROCESSED_PARQUET", "false").lower() in ("1", "true", "yes")
+
     # elasticsearch
     es_url: str = os.getenv("ES_URL", "http://localhost:9200")
     index_name: str = os.getenv("ES_INDEX", "data-2026")
     alias_name: str = os.getenv("ES_ALIAS", "all-data")
+    # none: write to alias/index_name; monthly: route by timestamp into <index_prefix>-YYYY.MM
+    index_partitioning: str = os.getenv("ES_INDEX_PARTITIONING", "none")
+    index_prefix: str = os.getenv("ES_INDEX_PREFIX", "data")
+    es_timeout: float = float(os.getenv("ES_TIMEOUT", "60"))
+    es_pool_size: int = int(os.getenv("ES_POOL_SIZE", "10"))
+    # gzip request bodies / accept gzip responses
+    es_compression: bool = os.getenv("ES_COMPRESSION", "false").lower() in ("1", "true", "yes")
+
+    # bulk loading (workers=1 -> sequential, max_in_flight=0 -> 2 * workers)
+    bulk_workers: int = int(os.getenv("ES_BULK_WORKERS", "1"))
+    bulk_max_in_flight: int = int(os.getenv("ES_BULK_MAX_IN_FLIGHT", "0"))
+
+    # adaptive bulk batching by payload bytes (target_bytes=0 -> fixed CHUNK_SIZE docs)
+    bulk_target_bytes: int = int(os.getenv("ES_BULK_TARGET_BYTES", "0"))
+    bulk_max_bytes: int = int(os.getenv("ES_BULK_MAX_BYTES", str(50 * 1024 * 1024)))
+    bulk_target_latency_s: float = float(os.getenv("ES_BULK_TARGET_LATENCY", "2.0"))
+
+    # item-level retry of rejected bulk actions (jittered exponential backoff)
+    bulk_max_retries: int = int(os.getenv("ES_BULK_MAX_RETRIES", "5"))
+    bulk_retry_base_s: float = float(os.getenv("ES_BULK_RETRY_BASE", "0.5"))
+
+    # skip documents whose measurement fields are unchanged since the last load
+    fingerprint_cache: bool = os.getenv("ES_FINGERPRINT_CACHE", "false").lower() in ("1", "true", "yes")
 
     # file naming
     raw_prefix: str = "raw_"
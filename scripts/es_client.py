@@ -0,0 +1,165 @@
+# See documentation:
+# docs/pipeline.md
+
+import gzip
+import http.client
+import queue
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from scripts.config import SETTINGS
+
+# Errors that indicate a pooled keep-alive connection was closed by the server
+# while idle. The request is retried once on a fresh connection.
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+# Bodies below this size are sent uncompressed (gzip overhead > savings)
+COMPRESS_MIN_BYTES = 1024
+# Low level: NDJSON with repeated keys compresses well already, keeps CPU cost small
+GZIP_LEVEL = 3
+
+
+class EsConnectionError(RuntimeError):
+    """Raised when Elasticsearch cannot be reached (no HTTP status available)."""
+
+
+class EsClient:
+    """
+    Minimal Elasticsearch HTTP client with a pool of persistent HTTP/1.1 connections.
+
+    HTTP error statuses are returned to the caller as (status, text);
+    transport errors are raised as EsConnectionError.
+    Thread-safe: each request checks out its own connection.
+
+    With compress=True request bodies are gzipped (Content-Encoding: gzip)
+    and gzip-encoded responses are accepted and decoded transparently.
+    """
+
+    def __init__(self, base_url: str, timeout: float, pool_size: int, compress: bool = False) -> None:
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported ES URL scheme: {base_url}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.timeout = timeout
+        self.compress = compress
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(maxsize=max(1, pool_size))
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def _checkout(self) -> Tuple[http.client.HTTPConnection, bool]:
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def _checkin(self, conn: http.client.HTTPConnection) -> None:
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        body: str | bytes | None = None,
+        content_type: str = "application/json",
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Tuple[int, str]:
+        """
+        Send a request and return (status, response_text).
+
+        `url` may be a full URL (scheme and host are ignored) or a path.
+        """
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        hdrs = {"Content-Type": content_type, "Connection": "keep-alive"}
+        if self.compress:
+            hdrs["Accept-Encoding"] = "gzip"
+            if data is not None and len(data) >= COMPRESS_MIN_BYTES:
+                data = gzip.compress(data, compresslevel=GZIP_LEVEL)
+                hdrs["Content-Encoding"] = "gzip"
+        if headers:
+            hdrs.update(headers)
+
+        conn, reused = self._checkout()
+        try:
+            try:
+                resp = self._send(conn, method, path, data, hdrs)
+            except STALE_CONNECTION_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+                conn = self._new_connection()
+                resp = self._send(conn, method, path, data, hdrs)
+            payload = resp.read()
+            if (resp.getheader("Content-Encoding") or "").lower() == "gzip":
+                payload = gzip.decompress(payload)
+        except (OSError, EOFError, http.client.HTTPException) as e:
+            conn.close()
+            raise EsConnectionError(f"{method} {self.scheme}://{self.host}:{self.port}{path} failed: {e}") from e
+
+        if resp.will_close:
+            conn.close()
+        else:
+            self._checkin(conn)
+
+        return resp.status, payload.decode("utf-8")
+
+    @staticmethod
+    def _send(
+        conn: http.client.HTTPConnection,
+        method: str,
+        path: str,
+        data: bytes | None,
+        headers: Dict[str, str],
+    ) -> http.client.HTTPResponse:
+        conn.request(method, path, body=data, headers=headers)
+        return conn.getresponse()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_CLIENTS: Dict[str, EsClient] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_client(url: str | None = None) -> EsClient:
+    """
+    Return the shared client for the host of `url` (default: SETTINGS.es_url).
+
+    One pool per scheme://host:port, created lazily.
+    """
+    parts = urlsplit(url or SETTINGS.es_url)
+    key = f"{parts.scheme}://{parts.netloc}"
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            client = EsClient(
+                key,
+                timeout=SETTINGS.es_timeout,
+                pool_size=SETTINGS.es_pool_size,
+                compress=SETTINGS.es_compression,
+            )
+            _CLIENTS[key] = client
+        return client
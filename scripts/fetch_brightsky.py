@@ -1,15 +1,29 @@
 # See documentation:
 # docs/06_ingestion_pipeline.md
 
-import json
+import argparse
+import fcntl
 import os
-import urllib.request
-import urllib.error
-from datetime import datetime, timezone
+import re
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Callable, Dict, List, Tuple
 
+from scripts import codec, metrics, raw_store
 from scripts.config import SETTINGS
+from scripts.http_cache import cache_dir_for, cached_get
+
+PROVIDER = "brightsky"
+
+# per-host rate limit state next to the raw layer: data/ratelimit/<host>.next
+RATE_LIMIT_DIR = "ratelimit"
+
+_LOCATION_NAME_RE = re.compile(r"^[a-z0-9][a-z0-9-]*$")
 
 
 def utc_stamp_compact() -> str:
@@ -21,47 +35,304 @@ def ensure_dir(path: Path) -> None:
 
 
 def http_get_json(url: str, timeout: int = 30) -> Dict[str, Any]:
-    req = urllib.request.Request(url, headers={"Accept": "application/json"}, method="GET")
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        body = resp.read().decode("utf-8")
-        if resp.status != 200:
-            raise RuntimeError(f"HTTP {resp.status}: {body[:200]}")
-        ct = (resp.headers.get("Content-Type") or "").lower()
-        if "json" not in ct:
-            raise RuntimeError(f"Unexpected Content-Type: {ct}, body starts: {body[:200]}")
-        return json.loads(body)
+    cache_dir = cache_dir_for(SETTINGS.raw_dir) if SETTINGS.http_cache and SETTINGS.brightsky_http_cache else None
+    t0 = time.perf_counter()
+    body, ct, source = cached_get(
+        url, cache_dir, ttl_s=SETTINGS.brightsky_cache_ttl_s, timeout=timeout, headers={"Accept": "application/json"}, max_age_s=SETTINGS.http_cache_max_age_s
+    )
+    metrics.observe("pipeline_fetch_seconds", time.perf_counter() - t0, "Fetch request latency", provider=PROVIDER, source=source)
+    metrics.inc("pipeline_fetch_bytes_total", len(body), "Fetched response bytes", provider=PROVIDER, source=source)
+    if source != "network":
+        print(f"HTTP cache hit ({source}): {url}")
+    if "json" not in ct:
+        raise RuntimeError(f"Unexpected Content-Type: {ct}, body starts: {body[:200]!r}")
+    return codec.loads(body)
 
 
-def main(run_id: str | None = None) -> None:
-    ensure_dir(SETTINGS.raw_dir)
+@dataclass(frozen=True)
+class Location:
+    """A BrightSky query point; name="" is the legacy single location (WORMS_LAT/WORMS_LON)."""
+
+    name: str
+    lat: str
+    lon: str
+
+    @property
+    def raw_provider(self) -> str:
+        # file suffix of raw_<run_id>__<raw_provider>.json; documents keep provider=brightsky
+        return f"{PROVIDER}-{self.name}" if self.name else PROVIDER
+
+
+def base_url() -> str:
+    return os.getenv("BRIGHTSKY_BASE", "https://api.brightsky.dev")
 
-    provider = "brightsky"
+
+def location() -> Tuple[str, str, str]:
     lat = os.getenv("WORMS_LAT", "49.6")
     lon = os.getenv("WORMS_LON", "8.36")
-    base = os.getenv("BRIGHTSKY_BASE", "https://api.brightsky.dev")
+    return lat, lon, base_url()
 
-    ts_fetch = run_id if run_id else utc_stamp_compact()
-    day = run_id if run_id else datetime.now(timezone.utc).strftime("%Y-%m-%d")
 
-    out_file = SETTINGS.raw_dir / f"raw_{ts_fetch}__{provider}.json"
-    url = f"{base}/weather?lat={lat}&lon={lon}&date={day}"
+def _parse_location(name: str, lat: Any, lon: Any) -> Location:
+    name = str(name).strip().lower()
+    if not _LOCATION_NAME_RE.match(name):
+        raise ValueError(f"Invalid location name {name!r} (allowed: a-z, 0-9, -)")
+    return Location(name, str(lat).strip(), str(lon).strip())
 
-    print(f"Fetching BrightSky: {url}")
-    payload = http_get_json(url, timeout=30)
 
+def locations() -> List[Location]:
+    """
+    Configured query points:
+
+    - BRIGHTSKY_LOCATIONS_FILE: JSON list of {"name", "lat", "lon"}
+    - BRIGHTSKY_LOCATIONS: "name:lat:lon,name:lat:lon"
+    - otherwise the single WORMS_LAT/WORMS_LON point (legacy file naming)
+    """
+    path = os.getenv("BRIGHTSKY_LOCATIONS_FILE", "").strip()
+    spec = os.getenv("BRIGHTSKY_LOCATIONS", "").strip()
+    if path:
+        items = codec.loads(Path(path).read_bytes())
+        locs = [_parse_location(i["name"], i["lat"], i["lon"]) for i in items]
+    elif spec:
+        locs = []
+        for part in spec.split(","):
+            fields = part.strip().split(":")
+            if len(fields) != 3:
+                raise ValueError(f"Invalid BRIGHTSKY_LOCATIONS entry {part!r}, expected name:lat:lon")
+            locs.append(_parse_location(*fields))
+    else:
+        lat, lon, _ = location()
+        return [Location("", lat, lon)]
+
+    names = [loc.name for loc in locs]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate location names: {names}")
+    return locs
+
+
+def write_raw(ts_fetch: str, day: str, loc: Location, url: str, payload: Dict[str, Any]) -> Path:
+    """Write one raw file in the raw_<run_id>__<raw_provider>.json[.gz|.xz] layout."""
     raw = {
         "fetched_at": utc_stamp_compact(),
-        "provider": provider,
-        "lat": lat,
-        "lon": lon,
+        "provider": PROVIDER,
+        "location": loc.name or None,
+        "lat": loc.lat,
+        "lon": loc.lon,
         "date": day,
         "endpoint": url,
         "payload": payload,
     }
+    return raw_store.write_raw(SETTINGS.raw_dir, ts_fetch, loc.raw_provider, raw)
+
+
+class RateLimiter:
+    """
+    At most `rate_per_s` request starts per second, shared by every thread
+    and process that uses the same state file.
+
+    The next free start time (wall clock) is kept in `state_path` and updated
+    under an exclusive flock, so the mapped fetch tasks of a DAG run (separate
+    Celery processes, data/ shared between the workers) are limited together.
+    """
+
+    def __init__(self, rate_per_s: float, state_path: Path) -> None:
+        self.interval = 1.0 / rate_per_s if rate_per_s > 0 else 0.0
+        self.state_path = state_path
+
+    def wait(self) -> None:
+        if self.interval <= 0:
+            return
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        self.state_path.touch(exist_ok=True)
+        # every open() is its own lock holder, so threads of one process queue up as well
+        with self.state_path.open("r+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                try:
+                    next_start = float(f.read() or 0)
+                except ValueError:
+                    next_start = 0.0
+                now = time.time()
+                start = max(now, next_start)
+                f.seek(0)
+                f.truncate()
+                f.write(f"{start + self.interval:.6f}".encode("ascii"))
+                # visible to the next holder before the lock is released
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        if start > now:
+            time.sleep(start - now)
+
+
+def host_limiter(url: str) -> RateLimiter:
+    """RateLimiter shared per API host across processes (BRIGHTSKY_RATE_LIMIT requests/s)."""
+    host = urllib.parse.urlsplit(url).netloc
+    rate = float(os.getenv("BRIGHTSKY_RATE_LIMIT", "5"))
+    return RateLimiter(rate, SETTINGS.raw_dir.parent / RATE_LIMIT_DIR / f"{host}.next")
+
+
+def date_windows(start: date, end: date, window_days: int) -> List[Tuple[date, date]]:
+    """Split the inclusive range [start, end] into (first_day, last_day) windows."""
+    if end < start:
+        raise ValueError(f"Backfill end {end} is before start {start}")
+    windows = []
+    first = start
+    while first <= end:
+        last = min(end, first + timedelta(days=window_days - 1))
+        windows.append((first, last))
+        first = last + timedelta(days=1)
+    return windows
+
+
+def split_by_day(payload: Dict[str, Any], first: date, last: date) -> Dict[str, Dict[str, Any]]:
+    """
+    Split a multi-day BrightSky payload into one payload per UTC day.
+
+    Records outside [first, last] (e.g. the closing midnight record) are dropped;
+    they belong to the neighbouring window.
+    """
+    days = {
+        (first + timedelta(days=i)).isoformat(): []
+        for i in range((last - first).days + 1)
+    }
+    for w in payload.get("weather") or []:
+        day = (w.get("timestamp") or "")[:10]
+        if day in days:
+            days[day].append(w)
+
+    rest = {k: v for k, v in payload.items() if k != "weather"}
+    return {day: {**rest, "weather": records} for day, records in days.items()}
+
+
+def fetch_window(base: str, loc: Location, first: date, last: date, limiter: RateLimiter) -> List[Path]:
+    """Fetch one window with date/last_date and write one raw file per day."""
+    params = {
+        "lat": loc.lat,
+        "lon": loc.lon,
+        "date": first.isoformat(),
+        "last_date": (last + timedelta(days=1)).isoformat(),
+    }
+    url = f"{base}/weather?{urllib.parse.urlencode(params)}"
+    limiter.wait()
+    payload = http_get_json(url, timeout=30)
+
+    return [
+        write_raw(day, day, loc, url, day_payload)
+        for day, day_payload in split_by_day(payload, first, last).items()
+    ]
+
+
+def fetch_day(base: str, loc: Location, ts_fetch: str, day: str, limiter: RateLimiter) -> Path:
+    """Fetch one day for one location (daily run)."""
+    url = f"{base}/weather?lat={loc.lat}&lon={loc.lon}&date={day}"
+    limiter.wait()
+    print(f"Fetching BrightSky: {url}")
+    payload = http_get_json(url, timeout=30)
+    return write_raw(ts_fetch, day, loc, url, payload)
+
+
+def run_tasks(tasks: Dict[str, Callable[[], List[Path]]], workers: int) -> List[Path]:
+    """
+    Run fetch tasks on a bounded thread pool.
+
+    Failed tasks are reported together after all other tasks have written
+    their raw files.
+    """
+    written: List[Path] = []
+    failed: List[str] = []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="brightsky") as pool:
+        futures = {pool.submit(task): label for label, task in tasks.items()}
+        for fut in as_completed(futures):
+            label = futures[fut]
+            try:
+                files = fut.result()
+            except Exception as e:
+                failed.append(f"{label}: {e}")
+                continue
+            written.extend(files)
+            print(f"{label}: {len(files)} raw files")
+
+    if failed:
+        raise RuntimeError(f"BrightSky fetch failed for {len(failed)} windows: {sorted(failed)}")
+    return sorted(written)
+
+
+def backfill(start: date, end: date) -> List[Path]:
+    """
+    Fetch a date range concurrently in API-friendly windows, for every location.
+
+    Writes raw_<YYYY-MM-DD>__<raw_provider>.json per day and location, so
+    preprocess_brightsky can run per day unchanged. Failed windows are
+    reported together after all other windows have been written.
+    """
+    ensure_dir(SETTINGS.raw_dir)
+    base = base_url()
+    locs = locations()
+    window_days = int(os.getenv("BRIGHTSKY_WINDOW_DAYS", "10"))
+    workers = int(os.getenv("BRIGHTSKY_BACKFILL_WORKERS", "4"))
+    limiter = host_limiter(base)
+
+    windows = date_windows(start, end, window_days)
+    print(f"Backfill BrightSky {start}..{end}: {len(windows)} windows x {len(locs)} locations, {workers} workers")
+
+    tasks: Dict[str, Callable[[], List[Path]]] = {
+        f"{loc.raw_provider} {first}..{last}": partial(fetch_window, base, loc, first, last, limiter)
+        for loc in locs
+        for first, last in windows
+    }
+    written = run_tasks(tasks, workers)
+    print(f"Backfill done: {len(written)} raw files")
+    return written
+
+
+def run_day(run_id: str | None) -> Tuple[str, str]:
+    """(ts_fetch, day) of a run: the Airflow ds, or now for manual runs."""
+    ts_fetch = run_id if run_id else utc_stamp_compact()
+    day = run_id if run_id else datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    return ts_fetch, day
+
+
+def fetch_location(run_id: str | None, name: str) -> Path:
+    """Fetch one day for one configured location (one mapped Airflow task per location)."""
+    ensure_dir(SETTINGS.raw_dir)
+    by_name = {loc.name: loc for loc in locations()}
+    if name not in by_name:
+        raise ValueError(f"Unknown BrightSky location {name!r}, configured: {sorted(by_name)}")
+    base = base_url()
+    ts_fetch, day = run_day(run_id)
+    return fetch_day(base, by_name[name], ts_fetch, day, host_limiter(base))
+
 
-    out_file.write_text(json.dumps(raw, ensure_ascii=False, indent=2), encoding="utf-8")
-    print(f"Wrote raw file: {out_file}")
+def fetch_all(run_id: str | None = None) -> List[Path]:
+    """Fetch one day for all configured locations (BRIGHTSKY_FETCH_WORKERS in parallel)."""
+    ensure_dir(SETTINGS.raw_dir)
+
+    base = base_url()
+    locs = locations()
+    workers = int(os.getenv("BRIGHTSKY_FETCH_WORKERS", "8"))
+    limiter = host_limiter(base)
+
+    ts_fetch, day = run_day(run_id)
+
+    tasks: Dict[str, Callable[[], List[Path]]] = {
+        loc.raw_provider: (lambda loc=loc: [fetch_day(base, loc, ts_fetch, day, limiter)])
+        for loc in locs
+    }
+    return run_tasks(tasks, min(workers, len(locs)))
+
+
+def main(run_id: str | None = None) -> None:
+    for out_file in fetch_all(run_id):
+        print(f"Wrote raw file: {out_file}")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Fetch BrightSky weather data.")
+    parser.add_argument("--run-id", default=None, help="day to fetch (YYYY-MM-DD), default: today")
+    parser.add_argument("--backfill", nargs=2, metavar=("START", "END"), help="fetch an inclusive date range")
+    args = parser.parse_args()
+    if args.backfill:
+        backfill(date.fromisoformat(args.backfill[0]), date.fromisoformat(args.backfill[1]))
+    else:
+        main(args.run_id)
@@ -2,15 +2,15 @@
 # docs/05_ingestion_pipeline.md
 
 
-import json
 import os
-import urllib.request
-import urllib.error
+import time
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict
 
+from scripts import codec, metrics, raw_store
 from scripts.config import SETTINGS
+from scripts.http_cache import cache_dir_for, cached_get
 
 
 def utc_stamp_compact() -> str:
@@ -22,23 +22,24 @@ def ensure_dir(path: Path) -> None:
 
 
 def http_get_json(url: str, timeout: int = 30) -> Dict[str, Any]:
-    req = urllib.request.Request(url, headers={"Accept": "application/json"}, method="GET")
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        ct = (resp.headers.get("Content-Type") or "").lower()
-        body = resp.read().decode("utf-8")
-        if resp.status != 200:
-            raise RuntimeError(f"HTTP {resp.status}: {body[:200]}")
-        if "json" not in ct:
-            raise RuntimeError(f"Unexpected Content-Type: {ct}, body starts: {body[:200]}")
-        return json.loads(body)
+    cache_dir = cache_dir_for(SETTINGS.raw_dir) if SETTINGS.http_cache else None
+    t0 = time.perf_counter()
+    body, ct, source = cached_get(
+        url, cache_dir, ttl_s=SETTINGS.hs_cache_ttl_s, timeout=timeout, headers={"Accept": "application/json"}, max_age_s=SETTINGS.http_cache_max_age_s
+    )
+    metrics.observe("pipeline_fetch_seconds", time.perf_counter() - t0, "Fetch request latency", provider="hs-worms", source=source)
+    metrics.inc("pipeline_fetch_bytes_total", len(body), "Fetched response bytes", provider="hs-worms", source=source)
+    if source != "network":
+        print(f"HTTP cache hit ({source}): {url}")
+    if "json" not in ct:
+        raise RuntimeError(f"Unexpected Content-Type: {ct}, body starts: {body[:200]!r}")
+    return codec.loads(body)
 
 
 def main(run_id: str | None = None) -> None:
     ensure_dir(SETTINGS.raw_dir)
 
     ts_fetch = run_id if run_id else utc_stamp_compact()
-    out_file = SETTINGS.raw_dir / f"raw_{ts_fetch}__hs-worms.json"
-
 
     url = os.getenv("HS_WETTER_URL", "https://wetter.hs-worms.de/api/v3/data").strip()
     print(f"Fetching HS: {url}")
@@ -52,7 +53,7 @@ def main(run_id: str | None = None) -> None:
         "payload": payload,
     }
 
-    out_file.write_text(json.dumps(raw, ensure_ascii=False, indent=2), encoding="utf-8")
+    out_file = raw_store.write_raw(SETTINGS.raw_dir, ts_fetch, "hs-worms", raw)
     print(f"Wrote raw file: {out_file}")
 
 
@@ -0,0 +1,110 @@
+# See documentation:
+# docs/pipeline.md
+
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+from scripts import codec
+from scripts.load_manifest import without_processed_at
+
+FINGERPRINT_FILE = "fingerprints.sqlite"
+
+# Fields that change on every preprocess run without changing the measurement
+NON_MEASUREMENT_FIELDS = {"doc_id", "processed_at"}
+
+# SQLite limits the number of bound parameters per statement
+LOOKUP_BATCH = 500
+
+
+def fingerprint_path(processed_dir: Path) -> Path:
+    """Store lives next to the processed layer: data/fingerprints.sqlite."""
+    return processed_dir.parent / FINGERPRINT_FILE
+
+
+def fingerprint(doc: Dict[str, Any]) -> bytes:
+    """Hash of the measurement fields of a document (key order independent)."""
+    fields = [[k, doc[k]] for k in sorted(doc) if k not in NON_MEASUREMENT_FIELDS]
+    return hashlib.sha256(codec.dumps(fields)).digest()[:16]
+
+
+def line_fingerprint(line: bytes) -> bytes:
+    """Hash of a raw NDJSON line without its "processed_at" (the line is not decoded)."""
+    return hashlib.sha256(without_processed_at(line)).digest()[:16]
+
+
+def _doc_id_and_fingerprint(item: Any) -> Tuple[str, bytes]:
+    # raw (doc_id, line bytes) pair from the loader or a plain dict document (Parquet)
+    if isinstance(item, tuple):
+        return item[0], line_fingerprint(item[1])
+    return str(item.get("doc_id")), fingerprint(item)
+
+
+class FingerprintFilter:
+    """
+    Drops documents whose measurement fields are unchanged since the last
+    successful load into the same target, and duplicate doc_ids within a chunk.
+
+    New fingerprints are staged in memory and only written to the store on
+    commit(), i.e. after the whole load succeeded.
+    """
+
+    def __init__(self, path: Path, target: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.target = target
+        # timeout: concurrent per-file load tasks commit into the same store
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            " target TEXT NOT NULL, doc_id TEXT NOT NULL, fp BLOB NOT NULL,"
+            " PRIMARY KEY (target, doc_id)) WITHOUT ROWID"
+        )
+        self.staged: Dict[str, bytes] = {}
+        self.skipped_unchanged = 0
+        self.skipped_duplicates = 0
+
+    def _lookup(self, doc_ids: List[str]) -> Dict[str, bytes]:
+        found: Dict[str, bytes] = {}
+        for i in range(0, len(doc_ids), LOOKUP_BATCH):
+            batch = doc_ids[i:i + LOOKUP_BATCH]
+            marks = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT doc_id, fp FROM fingerprints WHERE target = ? AND doc_id IN ({marks})",
+                [self.target, *batch],
+            )
+            found.update(rows)
+        return found
+
+    def filter(self, part: Iterable[Any]) -> List[Any]:
+        """Return the documents of a chunk that actually need to be indexed."""
+        latest: Dict[str, Tuple[Any, bytes]] = {}
+        n = 0
+        for item in part:
+            n += 1
+            doc_id, fp = _doc_id_and_fingerprint(item)
+            # last occurrence wins, as it would in Elasticsearch
+            latest.pop(doc_id, None)
+            latest[doc_id] = (item, fp)
+        self.skipped_duplicates += n - len(latest)
+
+        stored = self._lookup([d for d in latest if d not in self.staged])
+        out: List[Any] = []
+        for doc_id, (item, fp) in latest.items():
+            if self.staged.get(doc_id, stored.get(doc_id)) == fp:
+                self.skipped_unchanged += 1
+                continue
+            self.staged[doc_id] = fp
+            out.append(item)
+        return out
+
+    def commit(self) -> None:
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO fingerprints (target, doc_id, fp) VALUES (?, ?, ?)",
+                ((self.target, doc_id, fp) for doc_id, fp in self.staged.items()),
+            )
+        self.staged.clear()
+
+    def close(self) -> None:
+        self.conn.close()
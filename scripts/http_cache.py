@@ -0,0 +1,148 @@
+# See documentation:
+# docs/06_ingestion_pipeline.md
+
+import hashlib
+import os
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from scripts import codec
+
+CACHE_DIR_NAME = "http_cache"
+# a cache directory is scanned for expired entries at most this often per process
+PRUNE_INTERVAL_S = 3600.0
+
+_LAST_PRUNE: Dict[Path, float] = {}
+
+
+def cache_dir_for(raw_dir: Path) -> Path:
+    """Cache lives next to the raw layer: data/http_cache/."""
+    return raw_dir.parent / CACHE_DIR_NAME
+
+
+def _paths(cache_dir: Path, url: str) -> Tuple[Path, Path]:
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return cache_dir / f"{key}.meta.json", cache_dir / f"{key}.body"
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def _load_meta(meta_path: Path, body_path: Path) -> Optional[Dict[str, Any]]:
+    if not (meta_path.exists() and body_path.exists()):
+        return None
+    try:
+        return codec.loads(meta_path.read_bytes())
+    except ValueError:
+        return None
+
+
+def prune(cache_dir: Path, max_age_s: float, now: Optional[float] = None) -> int:
+    """
+    Delete entries not stored or revalidated within max_age_s (meta file mtime)
+    and leftover temp files. Returns the number of removed entries.
+    """
+    if not cache_dir.is_dir():
+        return 0
+    cutoff = (now if now is not None else time.time()) - max_age_s
+    removed = 0
+    for meta_path in cache_dir.glob("*.meta.json"):
+        try:
+            if meta_path.stat().st_mtime >= cutoff:
+                continue
+        except FileNotFoundError:
+            continue
+        key = meta_path.name[: -len(".meta.json")]
+        for path in (meta_path, cache_dir / f"{key}.body"):
+            path.unlink(missing_ok=True)
+        removed += 1
+    for tmp in cache_dir.glob("*.tmp"):
+        if tmp.stat().st_mtime < cutoff:
+            tmp.unlink(missing_ok=True)
+    return removed
+
+
+def _maybe_prune(cache_dir: Path, max_age_s: float) -> None:
+    now = time.time()
+    if now - _LAST_PRUNE.get(cache_dir, 0.0) < PRUNE_INTERVAL_S:
+        return
+    _LAST_PRUNE[cache_dir] = now
+    removed = prune(cache_dir, max_age_s, now)
+    if removed:
+        print(f"HTTP cache: pruned {removed} entries older than {max_age_s:.0f}s")
+
+
+def cached_get(
+    url: str,
+    cache_dir: Optional[Path],
+    ttl_s: float = 0.0,
+    timeout: int = 30,
+    headers: Optional[Dict[str, str]] = None,
+    max_age_s: float = 0.0,
+) -> Tuple[bytes, str, str]:
+    """
+    GET with an on-disk conditional-request cache.
+
+    - cached entry younger than ttl_s: returned without any request
+    - otherwise revalidated with If-None-Match / If-Modified-Since;
+      304 returns the cached body and renews the entry
+    - 200 replaces the entry (body + ETag/Last-Modified/Content-Type)
+
+    cache_dir=None disables caching (plain GET). With max_age_s > 0 expired
+    entries of cache_dir are pruned (at most once per PRUNE_INTERVAL_S).
+
+    Returns (body, content_type, source) with source in {"ttl", "304", "network"}.
+    """
+    meta = None
+    if cache_dir is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        if max_age_s > 0:
+            _maybe_prune(cache_dir, max_age_s)
+        meta_path, body_path = _paths(cache_dir, url)
+        meta = _load_meta(meta_path, body_path)
+
+    if meta and ttl_s > 0 and time.time() - meta.get("stored_at", 0) < ttl_s:
+        return body_path.read_bytes(), meta.get("content_type", ""), "ttl"
+
+    req_headers = dict(headers or {})
+    if meta:
+        if meta.get("etag"):
+            req_headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            req_headers["If-Modified-Since"] = meta["last_modified"]
+
+    req = urllib.request.Request(url, headers=req_headers, method="GET")
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            body = resp.read()
+            status = resp.status
+            resp_headers = resp.headers
+    except urllib.error.HTTPError as e:
+        if e.code == 304 and meta:
+            meta["stored_at"] = time.time()
+            _atomic_write(meta_path, codec.dumps(meta))
+            return body_path.read_bytes(), meta.get("content_type", ""), "304"
+        raise
+
+    if status != 200:
+        raise RuntimeError(f"HTTP {status}: {body[:200]!r}")
+
+    content_type = (resp_headers.get("Content-Type") or "").lower()
+    if cache_dir is None:
+        return body, content_type, "network"
+
+    _atomic_write(body_path, body)
+    _atomic_write(meta_path, codec.dumps({
+        "url": url,
+        "etag": resp_headers.get("ETag"),
+        "last_modified": resp_headers.get("Last-Modified"),
+        "content_type": content_type,
+        "stored_at": time.time(),
+    }))
+    return body, content_type, "network"
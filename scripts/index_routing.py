@@ -0,0 +1,95 @@
+# See documentation:
+# docs/09_elasticsearch_index_design.md
+
+# ------------------------------------------------------------
+# Time-partitioned indices
+#
+# With ES_INDEX_PARTITIONING=monthly every document is written to
+# <prefix>-<YYYY>.<MM> by its "timestamp" (e.g. data-2026.03).
+# The index template (pattern data-*) applies on creation; each
+# monthly index is attached to the read alias (all-data).
+# ------------------------------------------------------------
+
+import re
+import threading
+from datetime import date
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from scripts import codec
+from scripts.es_client import get_client
+
+_MONTH_RE = re.compile(r"^(\d{4})-(\d{2})")
+_TS_PREFIXES = (b'"timestamp":"', b'"timestamp": "')
+
+# (es_url, index) pairs already created/attached in this process
+_ENSURED: Set[Tuple[str, str]] = set()
+_ENSURED_LOCK = threading.Lock()
+
+
+def monthly_index(timestamp: Optional[str], prefix: str = "data") -> str:
+    """'2026-03-01T00:00:00+00:00' -> 'data-2026.03'."""
+    m = _MONTH_RE.match(timestamp or "")
+    if not m:
+        raise ValueError(f"Cannot route document without valid timestamp: {timestamp!r}")
+    return f"{prefix}-{m.group(1)}.{m.group(2)}"
+
+
+def timestamp_of_line(line: bytes) -> Optional[str]:
+    """Read "timestamp" from a processed NDJSON line without decoding the whole document."""
+    for prefix in _TS_PREFIXES:
+        start = line.find(prefix)
+        if start >= 0:
+            start += len(prefix)
+            end = line.find(b'"', start)
+            return line[start:end].decode("utf-8") if end > 0 else None
+    return codec.loads(line).get("timestamp")
+
+
+def indices_for_range(start: date, end: date, prefix: str = "data") -> List[str]:
+    """Monthly indices covering [start, end]; query only these for narrow time ranges."""
+    out = []
+    y, m = start.year, start.month
+    while (y, m) <= (end.year, end.month):
+        out.append(f"{prefix}-{y:04d}.{m:02d}")
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+    return out
+
+
+def ensure_index(es_url: str, index: str, alias: str) -> None:
+    """
+    Create a monthly index (settings/mappings from the index template) and
+    add it to the alias. Idempotent; each index is checked once per process
+    and cluster.
+    """
+    es = es_url.rstrip("/")
+    with _ENSURED_LOCK:
+        if (es, index) in _ENSURED:
+            return
+
+    client = get_client(es)
+    status, text = client.request("PUT", f"{es}/{index}", b"{}")
+    if status >= 300 and "resource_already_exists_exception" not in text:
+        raise RuntimeError(f"Failed to create index {index}: status={status}, body={text[:200]}")
+
+    actions = {"actions": [{"add": {"index": index, "alias": alias}}]}
+    status, text = client.request("POST", f"{es}/_aliases", codec.dumps(actions))
+    if status >= 300:
+        raise RuntimeError(f"Failed to add {index} to alias {alias}: status={status}, body={text[:200]}")
+
+    with _ENSURED_LOCK:
+        _ENSURED.add((es, index))
+    print(f"index {index}: ready (alias {alias})")
+
+
+def ensure_indices(es_url: str, indices: Iterable[str], alias: str) -> None:
+    for index in sorted(set(indices)):
+        ensure_index(es_url, index, alias)
+
+
+def router(partitioning: str, prefix: str) -> Optional[Callable[[Optional[str]], str]]:
+    """timestamp -> index function for the configured partitioning (None = single target)."""
+    if partitioning == "none":
+        return None
+    if partitioning == "monthly":
+        return lambda ts: monthly_index(ts, prefix)
+    raise ValueError(f"Unknown ES_INDEX_PARTITIONING={partitioning!r}, expected none|monthly")
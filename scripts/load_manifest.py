@@ -0,0 +1,135 @@
+# See documentation:
+# docs/pipeline.md
+
+import fcntl
+import hashlib
+import os
+import re
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+from scripts import codec
+
+MANIFEST_FILE = "load_manifest.json"
+GENERATION_FILE = "load_generation"
+
+# "processed_at" changes on every preprocess run without changing the data
+_PROCESSED_AT_RE = re.compile(rb'"processed_at":\s*"[^"]*"')
+
+
+def manifest_path(processed_dir: Path) -> Path:
+    """Manifest lives next to the processed layer: data/load_manifest.json."""
+    return processed_dir.parent / MANIFEST_FILE
+
+
+def generation_path(processed_dir: Path) -> Path:
+    """Load generation marker next to the manifest: data/load_generation."""
+    return processed_dir.parent / GENERATION_FILE
+
+
+def bump_generation(processed_dir: Path) -> str:
+    """
+    Mark that a load finished (new data is searchable).
+    Readers (read_service) drop cached results when the marker changes.
+    """
+    path = generation_path(processed_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    generation = f"{time.time_ns()}-{os.getpid()}"
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(generation, encoding="utf-8")
+    os.replace(tmp, path)
+    return generation
+
+
+def read_generation(processed_dir: Path) -> str:
+    """Current load generation ("" before the first load)."""
+    try:
+        return generation_path(processed_dir).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return ""
+
+
+def file_sha256(path: Path, block_size: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def without_processed_at(data: bytes) -> bytes:
+    """NDJSON line(s) with the "processed_at" member removed (bytes-level, no decoding)."""
+    return _PROCESSED_AT_RE.sub(b"", data)
+
+
+def content_sha256(path: Path, block_size: int = 1024 * 1024) -> str:
+    """
+    Hash of a processed file that ignores "processed_at", so re-running
+    preprocess on unchanged raw data keeps the digest.
+
+    NDJSON is hashed in blocks of whole lines; other formats (Parquet) by file bytes.
+    """
+    if path.suffix != ".ndjson":
+        return file_sha256(path, block_size)
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for lines in iter(lambda: f.readlines(block_size), []):
+            h.update(without_processed_at(b"".join(lines)))
+    return h.hexdigest()
+
+
+class LoadManifest:
+    """
+    JSON ledger of processed files that were successfully loaded into ES.
+
+    Entry per file name:
+        {"sha256": ..., "docs": n, "target": ..., "loaded_at": ...}
+
+    A file is considered loaded if its content hash (content_sha256) and
+    target are unchanged.
+    Several loaders (one per processed file) may save concurrently: save()
+    merges the recorded entries into the current file under a lock.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.files: Dict[str, Dict[str, Any]] = self._read()
+        self.recorded: Dict[str, Dict[str, Any]] = {}
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        if not self.path.exists():
+            return {}
+        return codec.loads(self.path.read_bytes()).get("files", {})
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(self.path.name + ".lock"), "wb") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def is_loaded(self, file: Path, digest: str, target: str) -> bool:
+        entry = self.files.get(file.name)
+        return bool(entry) and entry.get("sha256") == digest and entry.get("target") == target
+
+    def record(self, file: Path, digest: str, docs: int, target: str) -> None:
+        self.files[file.name] = self.recorded[file.name] = {
+            "sha256": digest,
+            "docs": docs,
+            "target": target,
+            "loaded_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    def save(self) -> None:
+        """Write atomically (tmp file + rename), so a crash never leaves a broken ledger."""
+        with self._locked():
+            self.files = {**self._read(), **self.recorded}
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_bytes(codec.dumps({"files": self.files}, indent=True))
+            os.replace(tmp, self.path)
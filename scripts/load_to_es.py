@@ -1,17 +1,57 @@
 # See documentation:
 # docs/pipeline.md
 
-import json
-import urllib.request
-import urllib.error
+import argparse
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 
+from scripts import codec, columnar, metrics
 from scripts.config import SETTINGS
+from scripts.es_client import EsConnectionError, get_client
+from scripts.fingerprints import FingerprintFilter, fingerprint_path
+from scripts.index_routing import ensure_indices, router, timestamp_of_line
+from scripts.load_manifest import LoadManifest, bump_generation, content_sha256, manifest_path
 
 PIPELINE_NAME = "standardize-v1"
 CHUNK_SIZE = 500
 
+# Only request what the loader evaluates. Per-item status is kept (a few bytes
+# per item) so item positions and the sent-vs-processed count stay verifiable;
+# _index/_id/_version/_shards/result of successful items are dropped.
+BULK_FILTER_PATH = "took,errors,items.*.status,items.*.error"
+
+# Limits for byte-based batching (SETTINGS.bulk_target_bytes > 0)
+MIN_BULK_BYTES = 256 * 1024
+MAX_DOCS_PER_BULK = 10_000
+REJECTED_ERROR_TYPES = {"es_rejected_execution_exception"}
+
+# Transient bulk failures that are resubmitted instead of failing the load
+RETRYABLE_STATUSES = {429, 503}
+RETRYABLE_ERROR_TYPES = {
+    "es_rejected_execution_exception",
+    "unavailable_shards_exception",
+    "no_shard_available_action_exception",
+}
+MAX_RETRY_DELAY_S = 30.0
+
+# A processed document as it is stored on disk: (doc_id, original JSON line bytes).
+# Bulk bodies are assembled from these without decoding/re-encoding the document.
+RawDoc = Tuple[str, bytes]
+BulkDoc = Union[Dict, RawDoc]
+
+# timestamp -> concrete index (time-partitioned indices)
+Router = Callable[[Optional[str]], str]
+
+# Prefixes of documents whose first key is doc_id (compact codec output / json.dumps defaults)
+_DOC_ID_PREFIXES = (b'{"doc_id": "', b'{"doc_id":"')
+
 
 def processed_files_for_run(processed_dir: Path, run_id: str | None) -> List[Path]:
     """
@@ -20,6 +60,9 @@ def processed_files_for_run(processed_dir: Path, run_id: str | None) -> List[Pat
     Naming convention:
         processed_<run_id>__<provider>.ndjson
 
+    A provider with only processed_<run_id>__<provider>.parquet is loaded
+    from the Parquet file (NDJSON is preferred when both exist).
+
     Fallback (without run_id):
         Loads only the most recent processed_*.ndjson file.
     """
@@ -31,23 +74,64 @@ def processed_files_for_run(processed_dir: Path, run_id: str | None) -> List[Pat
 
     pattern = f"processed_{run_id}__*.ndjson"
     files = sorted(processed_dir.glob(pattern))
+
+    # Parquet-only providers (NDJSON removed/not written) are loaded from Parquet
+    have = {f.stem for f in files}
+    files += [f for f in processed_dir.glob(f"processed_{run_id}__*.parquet") if f.stem not in have]
     if not files:
         raise FileNotFoundError(f"No {pattern} found in {processed_dir}")
-    return files
+    return sorted(files)
 
 
 def read_ndjson(path: Path) -> Iterable[Dict]:
     """Stream NDJSON file line by line."""
-    with path.open("r", encoding="utf-8") as f:
+    with path.open("rb") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield codec.loads(line)
+
+
+def extract_doc_id(line: bytes) -> str:
+    """
+    Read doc_id from a processed NDJSON line without decoding the whole document.
+
+    Fast path for lines starting with the doc_id key (as written by the
+    preprocess scripts); falls back to a full decode otherwise.
+    """
+    for prefix in _DOC_ID_PREFIXES:
+        if line.startswith(prefix):
+            end = line.find(b'"', len(prefix))
+            value = line[len(prefix):end] if end > 0 else b""
+            if value and b"\\" not in value:
+                return value.decode("utf-8")
+            break
+
+    doc_id = codec.loads(line).get("doc_id")
+    if not doc_id:
+        raise ValueError(f"Missing doc_id in document: {line[:200]!r}")
+    return str(doc_id)
+
+
+def read_ndjson_raw(path: Path) -> Iterable[RawDoc]:
+    """Stream NDJSON file as (doc_id, line bytes) pairs (no JSON round trip)."""
+    with path.open("rb") as f:
         for line in f:
             line = line.strip()
             if line:
-                yield json.loads(line)
+                yield extract_doc_id(line), line
+
 
+def read_processed(path: Path) -> Iterable[BulkDoc]:
+    """Documents of a processed file: raw NDJSON lines or decoded Parquet rows."""
+    if path.suffix == ".parquet":
+        return columnar.read_parquet_docs(path)
+    return read_ndjson_raw(path)
 
-def chunked(items: Iterable[Dict], size: int) -> Iterable[List[Dict]]:
+
+def chunked(items: Iterable[BulkDoc], size: int) -> Iterable[List[BulkDoc]]:
     """Split iterable into chunks of defined size."""
-    buf: List[Dict] = []
+    buf: List[BulkDoc] = []
     for x in items:
         buf.append(x)
         if len(buf) >= size:
@@ -57,21 +141,98 @@ def chunked(items: Iterable[Dict], size: int) -> Iterable[List[Dict]]:
         yield buf
 
 
-def http_request(method: str, url: str, body: Optional[str] = None, content_type: str = "application/json") -> Tuple[int, str]:
-    """Generic HTTP request helper for Elasticsearch communication."""
-    data = None if body is None else body.encode("utf-8")
-    req = urllib.request.Request(
-        url,
-        data=data,
-        method=method,
-        headers={"Content-Type": content_type},
-    )
-    try:
-        with urllib.request.urlopen(req, timeout=60) as resp:
-            return resp.status, resp.read().decode("utf-8")
-    except urllib.error.HTTPError as e:
-        text = e.read().decode("utf-8") if e.fp else ""
-        return e.code, text
+class AdaptiveBatchSizer:
+    """
+    Adjusts the bulk payload size (bytes) from observed cluster feedback.
+
+    - rejection (HTTP 429 / es_rejected_execution_exception): halve
+    - ES `took` or round-trip latency above target: shrink by 25 %
+    - both well below target: grow by 25 %
+
+    The result is always clamped to [min_bytes, max_bytes].
+    Thread-safe, so parallel bulk workers can report into one sizer.
+    """
+
+    def __init__(self, target_bytes: int, min_bytes: int, max_bytes: int, target_latency_s: float) -> None:
+        self.min_bytes = min(min_bytes, max_bytes)
+        self.max_bytes = max_bytes
+        self.target_latency_s = target_latency_s
+        self._target = self._clamp(target_bytes)
+        self._lock = threading.Lock()
+
+    def _clamp(self, value: float) -> int:
+        return int(min(self.max_bytes, max(self.min_bytes, value)))
+
+    @property
+    def target_bytes(self) -> int:
+        return self._target
+
+    def observe(self, latency_s: float, took_ms: Optional[int], rejected: bool) -> None:
+        server_s = (took_ms / 1000.0) if took_ms is not None else latency_s
+        with self._lock:
+            if rejected:
+                factor = 0.5
+            elif server_s > self.target_latency_s or latency_s > 2 * self.target_latency_s:
+                factor = 0.75
+            elif server_s < 0.5 * self.target_latency_s and latency_s < self.target_latency_s:
+                factor = 1.25
+            else:
+                return
+            self._target = self._clamp(self._target * factor)
+
+
+def doc_size(doc: BulkDoc) -> Tuple[str, int]:
+    """Return (doc_id, encoded size in bytes) of a document."""
+    if isinstance(doc, tuple):
+        return doc[0], len(doc[1])
+    return str(doc.get("doc_id", "")), len(codec.dumps(doc))
+
+
+def chunked_by_bytes(
+    items: Iterable[BulkDoc],
+    target: str,
+    sizer: AdaptiveBatchSizer,
+    max_docs: int = MAX_DOCS_PER_BULK,
+    route: Optional[Router] = None,
+) -> Iterable[List[BulkDoc]]:
+    """
+    Split iterable into chunks whose bulk payload stays below sizer.target_bytes.
+
+    The byte budget is re-read for every chunk, so feedback from completed
+    requests applies to the next chunk. A single document that does not fit
+    into sizer.max_bytes raises ValueError (it would exceed
+    http.max_content_length on the cluster). With route the action line
+    overhead is computed from the routed index name, as in the bulk body.
+    """
+    overheads: Dict[str, int] = {}
+
+    def action_overhead(index: str) -> int:
+        if index not in overheads:
+            overheads[index] = len(bulk_action(index, "")) + 2
+        return overheads[index]
+
+    buf: List[BulkDoc] = []
+    buf_bytes = 0
+    limit = sizer.target_bytes
+    for x in items:
+        doc_id, n = doc_size(x)
+        n += len(doc_id) + action_overhead(route(doc_timestamp(x)) if route else target)
+        if n > sizer.max_bytes:
+            raise ValueError(f"Document {doc_id} is {n} bytes, exceeds bulk limit {sizer.max_bytes}")
+        if buf and (buf_bytes + n > limit or len(buf) >= max_docs):
+            yield buf
+            buf = []
+            buf_bytes = 0
+            limit = sizer.target_bytes
+        buf.append(x)
+        buf_bytes += n
+    if buf:
+        yield buf
+
+
+def http_request(method: str, url: str, body: str | bytes | None = None, content_type: str = "application/json") -> Tuple[int, str]:
+    """Generic HTTP request helper for Elasticsearch communication (pooled keep-alive)."""
+    return get_client(url).request(method, url, body, content_type=content_type)
 
 
 def set_refresh_interval(index_or_alias: str, value: str) -> None:
@@ -79,7 +240,7 @@ def set_refresh_interval(index_or_alias: str, value: str) -> None:
     Temporarily adjust refresh_interval for bulk performance optimization.
     """
     es = SETTINGS.es_url.rstrip("/")
-    payload = json.dumps({"index": {"refresh_interval": value}})
+    payload = codec.dumps({"index": {"refresh_interval": value}})
     status, text = http_request("PUT", f"{es}/{index_or_alias}/_settings", payload)
     if status >= 300:
         raise RuntimeError(f"Failed to set refresh_interval={value}: status={status}, body={text}")
@@ -93,11 +254,23 @@ def refresh(index_or_alias: str) -> None:
         raise RuntimeError(f"Failed to refresh: status={status}, body={text}")
 
 
-def build_bulk_body(target: str, docs: List[Dict]) -> str:
+def bulk_action(target: str, doc_id: str) -> bytes:
+    """Encode the bulk action line for one document."""
+    return codec.dumps({"index": {"_index": target, "_id": doc_id}})
+
+
+def build_bulk_body(
+    target: str,
+    docs: List[Dict],
+    route: Optional[Router] = None,
+    indices: Optional[Set[str]] = None,
+) -> str:
     """
     Build NDJSON bulk request body.
 
     Fails if a document has no doc_id (no silent drops).
+    With route, each document goes to route(timestamp) instead of target;
+    the routed index names are added to `indices` if given.
     """
     lines: List[str] = []
 
@@ -106,13 +279,114 @@ def build_bulk_body(target: str, docs: List[Dict]) -> str:
         if not doc_id:
             raise ValueError(f"Missing doc_id in document: {d}")
 
-        action = {"index": {"_index": target, "_id": doc_id}}
-        lines.append(json.dumps(action, ensure_ascii=False))
-        lines.append(json.dumps(d, ensure_ascii=False))
+        index = route(d.get("timestamp")) if route else target
+        if indices is not None:
+            indices.add(index)
+        lines.append(bulk_action(index, doc_id).decode("utf-8"))
+        lines.append(codec.dumps_str(d))
 
     return "\n".join(lines) + "\n"
 
 
+def build_bulk_body_raw(
+    target: str,
+    docs: List[RawDoc],
+    route: Optional[Router] = None,
+    indices: Optional[Set[str]] = None,
+) -> bytes:
+    """
+    Build NDJSON bulk request body as bytes from (doc_id, line) pairs.
+
+    Document lines are copied verbatim next to their action line.
+    Routed index names are added to `indices` if given.
+    """
+    parts: List[bytes] = []
+    for doc_id, line in docs:
+        if not doc_id:
+            raise ValueError(f"Missing doc_id in document: {line[:200]!r}")
+        index = route(timestamp_of_line(line)) if route else target
+        if indices is not None:
+            indices.add(index)
+        parts.append(bulk_action(index, doc_id))
+        parts.append(line)
+    parts.append(b"")
+    return b"\n".join(parts)
+
+
+def encode_bulk_body(
+    target: str,
+    docs: List[BulkDoc],
+    route: Optional[Router] = None,
+    indices: Optional[Set[str]] = None,
+) -> str | bytes:
+    """Build the bulk body for either raw (doc_id, line) pairs or dict documents."""
+    if docs and isinstance(docs[0], tuple):
+        return build_bulk_body_raw(target, docs, route, indices)
+    return build_bulk_body(target, docs, route, indices)
+
+
+def index_router() -> Optional[Router]:
+    """timestamp -> index for SETTINGS.index_partitioning (None = write to target)."""
+    return router(SETTINGS.index_partitioning, SETTINGS.index_prefix)
+
+
+def doc_timestamp(doc: BulkDoc) -> Optional[str]:
+    if isinstance(doc, tuple):
+        return timestamp_of_line(doc[1])
+    return doc.get("timestamp")
+
+
+
+@dataclass
+class BulkResult:
+    """Structured outcome of one (or several merged) bulk responses."""
+
+    took: int = 0
+    errors: bool = False
+    items: int = 0
+    status_counts: Counter = field(default_factory=Counter)
+    # (position in request, status, error object) of failed items
+    failures: List[Tuple[int, int, Dict]] = field(default_factory=list)
+
+    @property
+    def created(self) -> int:
+        return self.status_counts.get(201, 0)
+
+    @property
+    def updated(self) -> int:
+        return self.status_counts.get(200, 0)
+
+    def add(self, other: "BulkResult") -> None:
+        """Accumulate another result (counts and took; failures are per request)."""
+        self.took += other.took
+        self.errors = self.errors or other.errors
+        self.items += other.items
+        self.status_counts.update(other.status_counts)
+
+
+def parse_bulk_result(resp_text: str | bytes) -> Optional[BulkResult]:
+    """
+    Parse a bulk response in a single pass.
+
+    Works with full responses and with responses reduced by BULK_FILTER_PATH.
+    Returns None for an empty response.
+    """
+    resp = codec.loads(resp_text) if resp_text else {}
+    if not resp:
+        return None
+
+    result = BulkResult(took=resp.get("took") or 0, errors=bool(resp.get("errors")))
+    items = resp.get("items") or []
+    result.items = len(items)
+    for pos, it in enumerate(items):
+        # {"index": {...}} (or create/update/delete): the single value holds the result
+        r = next(iter(it.values()), {}) if it else {}
+        status = r.get("status", 0)
+        result.status_counts[status] += 1
+        if "error" in r:
+            result.failures.append((pos, status, r["error"]))
+    return result
+
 
 def parse_bulk_response(resp_text: str) -> Tuple[bool, Optional[Dict]]:
     """
@@ -121,83 +395,424 @@ def parse_bulk_response(resp_text: str) -> Tuple[bool, Optional[Dict]]:
     Returns:
         (has_errors, first_error_object)
     """
-    resp = json.loads(resp_text) if resp_text else {}
-    if not resp:
+    result = parse_bulk_result(resp_text)
+    if result is None:
         return True, {"reason": "empty response"}
-    if not resp.get("errors"):
+    if not result.errors:
         return False, None
-
-    for it in resp.get("items", []):
-        r = it.get("index") or {}
-        if "error" in r:
-            return True, r["error"]
+    if result.failures:
+        return True, result.failures[0][2]
     return True, {"reason": "errors=true but no item error found"}
 
 
-def main(run_id: str | None = None) -> None:
+def is_retryable_item(status: int, error: Dict) -> bool:
+    """True if a bulk item failure is a transient rejection (429, shard unavailable)."""
+    return status in RETRYABLE_STATUSES or (error or {}).get("type") in RETRYABLE_ERROR_TYPES
+
+
+def retry_delay(attempt: int, base_s: float) -> float:
+    """Exponential backoff with jitter (between 50 % and 100 % of the step)."""
+    step = min(MAX_RETRY_DELAY_S, base_s * (2 ** (attempt - 1)))
+    return step / 2 + random.uniform(0, step / 2)
+
+
+def send_bulk_once(
+    bulk_url: str,
+    target: str,
+    part: List[BulkDoc],
+    sizer: Optional[AdaptiveBatchSizer] = None,
+    partitioned: bool = True,
+    stage: str = "load",
+) -> Tuple[BulkResult, List[BulkDoc]]:
     """
-    Load processed NDJSON files into Elasticsearch using the Bulk API.
+    Send one bulk request and validate the response.
 
-    Supports multi-source ingestion per Airflow run.
+    Returns (result, retry_docs): retry_docs are the documents rejected with
+    a retryable error (empty list on full success). Raises on permanent item
+    errors, non-retryable HTTP errors and sent-vs-processed mismatches.
+    partitioned=False always writes to target (e.g. rollup indices);
+    stage names the metrics (pipeline_<stage>_bulk_seconds, ...).
     """
-    es = SETTINGS.es_url.rstrip("/")
+    route = index_router() if partitioned else None
+    indices: Set[str] = set()
+    body = encode_bulk_body(target, part, route, indices)
+    if route is not None:
+        # monthly indices are created on demand and attached to the alias (target);
+        # the routed names were collected while building the body (one parse per doc)
+        ensure_indices(SETTINGS.es_url, indices, target)
+    started = time.monotonic()
+    status, text = http_request(
+        "POST",
+        bulk_url,
+        body,
+        content_type="application/x-ndjson"
+    )
+    latency_s = time.monotonic() - started
+    metrics.observe(f"pipeline_{stage}_bulk_seconds", latency_s, "Round-trip latency per bulk request")
+    metrics.inc(f"pipeline_{stage}_bulk_bytes_total", len(body), "Bulk request body bytes")
+
+    if status >= 300:
+        metrics.inc(f"pipeline_{stage}_bulk_http_errors_total", 1, "Bulk requests answered with an HTTP error", status=status)
+        if sizer is not None:
+            sizer.observe(latency_s, None, rejected=(status == 429))
+        if status in RETRYABLE_STATUSES:
+            metrics.inc(f"pipeline_{stage}_rejected_items_total", len(part), "Bulk items rejected for retry")
+            return BulkResult(errors=True), part
+        raise RuntimeError(f"Bulk HTTP error: status={status}, body={text}")
+
+    result = parse_bulk_result(text)
+    if result is None:
+        raise RuntimeError("Bulk item error: {'reason': 'empty response'}")
+
+    if result.items != len(part):
+        raise RuntimeError(
+            f"Bulk mismatch: sent {len(part)} docs but ES processed {result.items} items"
+        )
+    metrics.observe(f"pipeline_{stage}_es_took_seconds", result.took / 1000, "ES-reported bulk processing time (took)")
+    for st, n in result.status_counts.items():
+        metrics.inc(f"pipeline_{stage}_items_total", n, "Bulk items by response status", status=st)
+
+    retry: List[BulkDoc] = []
+    rejected = False
+    if result.errors:
+        if not result.failures:
+            raise RuntimeError("Bulk item error: {'reason': 'errors=true but no item error found'}")
+        permanent = [f for f in result.failures if not is_retryable_item(f[1], f[2])]
+        if permanent:
+            pos, st, error = permanent[0]
+            raise RuntimeError(
+                f"Bulk item error: {error} (item {pos}, status {st}; {len(permanent)} permanent failures)"
+            )
+        for pos, st, error in result.failures:
+            retry.append(part[pos])
+            rejected = rejected or st == 429 or error.get("type") in REJECTED_ERROR_TYPES
+
+    if retry:
+        metrics.inc(f"pipeline_{stage}_rejected_items_total", len(retry), "Bulk items rejected for retry")
+    if sizer is not None:
+        sizer.observe(latency_s, result.took, rejected)
+
+    return result, retry
+
+
+def send_bulk(
+    bulk_url: str,
+    target: str,
+    part: List[BulkDoc],
+    sizer: Optional[AdaptiveBatchSizer] = None,
+    partitioned: bool = True,
+    stage: str = "load",
+) -> BulkResult:
+    """
+    Send one chunk via the Bulk API, resubmitting only retryable rejections.
+
+    Returns the accumulated result of all accepted actions
+    (result.items == len(part) on success).
+    Connection errors (EsConnectionError) resend the whole pending part with
+    the same backoff as a 429 (index actions with _id are idempotent).
+    Raises on HTTP errors, permanent item errors, sent-vs-processed mismatches
+    and when rejected items remain after SETTINGS.bulk_max_retries attempts.
+    If a sizer is given, latency, `took` and rejections are reported to it.
+    """
+    summary = BulkResult()
+    pending = part
+    for attempt in range(SETTINGS.bulk_max_retries + 1):
+        if attempt:
+            delay = retry_delay(attempt, SETTINGS.bulk_retry_base_s)
+            print(f"Bulk retry {attempt}/{SETTINGS.bulk_max_retries}: {len(pending)} rejected actions, waiting {delay:.2f}s")
+            time.sleep(delay)
+        try:
+            result, retry = send_bulk_once(bulk_url, target, pending, sizer, partitioned, stage)
+        except EsConnectionError as e:
+            print(f"Bulk connection error: {e}")
+            metrics.inc(f"pipeline_{stage}_bulk_connection_errors_total", 1, "Bulk requests failed without an HTTP status")
+            result, retry = BulkResult(errors=True), pending
+
+        # count only accepted actions; rejected ones are counted once they succeed
+        accepted = Counter(result.status_counts)
+        accepted.subtract(st for _, st, _ in result.failures)
+        accepted = +accepted
+        summary.add(BulkResult(took=result.took, items=sum(accepted.values()), status_counts=accepted))
+
+        pending = retry
+        if not pending:
+            return summary
+
+    raise RuntimeError(
+        f"Bulk item error: {len(pending)} actions still rejected after {SETTINGS.bulk_max_retries} retries"
+    )
 
+
+def bulk_load_sequential(
+    bulk_url: str,
+    target: str,
+    chunks: Iterable[List[BulkDoc]],
+    sizer: Optional[AdaptiveBatchSizer] = None,
+) -> BulkResult:
+    """Send chunks one after another (blocking)."""
+    total = BulkResult()
+    for part in chunks:
+        result = send_bulk(bulk_url, target, part, sizer)
+        total.add(result)
+        print(f"Bulk ok: {result.items} actions, took {result.took} ms (total {total.items})")
+    return total
+
+
+def bulk_load_parallel(
+    bulk_url: str,
+    target: str,
+    chunks: Iterable[List[BulkDoc]],
+    workers: int,
+    max_in_flight: int,
+    sizer: Optional[AdaptiveBatchSizer] = None,
+) -> BulkResult:
+    """
+    Send chunks concurrently with a bounded number of in-flight requests.
+
+    Chunks are only pulled from the iterator when a slot is free, so memory
+    stays bounded by max_in_flight * chunk size. The first failing chunk
+    stops submission and its exception is re-raised after in-flight
+    requests have finished.
+    """
+    total = BulkResult()
+    pending: Set[Future] = set()
+
+    def collect(done: Iterable[Future]) -> None:
+        for fut in done:
+            result = fut.result()
+            total.add(result)
+            print(f"Bulk ok: {result.items} actions, took {result.took} ms (total {total.items})")
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk") as pool:
+        try:
+            for part in chunks:
+                if len(pending) >= max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                pending.add(pool.submit(send_bulk, bulk_url, target, part, sizer))
+
+            done, pending = wait(pending)
+            collect(done)
+        except BaseException:
+            for fut in pending:
+                fut.cancel()
+            raise
+
+    return total
+
+
+def count_docs(docs: Iterable[BulkDoc], counts: Dict[Path, int], key: Path) -> Iterable[BulkDoc]:
+    """Pass documents through while counting them per input file."""
+    for d in docs:
+        counts[key] = counts.get(key, 0) + 1
+        yield d
+
+
+def load_target() -> str:
     # Prefer writing to alias (if configured as write_index)
-    target = SETTINGS.alias_name or SETTINGS.index_name
+    return SETTINGS.alias_name or SETTINGS.index_name
+
+
+def load_key() -> str:
+    """
+    Target as recorded in the load manifest and fingerprint cache.
+
+    Includes the partitioning: after switching ES_INDEX_PARTITIONING, files
+    loaded into the old layout are not considered loaded into the new one.
+    """
+    target = load_target()
+    if SETTINGS.index_partitioning == "none":
+        return target
+    return f"{target}@{SETTINGS.index_partitioning}:{SETTINGS.index_prefix}"
+
+
+def bulk_endpoint() -> str:
+    return f"{SETTINGS.es_url.rstrip('/')}/_bulk?pipeline={PIPELINE_NAME}&filter_path={BULK_FILTER_PATH}"
+
+
+def prepare_load() -> None:
+    """Disable refresh during bulk indexing for performance."""
+    set_refresh_interval(load_target(), "-1")
+
+
+def finalize_load() -> None:
+    """Restore refresh interval, force refresh and bump the load generation."""
+    target = load_target()
+    started = time.monotonic()
+    set_refresh_interval(target, "1s")
+    refresh(target)
+    metrics.set_gauge("pipeline_load_refresh_seconds", time.monotonic() - started, "Time to restore refresh_interval and refresh")
+    bump_generation(SETTINGS.processed_dir)
+
+    try:
+        record_freshness(target, datetime.now(timezone.utc))
+    except Exception as e:
+        # telemetry must not fail the load
+        print(f"Freshness check failed: {e}")
+
+
+def record_freshness(target: str, searchable_at: datetime) -> None:
+    """
+    End-to-end freshness per provider: time from the newest measurement
+    (timestamp <= now) to the moment it became searchable (after refresh).
+    """
+    es = SETTINGS.es_url.rstrip("/")
+    query = {
+        "size": 0,
+        "query": {"range": {"timestamp": {"lte": searchable_at.isoformat()}}},
+        "aggs": {
+            "provider": {
+                "terms": {"field": "provider", "size": 100},
+                "aggs": {"newest": {"max": {"field": "timestamp"}}},
+            }
+        },
+    }
+    status, text = http_request("POST", f"{es}/{target}/_search", codec.dumps(query))
+    if status >= 300:
+        raise RuntimeError(f"Freshness query failed: status={status}, body={text[:200]}")
 
-    in_files = processed_files_for_run(SETTINGS.processed_dir, run_id)
+    for b in codec.loads(text).get("aggregations", {}).get("provider", {}).get("buckets", []):
+        newest_ms = b["newest"].get("value")
+        if newest_ms is None:
+            continue
+        lag = searchable_at.timestamp() - newest_ms / 1000
+        metrics.set_gauge(
+            "pipeline_freshness_seconds", lag, "Newest measurement timestamp to searchable time", provider=b["key"]
+        )
+        print(f"Freshness {b['key']}: {lag:.0f}s (newest {b['newest'].get('value_as_string')})")
 
-    bulk_url = f"{es}/_bulk?pipeline={PIPELINE_NAME}"
+
+def load_files(all_files: List[Path], force: bool = False, manage_refresh: bool = True) -> Optional[BulkResult]:
+    """
+    Load processed NDJSON (or Parquet) files into Elasticsearch using the Bulk API.
+
+    With SETTINGS.bulk_workers > 1 chunks are sent concurrently.
+    Files already loaded unchanged into the same target (load manifest)
+    are skipped unless force=True. With SETTINGS.fingerprint_cache unchanged
+    and duplicate documents are dropped before building bulk bodies.
+
+    manage_refresh=False leaves refresh_interval to the caller
+    (prepare_load/finalize_load around several concurrent loads).
+    Returns None if nothing had to be loaded.
+    """
+    target = load_target()
+    key = load_key()
+
+    manifest = LoadManifest(manifest_path(SETTINGS.processed_dir))
+    digests = {f: content_sha256(f) for f in all_files}
+    in_files: List[Path] = []
+    for f in all_files:
+        if not force and manifest.is_loaded(f, digests[f], key):
+            print(f"Skip (unchanged, already loaded into {key}): {f}")
+        else:
+            in_files.append(f)
+
+    if not in_files:
+        print("Done. Nothing to load (all files unchanged).")
+        return None
+
+    bulk_url = bulk_endpoint()
+
+    workers = max(1, SETTINGS.bulk_workers)
+    max_in_flight = SETTINGS.bulk_max_in_flight or 2 * workers
+    # the in-flight cap bounds memory and cluster load; more workers than slots would idle
+    workers = min(workers, max_in_flight)
+
+    sizer: Optional[AdaptiveBatchSizer] = None
+    if SETTINGS.bulk_target_bytes > 0:
+        sizer = AdaptiveBatchSizer(
+            SETTINGS.bulk_target_bytes,
+            MIN_BULK_BYTES,
+            SETTINGS.bulk_max_bytes,
+            SETTINGS.bulk_target_latency_s,
+        )
 
     print("Inputs:")
     for f in in_files:
         print(" -", f)
     print(f"Target: {target}")
-    print(f"Chunk:  {CHUNK_SIZE}")
+    if sizer is None:
+        print(f"Chunk:  {CHUNK_SIZE}")
+    else:
+        print(f"Chunk:  adaptive, start {sizer.target_bytes} bytes (max {sizer.max_bytes})")
     print(f"Bulk:   {bulk_url}")
-
-    total_actions = 0
-
-    # Disable refresh during bulk indexing for performance
-    set_refresh_interval(target, "-1")
+    print(f"Workers: {workers} (max in-flight {max_in_flight})")
+
+    fp_filter: Optional[FingerprintFilter] = None
+    if SETTINGS.fingerprint_cache and not force:
+        fp_filter = FingerprintFilter(fingerprint_path(SETTINGS.processed_dir), key)
+
+    def split(docs: Iterable[BulkDoc]) -> Iterable[List[BulkDoc]]:
+        if sizer is None:
+            parts = chunked(docs, CHUNK_SIZE)
+        else:
+            parts = chunked_by_bytes(docs, target, sizer, route=index_router())
+        if fp_filter is None:
+            return parts
+        return (kept for kept in map(fp_filter.filter, parts) if kept)
+
+    doc_counts: Dict[Path, int] = {}
+    chunks = (
+        part
+        for in_file in in_files
+        for part in split(count_docs(read_processed(in_file), doc_counts, in_file))
+    )
 
     try:
-        for in_file in in_files:
-            docs_iter = read_ndjson(in_file)
-
-            for part in chunked(docs_iter, CHUNK_SIZE):
-                body = build_bulk_body(target, part)
-                status, text = http_request(
-                    "POST",
-                    bulk_url,
-                    body,
-                    content_type="application/x-ndjson"
-                )
+        if manage_refresh:
+            prepare_load()
+
+        try:
+            if workers == 1:
+                total = bulk_load_sequential(bulk_url, target, chunks, sizer)
+            else:
+                total = bulk_load_parallel(bulk_url, target, chunks, workers, max_in_flight, sizer)
+
+        finally:
+            if manage_refresh:
+                finalize_load()
+
+        # only reached after the whole load succeeded
+        if fp_filter is not None:
+            fp_filter.commit()
+            print(
+                f"Fingerprint cache: skipped {fp_filter.skipped_unchanged} unchanged, "
+                f"{fp_filter.skipped_duplicates} duplicate docs"
+            )
+    finally:
+        if fp_filter is not None:
+            fp_filter.close()
 
-                if status >= 300:
-                    raise RuntimeError(f"Bulk HTTP error: status={status}, body={text}")
+    for f in in_files:
+        manifest.record(f, digests[f], doc_counts.get(f, 0), key)
+    manifest.save()
 
-                has_errors, first_error = parse_bulk_response(text)
-                if has_errors:
-                    raise RuntimeError(f"Bulk item error: {first_error}")
+    print(
+        f"Done. Total indexed actions: {total.items} "
+        f"(created {total.created}, updated {total.updated}, ES took {total.took} ms)"
+    )
+    return total
 
-                items = json.loads(text).get("items", [])
-                total_actions += len(items)
 
-                if len(items) != len(part):
-                    raise RuntimeError(
-                        f"Bulk mismatch: sent {len(part)} docs but ES processed {len(items)} items"
-                    )
+def load_file(path: str, force: bool = False) -> int:
+    """
+    Load a single processed file (one mapped Airflow task per file).
 
-                print(f"Bulk ok: {len(items)} actions (total {total_actions})")
+    refresh_interval is handled once per run by prepare_load/finalize_load.
+    Returns the number of indexed actions.
+    """
+    total = load_files([Path(path)], force=force, manage_refresh=False)
+    return total.items if total else 0
 
-    finally:
-        # Restore refresh interval and force refresh
-        set_refresh_interval(target, "1s")
-        refresh(target)
 
-    print(f"Done. Total indexed actions: {total_actions}")
+def main(run_id: str | None = None, force: bool = False) -> None:
+    """Load all processed files of an Airflow run (multi-source ingestion)."""
+    load_files(processed_files_for_run(SETTINGS.processed_dir, run_id), force=force)
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Load processed NDJSON files into Elasticsearch.")
+    parser.add_argument("--run-id", default=None, help="Airflow run id (default: latest processed file)")
+    parser.add_argument("--force", action="store_true", help="reload files even if unchanged in the load manifest")
+    args = parser.parse_args()
+    main(args.run_id, force=args.force)
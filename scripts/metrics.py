@@ -0,0 +1,213 @@
+# See documentation:
+# docs/06_ingestion_pipeline.md
+
+# ------------------------------------------------------------
+# Pipeline metrics (Prometheus textfile format)
+#
+# Stages record into the process-wide REGISTRY:
+#   inc("pipeline_fetch_bytes_total", n, provider="brightsky")
+#   observe("pipeline_load_bulk_seconds", 0.42)
+# At the end of a task flush(stage, unit) writes
+#   data/metrics/<stage>[__<unit>].prom
+# (node_exporter textfile collector) and returns a JSON summary
+# that the DAG pushes to XCom.
+# ------------------------------------------------------------
+
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from scripts.config import SETTINGS
+
+METRICS_DIR = "metrics"
+
+# seconds: per-request latencies from a few ms up to slow bulk requests
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_UNIT_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def metrics_dir(processed_dir: Path) -> Path:
+    """Textfiles live next to the processed layer: data/metrics/."""
+    override = os.getenv("METRICS_DIR")
+    return Path(override) if override else processed_dir.parent / METRICS_DIR
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bucket bound containing the q-quantile (None if empty)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, n in zip(self.buckets, self.counts):
+            if n >= rank:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    """Counters, gauges and histograms with labels; thread-safe (parallel bulk workers)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self.help: Dict[str, str] = {}
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters, self.gauges, self.histograms, self.help = {}, {}, {}, {}
+
+    def inc(self, name: str, value: float = 1.0, help: str = "", **labels: Any) -> None:
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0.0) + value
+            if help:
+                self.help[name] = help
+
+    def set(self, name: str, value: float, help: str = "", **labels: Any) -> None:
+        with self._lock:
+            self.gauges.setdefault(name, {})[_label_key(labels)] = value
+            if help:
+                self.help[name] = help
+
+    def observe(
+        self, name: str, value: float, help: str = "", buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **labels: Any
+    ) -> None:
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            key = _label_key(labels)
+            if key not in series:
+                series[key] = Histogram(buckets)
+            series[key].observe(value)
+            if help:
+                self.help[name] = help
+
+    def render(self, const_labels: Optional[Dict[str, str]] = None) -> str:
+        """
+        Prometheus text exposition format (version 0.0.4).
+
+        const_labels are added to every series (stage/unit keep series from
+        different textfiles distinct, as the textfile collector requires).
+        """
+        const = dict(const_labels or {})
+
+        def labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+            return _format_labels(_label_key({**dict(key), **const}), extra)
+
+        lines = []
+        with self._lock:
+            for kind, metrics in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted(metrics):
+                    if name in self.help:
+                        lines.append(f"# HELP {name} {self.help[name]}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    for key, value in sorted(metrics[name].items()):
+                        lines.append(f"{name}{labels(key)} {_format_value(value)}")
+            for name in sorted(self.histograms):
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, h in sorted(self.histograms[name].items()):
+                    for bound, n in zip(h.buckets, h.counts):
+                        lines.append(f"{name}_bucket{labels(key, ('le', _format_value(bound)))} {n}")
+                    lines.append(f"{name}_bucket{labels(key, ('le', '+Inf'))} {h.count}")
+                    lines.append(f"{name}_sum{labels(key)} {_format_value(h.sum)}")
+                    lines.append(f"{name}_count{labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Compact JSON-serialisable summary (XCom): series as "name{labels}" -> value."""
+        out: Dict[str, Any] = {}
+        with self._lock:
+            for metrics in (self.counters, self.gauges):
+                for name, series in metrics.items():
+                    for key, value in series.items():
+                        out[f"{name}{_format_labels(key)}"] = round(value, 6)
+            for name, series in self.histograms.items():
+                for key, h in series.items():
+                    out[f"{name}{_format_labels(key)}"] = {
+                        "count": h.count,
+                        "sum": round(h.sum, 6),
+                        "p50": h.quantile(0.5),
+                        "p95": h.quantile(0.95),
+                    }
+        return out
+
+
+REGISTRY = MetricsRegistry()
+inc = REGISTRY.inc
+set_gauge = REGISTRY.set
+observe = REGISTRY.observe
+
+
+def record_preprocess(provider: str, docs: int, seconds: float) -> None:
+    inc("pipeline_preprocess_docs_total", docs, "Documents written to the processed layer", provider=provider)
+    set_gauge("pipeline_preprocess_seconds", seconds, "Duration of the last preprocess run", provider=provider)
+    set_gauge(
+        "pipeline_preprocess_docs_per_second",
+        docs / seconds if seconds > 0 else 0.0,
+        "Preprocess throughput of the last run",
+        provider=provider,
+    )
+
+
+def write_textfile(path: Path, const_labels: Optional[Dict[str, str]] = None, registry: MetricsRegistry = REGISTRY) -> None:
+    """Write atomically: the textfile collector must never read a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(registry.render(const_labels), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def flush(stage: str, unit: str = "", processed_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    End of a task: write <metrics_dir>/<stage>[__<unit>].prom, return the
+    summary for XCom and start the next task in this process with empty metrics.
+    """
+    set_gauge("pipeline_stage_last_success_timestamp_seconds", time.time(), "Unix time of the last finished stage")
+    summary = REGISTRY.snapshot()
+
+    const = {"stage": stage, **({"unit": unit} if unit else {})}
+    name = stage if not unit else f"{stage}__{_UNIT_RE.sub('_', unit)}"
+    write_textfile(metrics_dir(processed_dir or SETTINGS.processed_dir) / f"{name}.prom", const)
+    REGISTRY.reset()
+    return summary
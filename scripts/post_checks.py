@@ -1,27 +1,25 @@
 # See documentation:
 # docs/pipeline.md
 
-import json
-import urllib.request
 from typing import Any, Dict, List
 
+from scripts import codec
 from scripts.config import SETTINGS
+from scripts.es_client import get_client
 
 
 def http_get(url: str) -> Dict[str, Any]:
-    with urllib.request.urlopen(url, timeout=30) as resp:
-        return json.loads(resp.read().decode("utf-8"))
+    status, text = get_client(url).request("GET", url)
+    if status >= 300:
+        raise RuntimeError(f"GET {url} failed: status={status}, body={text[:200]}")
+    return codec.loads(text)
 
 
 def http_post(url: str, body: Dict[str, Any]) -> Dict[str, Any]:
-    req = urllib.request.Request(
-        url,
-        data=json.dumps(body).encode("utf-8"),
-        headers={"Content-Type": "application/json"},
-        method="POST",
-    )
-    with urllib.request.urlopen(req, timeout=30) as resp:
-        return json.loads(resp.read().decode("utf-8"))
+    status, text = get_client(url).request("POST", url, codec.dumps(body))
+    if status >= 300:
+        raise RuntimeError(f"POST {url} failed: status={status}, body={text[:200]}")
+    return codec.loads(text)
 
 
 def main() -> None:
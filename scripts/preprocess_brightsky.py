@@ -2,11 +2,12 @@
 # docs/06_preprocessing.md
 
 import hashlib
-import json
+import time
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Iterable
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+from scripts import codec, columnar, metrics, raw_store
 from scripts.config import SETTINGS
 
 
@@ -14,43 +15,174 @@ def ensure_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
+# Measurement fields copied 1:1 from BrightSky (units as delivered, dwd)
+MEASUREMENT_FIELDS = (
+    "temperature",
+    "relative_humidity",
+    "dew_point",
+    "pressure_msl",
+    "precipitation",
+    "wind_speed",
+    "wind_direction",
+    "wind_gust_speed",
+    "wind_gust_direction",
+    "cloud_cover",
+    "sunshine",
+    "visibility",
+    "condition",
+    "icon",
+    "solar",
+)
+
+# Key order of a processed document
+DOC_KEYS = ("doc_id", "provider", "source_id", "timestamp", "processed_at", *MEASUREMENT_FIELDS)
+
+# rows encoded per block when writing NDJSON (bounds the encoded lines held in memory)
+LINE_BLOCK_ROWS = 10_000
+
+# JSON of these types never contains a comma (see encode_column)
+_SCALAR_TYPES = (int, float, bool, type(None))
+
+
 def make_doc_id(provider: str, source_id: str, ts: str) -> str:
     base = f"{provider}|{source_id}|{ts}".encode("utf-8")
     return hashlib.sha256(base).hexdigest()
 
 
-def iter_processed_docs(raw: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
+def make_doc_ids(provider: str, source_ids: List[str], timestamps: List[str]) -> List[str]:
+    """Batch variant of make_doc_id: the provider prefix is hashed once and copied per row."""
+    prefix = hashlib.sha256(f"{provider}|".encode("utf-8"))
+    out = []
+    for source_id, ts in zip(source_ids, timestamps):
+        h = prefix.copy()
+        h.update(f"{source_id}|{ts}".encode("utf-8"))
+        out.append(h.hexdigest())
+    return out
+
+
+def to_columns(weather: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """
+    Turn payload.weather (list of records) into one list per output field.
+
+    Missing fields become None (null in the processed document).
+    """
+    columns: Dict[str, List[Any]] = {
+        "timestamp": [(w.get("timestamp") or "").strip() for w in weather],
+        "source_id": [str(w.get("source_id") or "unknown") for w in weather],
+    }
+    for field in MEASUREMENT_FIELDS:
+        columns[field] = [w.get(field) for w in weather]
+    return columns
+
+
+def processed_columns(raw: Dict[str, Any], processed_at: str | None = None) -> Dict[str, List[Any]]:
+    """
+    One list per DOC_KEYS field for payload.weather ({} if there is no weather).
+
+    NDJSON lines, documents and the Parquet file are all built from these columns.
+    """
     provider = raw.get("provider") or "brightsky"
     payload = raw.get("payload") or {}
     weather = payload.get("weather") or []
+    if not weather:
+        return {}
+
+    # one processed_at per run instead of one clock call per row
+    processed_at = processed_at or datetime.now(timezone.utc).isoformat()
+
+    columns = to_columns(weather)
+    n = len(weather)
+    return {
+        "doc_id": make_doc_ids(provider, columns["source_id"], columns["timestamp"]),
+        "provider": [provider] * n,
+        "source_id": columns["source_id"],
+        "timestamp": columns["timestamp"],
+        "processed_at": [processed_at] * n,
+        **{field: columns[field] for field in MEASUREMENT_FIELDS},
+    }
+
+
+def iter_processed_docs(raw: Dict[str, Any], processed_at: str | None = None) -> Iterable[Dict[str, Any]]:
+    columns = processed_columns(raw, processed_at)
+    if not columns:
+        return
+    for row in zip(*(columns[key] for key in DOC_KEYS)):
+        yield dict(zip(DOC_KEYS, row))
+
+
+def encode_column(values: List[Any]) -> Tuple[bytes, List[bytes]]:
+    """
+    JSON-encode one column with a single codec call and split it per row.
+
+    Returns (slot, parts) for the line template:
+    - only strings: the encoded array is split at '","' (a quote inside a
+      string is always escaped, so that sequence only occurs between
+      elements); parts are the string contents, slot adds the quotes
+    - only numbers/null/bool: split at ',' (their JSON has no comma)
+    - mixed (e.g. condition with null): encoded value by value
+    """
+    if all(type(v) is str for v in values):
+        return b'"%b"', codec.dumps(values)[2:-2].split(b'","')
+    if all(type(v) in _SCALAR_TYPES for v in values):
+        return b"%b", codec.dumps(values)[1:-1].split(b",")
+    return b"%b", [codec.dumps(v) for v in values]
+
+
+def _line_template(slots: Dict[str, bytes], constants: Dict[str, Any]) -> bytes:
+    # constant fields are encoded into the template, every other field is a slot
+    parts = []
+    for key in DOC_KEYS:
+        value = codec.dumps(constants[key]).replace(b"%", b"%%") if key in constants else slots[key]
+        parts.append(codec.dumps(key) + b":" + value)
+    return b"{" + b",".join(parts) + b"}\n"
+
+
+def iter_ndjson_lines(columns: Dict[str, List[Any]], block_rows: int = LINE_BLOCK_ROWS) -> Iterable[bytes]:
+    """
+    NDJSON lines (byte-identical to codec.dumps(doc) + newline) straight
+    from the columns, encoded column-wise in blocks of block_rows.
+    """
+    if not columns:
+        return
+    constants = {"provider": columns["provider"][0], "processed_at": columns["processed_at"][0]}
+    keys = [key for key in DOC_KEYS if key not in constants]
+    n = len(columns["doc_id"])
+    for start in range(0, n, block_rows):
+        encoded = {key: encode_column(columns[key][start : start + block_rows]) for key in keys}
+        template = _line_template({key: slot for key, (slot, _) in encoded.items()}, constants)
+        for row in zip(*(parts for _, parts in encoded.values())):
+            yield template % row
+
+
+def process_raw(
+    run_id: str,
+    raw_provider: str,
+    raw_dir: Optional[Path] = None,
+    processed_dir: Optional[Path] = None,
+) -> Path:
+    """
+    Preprocess one raw file (one location) into processed_<run_id>__<raw_provider>.ndjson.
+
+    raw_dir/processed_dir default to SETTINGS (reprocess_all passes its own).
+    """
+    raw_dir = raw_dir or SETTINGS.raw_dir
+    processed_dir = processed_dir or SETTINGS.processed_dir
+    # single file (.json/.json.gz/.json.xz) or member of a monthly archive
+    raw = raw_store.read_raw(raw_dir, run_id, raw_provider)
+    out_file = processed_dir / f"processed_{run_id}__{raw_provider}.ndjson"
+
+    t0 = time.perf_counter()
+    columns = processed_columns(raw)
+    n = len(columns.get("doc_id", ()))
+    with out_file.open("wb") as f:
+        f.writelines(iter_ndjson_lines(columns))
+    metrics.record_preprocess(raw_provider, n, time.perf_counter() - t0)
+
+    print(f"Wrote processed file: {out_file} (docs={n})")
 
-    for w in weather:
-        ts = (w.get("timestamp") or "").strip()
-        source_id = str(w.get("source_id") or "unknown")
-
-        yield {
-            "doc_id": make_doc_id(provider, source_id, ts),
-            "provider": provider,
-            "source_id": source_id,
-            "timestamp": ts,
-            "processed_at": datetime.now(timezone.utc).isoformat(),
-
-            "temperature": w.get("temperature"),
-            "relative_humidity": w.get("relative_humidity"),
-            "dew_point": w.get("dew_point"),
-            "pressure_msl": w.get("pressure_msl"),
-            "precipitation": w.get("precipitation"),
-            "wind_speed": w.get("wind_speed"),
-            "wind_direction": w.get("wind_direction"),
-            "wind_gust_speed": w.get("wind_gust_speed"),
-            "wind_gust_direction": w.get("wind_gust_direction"),
-            "cloud_cover": w.get("cloud_cover"),
-            "sunshine": w.get("sunshine"),
-            "visibility": w.get("visibility"),
-            "condition": w.get("condition"),
-            "icon": w.get("icon"),
-            "solar": w.get("solar"),
-        }
+    if SETTINGS.processed_parquet:
+        print(f"Wrote processed file: {columnar.write_columns(columns, out_file.with_suffix('.parquet'))}")
+    return out_file
 
 
 def main(run_id: str | None = None) -> None:
@@ -59,21 +191,14 @@ def main(run_id: str | None = None) -> None:
 
     ensure_dir(SETTINGS.processed_dir)
 
+    # raw_<run_id>__brightsky.json and/or one raw_<run_id>__brightsky-<location>.json per location
     provider = "brightsky"
-    raw_file = SETTINGS.raw_dir / f"raw_{run_id}__{provider}.json"
-    if not raw_file.exists():
-        raise FileNotFoundError(raw_file)
-
-    raw = json.loads(raw_file.read_text(encoding="utf-8"))
-    out_file = SETTINGS.processed_dir / f"processed_{run_id}__{provider}.ndjson"
+    raw_providers = raw_store.providers_for_run(SETTINGS.raw_dir, run_id, provider)
+    if not raw_providers:
+        raise FileNotFoundError(SETTINGS.raw_dir / f"raw_{run_id}__{provider}.json")
 
-    n = 0
-    with out_file.open("w", encoding="utf-8") as f:
-        for doc in iter_processed_docs(raw):
-            f.write(json.dumps(doc, ensure_ascii=False) + "\n")
-            n += 1
-
-    print(f"Wrote processed file: {out_file} (docs={n})")
+    for raw_provider in raw_providers:
+        process_raw(run_id, raw_provider)
 
 
 if __name__ == "__main__":
@@ -2,12 +2,13 @@
 # docs/06_preprocessing.md
 
 import hashlib
-import json
 import os
+import time
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
+from scripts import codec, columnar, metrics, raw_store
 from scripts.config import SETTINGS
 
 
@@ -31,22 +32,9 @@ def unix_to_iso(ts: int) -> str:
     return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat()
 
 
-def main(run_id: str | None = None) -> None:
-
-    ensure_dir(SETTINGS.processed_dir)
-
-    if not run_id:
-        raise ValueError("run_id required for preprocess_hs_wetter")
-
-    raw_file = SETTINGS.raw_dir / f"raw_{run_id}__hs-worms.json"
-    if not raw_file.exists():
-        raise FileNotFoundError(raw_file)
-    
-    raw = json.loads(raw_file.read_text(encoding="utf-8"))
-
-    payload: Dict[str, Any] = raw.get("payload") or {}
+def normalize(payload: Dict[str, Any], station_id: str, processed_at: str | None = None) -> Dict[str, Any]:
+    """Map one HS-Worms API payload to the common document schema."""
     provider = "hs-worms"
-    station_id = os.getenv("HS_STATION_ID", "hs-worms")
 
     # Messzeitpunkt aus der API: "ts" (unix)
     ts_unix = payload.get("ts")
@@ -59,12 +47,12 @@ def main(run_id: str | None = None) -> None:
     wind_kmh = ((payload.get("wind") or {}).get("speed") or {}).get("kmh")
     wind_deg = ((payload.get("wind") or {}).get("dir") or {}).get("deg")
 
-    doc = {
+    return {
         "doc_id": make_doc_id(provider, station_id, ts_iso),
         "provider": provider,
         "source_id": station_id,
         "timestamp": ts_iso,
-        "processed_at": datetime.now(timezone.utc).isoformat(),
+        "processed_at": processed_at or datetime.now(timezone.utc).isoformat(),
 
         "temperature": temp_out,
         "relative_humidity": rh_out,
@@ -85,11 +73,63 @@ def main(run_id: str | None = None) -> None:
     }
 
 
-    out_file = SETTINGS.processed_dir / f"processed_{run_id}__hs-worms.ndjson"
+def process_raw(run_id: str, raw_dir: Optional[Path] = None, processed_dir: Optional[Path] = None) -> Path:
+    """
+    Preprocess one polled reading into processed_<run_id>__hs-worms.ndjson.
+
+    raw_dir/processed_dir default to SETTINGS (reprocess_all passes its own).
+    """
+    raw_dir = raw_dir or SETTINGS.raw_dir
+    processed_dir = processed_dir or SETTINGS.processed_dir
+    ensure_dir(processed_dir)
+
+    # single file (.json/.json.gz/.json.xz) or member of a monthly archive
+    raw = raw_store.read_raw(raw_dir, run_id, "hs-worms")
+
+    payload: Dict[str, Any] = raw.get("payload") or {}
+    station_id = os.getenv("HS_STATION_ID", "hs-worms")
+    t0 = time.perf_counter()
+    doc = normalize(payload, station_id)
+
+    out_file = processed_dir / f"processed_{run_id}__hs-worms.ndjson"
 
-    out_file.write_text(json.dumps(doc, ensure_ascii=False) + "\n", encoding="utf-8")
+    out_file.write_bytes(codec.dumps(doc) + b"\n")
+    metrics.record_preprocess("hs-worms", 1, time.perf_counter() - t0)
     print(f"Wrote processed file: {out_file} (docs=1)")
 
+    if SETTINGS.processed_parquet:
+        print(f"Wrote processed file: {columnar.write_parquet([doc], out_file.with_suffix('.parquet'))}")
+    return out_file
+
+
+def main(run_id: str | None = None) -> None:
+    if not run_id:
+        raise ValueError("run_id required for preprocess_hs_wetter")
+
+    process_raw(run_id)
+
+
+def process_stream(
+    run_id: str,
+    raw_provider: str = "hs-worms-stream",
+    raw_dir: Optional[Path] = None,
+    processed_dir: Optional[Path] = None,
+) -> Path:
+    """Preprocess one day of streamed readings (raw_<day>__hs-worms-stream.ndjson)."""
+    raw_dir = raw_dir or SETTINGS.raw_dir
+    processed_dir = processed_dir or SETTINGS.processed_dir
+    ensure_dir(processed_dir)
+
+    station_id = os.getenv("HS_STATION_ID", "hs-worms")
+    t0 = time.perf_counter()
+    docs = [normalize(raw.get("payload") or {}, station_id) for raw in raw_store.read_raw_lines(raw_dir, run_id, raw_provider)]
+
+    out_file = processed_dir / f"processed_{run_id}__{raw_provider}.ndjson"
+    out_file.write_bytes(b"".join(codec.dumps(d) + b"\n" for d in docs))
+    metrics.record_preprocess("hs-worms", len(docs), time.perf_counter() - t0)
+    print(f"Wrote processed file: {out_file} (docs={len(docs)})")
+    return out_file
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,87 @@
+# See documentation:
+# docs/06_ingestion_pipeline.md
+
+# ------------------------------------------------------------
+# Provider registry for the DAG
+#
+# The DAG is generated from PROVIDERS via dynamic task mapping:
+#   partitions() -> fetch(run_id, partition) -> preprocess(run_id, raw_provider) -> load(file)
+#
+# This module is imported at DAG-parse time: it must stay free of
+# heavy imports; the provider scripts are imported inside the callables.
+# ------------------------------------------------------------
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+
+@dataclass(frozen=True)
+class Provider:
+    name: str
+    # fan-out units of one run (e.g. BrightSky locations); [""] = single fetch
+    partitions: Callable[[], List[str]]
+    # (run_id, partition) -> raw provider of the written raw file
+    fetch: Callable[[str, str], str]
+    # (run_id, raw_provider) -> path of the written processed file
+    preprocess: Callable[[str, str], str]
+
+
+def _brightsky_partitions() -> List[str]:
+    from scripts.fetch_brightsky import locations
+
+    return [loc.name for loc in locations()]
+
+
+def _brightsky_fetch(run_id: str, partition: str) -> str:
+    from scripts.fetch_brightsky import Location, fetch_location
+
+    fetch_location(run_id, partition)
+    return Location(partition, "", "").raw_provider
+
+
+def _brightsky_preprocess(run_id: str, raw_provider: str) -> str:
+    from scripts.preprocess_brightsky import SETTINGS, ensure_dir, process_raw
+
+    ensure_dir(SETTINGS.processed_dir)
+    return str(process_raw(run_id, raw_provider))
+
+
+def _hs_fetch(run_id: str, partition: str) -> str:
+    from scripts.fetch_hs_wetter import main
+
+    main(run_id)
+    return "hs-worms"
+
+
+def _hs_preprocess(run_id: str, raw_provider: str) -> str:
+    from scripts import preprocess_hs_wetter
+
+    preprocess_hs_wetter.main(run_id)
+    return str(preprocess_hs_wetter.SETTINGS.processed_dir / f"processed_{run_id}__{raw_provider}.ndjson")
+
+
+PROVIDERS: Dict[str, Provider] = {
+    p.name: p
+    for p in (
+        Provider("brightsky", _brightsky_partitions, _brightsky_fetch, _brightsky_preprocess),
+        Provider("hs-worms", lambda: [""], _hs_fetch, _hs_preprocess),
+    )
+}
+
+
+def plan() -> List[Dict[str, str]]:
+    """All fetch units of a run: [{"provider": ..., "partition": ...}, ...] (XCom-serialisable)."""
+    return [
+        {"provider": name, "partition": partition}
+        for name, provider in PROVIDERS.items()
+        for partition in provider.partitions()
+    ]
+
+
+def fetch(run_id: str, item: Dict[str, str]) -> Dict[str, str]:
+    raw_provider = PROVIDERS[item["provider"]].fetch(run_id, item["partition"])
+    return {"provider": item["provider"], "raw_provider": raw_provider}
+
+
+def preprocess(run_id: str, item: Dict[str, str]) -> str:
+    return PROVIDERS[item["provider"]].preprocess(run_id, item["raw_provider"])
@@ -0,0 +1,268 @@
+# ------------------------------------------------------------
+# Raw layer storage (data/raw/)
+#
+# - single files:   raw_<run_id>__<provider>.json[.gz|.xz]
+# - stream files:   raw_<YYYY-MM-DD>__<provider>.ndjson (one payload per
+#                   line, appended by long-running pollers)
+# - monthly archive: archive_<YYYY-MM>.raw.<gz|xz>
+#                    + archive_<YYYY-MM>.index.json (name -> [offset, length])
+#
+# Each archive member is an independently compressed stream, so a
+# single run can be read with one seek without decompressing the month.
+#
+# Documentation:
+# docs/06_ingestion_pipeline.md
+# ------------------------------------------------------------
+
+import argparse
+import gzip
+import lzma
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from scripts import codec
+from scripts.config import SETTINGS
+
+# compression -> (file suffix, compress, decompress)
+CODECS: Dict[str, Tuple[str, Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "none": (".json", lambda b: b, lambda b: b),
+    "gzip": (".json.gz", lambda b: gzip.compress(b, compresslevel=6), gzip.decompress),
+    "xz": (".json.xz", lzma.compress, lzma.decompress),
+}
+SUFFIX_CODEC = {suffix: compression for compression, (suffix, _, _) in CODECS.items()}
+ARCHIVE_SUFFIX = {"gzip": ".raw.gz", "xz": ".raw.xz"}
+STREAM_SUFFIX = ".ndjson"
+SUFFIX_CODEC[STREAM_SUFFIX] = "none"
+
+_MONTH_RE = re.compile(r"^(\d{4})-?(\d{2})")
+_RAW_RE = re.compile(r"^(raw_(.+?)__.+?)(\.json(?:\.gz|\.xz)?|\.ndjson)$")
+
+
+def raw_name(run_id: str, provider: str) -> str:
+    return f"raw_{run_id}__{provider}"
+
+
+def month_of(run_id: str) -> Optional[str]:
+    """'2026-02-12' or '20260212T101500Z' -> '2026-02' (None if not date-based)."""
+    m = _MONTH_RE.match(run_id)
+    return f"{m.group(1)}-{m.group(2)}" if m else None
+
+
+def archive_paths(raw_dir: Path, month: str, compression: str) -> Tuple[Path, Path]:
+    return raw_dir / f"archive_{month}{ARCHIVE_SUFFIX[compression]}", raw_dir / f"archive_{month}.index.json"
+
+
+def write_raw(raw_dir: Path, run_id: str, provider: str, raw: Dict[str, Any]) -> Path:
+    """
+    Write one raw payload using SETTINGS.raw_compression.
+
+    Uncompressed files keep the readable 2-space indent; compressed files
+    are written compact.
+    """
+    compression = SETTINGS.raw_compression
+    if compression not in CODECS:
+        raise ValueError(f"Unknown RAW_COMPRESSION={compression!r}, expected one of {sorted(CODECS)}")
+    suffix, compress, _ = CODECS[compression]
+
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    out_file = raw_dir / f"{raw_name(run_id, provider)}{suffix}"
+    data = codec.dumps(raw, indent=(compression == "none"))
+    out_file.write_bytes(compress(data))
+    return out_file
+
+
+def append_raw(raw_dir: Path, run_id: str, provider: str, raw: Dict[str, Any]) -> Path:
+    """
+    Append one payload as a compact line to raw_<run_id>__<provider>.ndjson.
+
+    For pollers that produce many small readings: one file per run_id (day)
+    instead of one file per reading.
+    """
+    raw_dir.mkdir(parents=True, exist_ok=True)
+    out_file = raw_dir / f"{raw_name(run_id, provider)}{STREAM_SUFFIX}"
+    with out_file.open("ab") as f:
+        f.write(codec.dumps(raw) + b"\n")
+    return out_file
+
+
+def _read_index(index_path: Path) -> Dict[str, Any]:
+    if not index_path.exists():
+        return {"members": {}}
+    return codec.loads(index_path.read_bytes())
+
+
+def _read_member(raw_dir: Path, name: str) -> Optional[bytes]:
+    """Bytes of an archive member (None if the month has no such member)."""
+    month = month_of(name[len("raw_"):])
+    if not month:
+        return None
+    index = _read_index(raw_dir / f"archive_{month}.index.json")
+    member = index["members"].get(name)
+    if not member:
+        return None
+    compression = index["compression"]
+    archive, _ = archive_paths(raw_dir, month, compression)
+    offset, length = member
+    with archive.open("rb") as f:
+        f.seek(offset)
+        return CODECS[compression][2](f.read(length))
+
+
+def read_raw_bytes(raw_dir: Path, run_id: str, provider: str) -> bytes:
+    """Return the JSON bytes of one raw payload from a single file or a monthly archive."""
+    name = raw_name(run_id, provider)
+    for suffix, _, decompress in CODECS.values():
+        path = raw_dir / f"{name}{suffix}"
+        if path.exists():
+            return decompress(path.read_bytes())
+
+    archived = _read_member(raw_dir, name)
+    stream = raw_dir / f"{name}{STREAM_SUFFIX}"
+    if stream.exists():
+        # lines appended after the day was compacted continue the archived member
+        return (archived or b"") + stream.read_bytes()
+    if archived is not None:
+        return archived
+
+    raise FileNotFoundError(raw_dir / f"{name}.json")
+
+
+def read_raw(raw_dir: Path, run_id: str, provider: str) -> Dict[str, Any]:
+    return codec.loads(read_raw_bytes(raw_dir, run_id, provider))
+
+
+def read_raw_lines(raw_dir: Path, run_id: str, provider: str) -> List[Dict[str, Any]]:
+    """All payloads of a stream file (see append_raw), single file or archive member."""
+    return [codec.loads(line) for line in read_raw_bytes(raw_dir, run_id, provider).splitlines() if line.strip()]
+
+
+def list_raw(raw_dir: Path) -> List[Tuple[str, str]]:
+    """All (run_id, provider) pairs in the raw layer: single files and archive members."""
+    found = set()
+    for path in raw_dir.glob("raw_*"):
+        m = _RAW_RE.match(path.name)
+        if m:
+            found.add(m.group(1))
+    for index_path in raw_dir.glob("archive_*.index.json"):
+        found.update(_read_index(index_path)["members"])
+
+    pairs = []
+    for name in found:
+        run_id, sep, provider = name[len("raw_"):].partition("__")
+        if sep:
+            pairs.append((run_id, provider))
+    return sorted(pairs)
+
+
+def providers_for_run(raw_dir: Path, run_id: str, provider: str) -> List[str]:
+    """
+    Raw providers of a run matching `provider` or `provider-<location>`,
+    from single files and the monthly archive index.
+    """
+    names = set()
+    for path in raw_dir.glob(f"{raw_name(run_id, provider)}*"):
+        m = _RAW_RE.match(path.name)
+        if m:
+            names.add(m.group(1))
+    month = month_of(run_id)
+    if month:
+        names.update(_read_index(raw_dir / f"archive_{month}.index.json")["members"])
+
+    prefix = raw_name(run_id, "")
+    found = []
+    for name in names:
+        if not name.startswith(prefix):
+            continue
+        p = name[len(prefix):]
+        if p == provider or p.startswith(f"{provider}-"):
+            found.append(p)
+    return sorted(found)
+
+
+def compact_month(raw_dir: Path, month: str, compression: str = "gzip") -> int:
+    """
+    Pack all single raw files of a month into the monthly archive.
+
+    Members are appended; the index is replaced atomically before the
+    source files are deleted, so an interruption never loses data.
+    A stream file whose day is already archived (late appends, --month on
+    the current month) is merged: the new member holds the archived lines
+    followed by the new ones. A single file replaces its member.
+    Returns the number of packed files.
+    """
+    if compression not in ARCHIVE_SUFFIX:
+        raise ValueError(f"Archive compression must be one of {sorted(ARCHIVE_SUFFIX)}")
+
+    files: List[Tuple[str, Path, str]] = []
+    for path in sorted(raw_dir.glob("raw_*")):
+        m = _RAW_RE.match(path.name)
+        if m and month_of(m.group(2)) == month:
+            files.append((m.group(1), path, SUFFIX_CODEC[m.group(3)]))
+    if not files:
+        return 0
+
+    archive, index_path = archive_paths(raw_dir, month, compression)
+    index = _read_index(index_path)
+    if index["members"] and index.get("compression") != compression:
+        raise RuntimeError(f"{index_path} uses {index.get('compression')}, not {compression}")
+    index["compression"] = compression
+
+    compress = CODECS[compression][1]
+    with archive.open("ab") as out:
+        for name, path, source_compression in files:
+            data = CODECS[source_compression][2](path.read_bytes())
+            if path.name.endswith(STREAM_SUFFIX):
+                archived = _read_member(raw_dir, name) if name in index["members"] else None
+                data = (archived or b"") + data
+            else:
+                # re-encode compact (drops the indent of uncompressed files)
+                data = codec.dumps(codec.loads(data))
+            member = compress(data)
+            offset = out.tell()
+            out.write(member)
+            index["members"][name] = [offset, len(member)]
+        out.flush()
+        os.fsync(out.fileno())
+
+    tmp = index_path.with_suffix(".tmp")
+    tmp.write_bytes(codec.dumps(index))
+    os.replace(tmp, index_path)
+
+    for _, path, _ in files:
+        path.unlink()
+    return len(files)
+
+
+def compact_before(raw_dir: Path, month: str, compression: str = "gzip") -> Dict[str, int]:
+    """Compact every month strictly before `month` ('YYYY-MM')."""
+    months = set()
+    for path in raw_dir.glob("raw_*"):
+        m = _RAW_RE.match(path.name)
+        found = month_of(m.group(2)) if m else None
+        if found and found < month:
+            months.add(found)
+    return {m: compact_month(raw_dir, m, compression) for m in sorted(months)}
+
+
+def main() -> None:
+    """Periodic compaction: pack all completed months (before the current one)."""
+    current = datetime.now(timezone.utc).strftime("%Y-%m")
+    packed = compact_before(SETTINGS.raw_dir, current, SETTINGS.raw_archive_compression)
+    for month, n in packed.items():
+        print(f"Compacted {n} raw files into archive_{month}")
+    if not packed:
+        print("Nothing to compact")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact raw files into monthly archives.")
+    parser.add_argument("--month", default=None, help="compact a single month (YYYY-MM)")
+    args = parser.parse_args()
+    if args.month:
+        n = compact_month(SETTINGS.raw_dir, args.month, SETTINGS.raw_archive_compression)
+        print(f"Compacted {n} raw files into archive_{args.month}")
+    else:
+        main()
@@ -0,0 +1,280 @@
+# See documentation:
+# docs/11_queries.md
+
+# ------------------------------------------------------------
+# Read API over the weather indices (stdlib HTTP server)
+#
+# GET /latest                                 latest reading per station
+# GET /series?source_id=..&start=..&end=..    time range series
+#     [&interval=hourly|daily]                (from weather-rollup-*)
+# GET /by-provider[?start=..&end=..]          aggregation per provider
+#
+# Results are cached (TTL + LRU). The cache is dropped when
+# load_to_es finishes a load (data/load_generation changes).
+# Concurrent identical requests share one Elasticsearch query.
+# ------------------------------------------------------------
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from scripts import codec
+from scripts.config import SETTINGS
+from scripts.es_client import get_client
+from scripts.load_manifest import read_generation
+from scripts.rollup import INTERVALS, rollup_index
+
+MAX_SERIES_SIZE = 10_000
+MAX_STATIONS = 1000
+ROUTES = ("/latest", "/series", "/by-provider", "/stats")
+
+
+class BadRequest(ValueError):
+    """Invalid request parameters (HTTP 400); other errors are backend failures (502)."""
+
+
+class _InFlight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class ResultCache:
+    """
+    TTL + LRU cache with request coalescing.
+
+    get_or_load() runs the loader once per key; concurrent callers for the
+    same key wait for that result instead of querying Elasticsearch again.
+    All entries are dropped when generation() returns a new value.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_s: float,
+        generation: Callable[[], str] = lambda: "",
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.generation = generation
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._in_flight: Dict[Hashable, _InFlight] = {}
+        self._generation: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _check_generation(self) -> None:
+        generation = self.generation()
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            self._check_generation()
+            entry = self._entries.get(key)
+            if entry is not None and self.clock() < entry[0]:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _InFlight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        generation = self._generation
+        try:
+            flight.value = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                # a load that finished meanwhile may have made the result stale
+                if flight.error is None and generation == self._generation:
+                    self._entries[key] = (self.clock() + self.ttl_s, flight.value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            flight.done.set()
+        return flight.value
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+
+def _time_range(field: str, start: Optional[str], end: Optional[str]) -> List[Dict[str, Any]]:
+    bounds = {}
+    for op, name, value in (("gte", "start", start), ("lt", "end", end)):
+        if value:
+            try:
+                datetime.fromisoformat(value.replace("Z", "+00:00"))
+            except ValueError as e:
+                raise BadRequest(f"{name} must be an ISO timestamp: {value!r}") from e
+            bounds[op] = value
+    return [{"range": {field: bounds}}] if bounds else []
+
+
+def latest_query() -> Dict[str, Any]:
+    return {
+        "size": 0,
+        "aggs": {
+            "station": {
+                "terms": {"field": "source_id", "size": MAX_STATIONS},
+                "aggs": {"latest": {"top_hits": {"size": 1, "sort": [{"timestamp": {"order": "desc"}}]}}},
+            }
+        },
+    }
+
+
+def series_query(source_id: str, start: Optional[str], end: Optional[str], interval: Optional[str]) -> Dict[str, Any]:
+    field = "bucket_start" if interval else "timestamp"
+    flt = [{"term": {"source_id": source_id}}] + _time_range(field, start, end)
+    if interval:
+        flt.append({"term": {"interval": interval}})
+    return {"size": MAX_SERIES_SIZE, "sort": [{field: {"order": "asc"}}], "query": {"bool": {"filter": flt}}}
+
+
+def by_provider_query(start: Optional[str], end: Optional[str]) -> Dict[str, Any]:
+    return {
+        "size": 0,
+        "query": {"bool": {"filter": _time_range("timestamp", start, end)}},
+        "aggs": {
+            "provider": {
+                "terms": {"field": "provider", "size": 100},
+                "aggs": {
+                    "stations": {"cardinality": {"field": "source_id"}},
+                    "latest": {"max": {"field": "timestamp"}},
+                    "temperature_avg": {"avg": {"field": "temperature"}},
+                },
+            }
+        },
+    }
+
+
+class ReadService:
+    def __init__(self, cache: ResultCache, es_url: Optional[str] = None, index: Optional[str] = None) -> None:
+        self.cache = cache
+        self.es = (es_url or SETTINGS.es_url).rstrip("/")
+        self.index = index or SETTINGS.alias_name or SETTINGS.index_name
+
+    def search(self, index: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        url = f"{self.es}/{index}/_search"
+        status, text = get_client(url).request("POST", url, codec.dumps(body))
+        if status >= 300:
+            raise RuntimeError(f"POST {url} failed: status={status}, body={text[:200]}")
+        return codec.loads(text)
+
+    def latest(self) -> List[Dict[str, Any]]:
+        res = self.search(self.index, latest_query())
+        buckets = res.get("aggregations", {}).get("station", {}).get("buckets", [])
+        return [h["_source"] for b in buckets for h in b["latest"]["hits"]["hits"]]
+
+    def series(
+        self, source_id: str, start: Optional[str] = None, end: Optional[str] = None, interval: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        if interval and interval not in INTERVALS:
+            raise BadRequest(f"interval must be one of {sorted(INTERVALS)}")
+        index = rollup_index(interval) if interval else self.index
+        res = self.search(index, series_query(source_id, start, end, interval))
+        return [h["_source"] for h in res.get("hits", {}).get("hits", [])]
+
+    def by_provider(self, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+        res = self.search(self.index, by_provider_query(start, end))
+        return [
+            {
+                "provider": b["key"],
+                "docs": b["doc_count"],
+                "stations": b["stations"]["value"],
+                "latest": b["latest"].get("value_as_string"),
+                "temperature_avg": b["temperature_avg"]["value"],
+            }
+            for b in res.get("aggregations", {}).get("provider", {}).get("buckets", [])
+        ]
+
+    def handle(self, path: str, params: Dict[str, str]) -> Any:
+        """Route a GET request; identical (path, params) are served from the cache."""
+        if path == "/latest":
+            loader = self.latest
+        elif path == "/series":
+            if not params.get("source_id"):
+                raise BadRequest("source_id is required")
+            loader = lambda: self.series(params["source_id"], params.get("start"), params.get("end"), params.get("interval"))  # noqa: E731
+        elif path == "/by-provider":
+            loader = lambda: self.by_provider(params.get("start"), params.get("end"))  # noqa: E731
+        elif path == "/stats":
+            return self.cache.stats()
+        else:
+            raise BadRequest(f"unknown path {path}")
+        return self.cache.get_or_load((path, tuple(sorted(params.items()))), loader)
+
+
+def make_handler(service: ReadService) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            url = urlsplit(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                if url.path not in ROUTES:
+                    status, body = 404, {"error": f"unknown path {url.path}"}
+                else:
+                    status, body = 200, service.handle(url.path, params)
+            except BadRequest as e:
+                status, body = 400, {"error": str(e)}
+            except Exception as e:
+                status, body = 502, {"error": str(e)}
+            data = codec.dumps(body)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def main() -> None:
+    host = os.getenv("READ_SERVICE_HOST", "0.0.0.0")
+    port = int(os.getenv("READ_SERVICE_PORT", "8081"))
+    cache = ResultCache(
+        max_entries=int(os.getenv("READ_CACHE_SIZE", "256")),
+        ttl_s=float(os.getenv("READ_CACHE_TTL", "30")),
+        generation=lambda: read_generation(SETTINGS.processed_dir),
+    )
+    server = ThreadingHTTPServer((host, port), make_handler(ReadService(cache)))
+    print(f"Read service on http://{host}:{port} (ES {SETTINGS.es_url}, cache ttl {cache.ttl_s}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
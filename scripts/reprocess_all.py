@@ -0,0 +1,153 @@
+# See documentation:
+# docs/08_preprocessing.md
+
+# ------------------------------------------------------------
+# Reprocess the raw layer (e.g. after a schema change)
+#
+# Discovers every (run_id, provider) in data/raw/ (single files and
+# monthly archives) and runs the provider's preprocess step for each,
+# distributed over a ProcessPoolExecutor. A failing file does not stop
+# the others; failures are reported together at the end.
+#
+# Outputs are the same files the daily preprocess tasks write:
+# processed_<run_id>__<provider>.ndjson
+# ------------------------------------------------------------
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from scripts import preprocess_brightsky, preprocess_hs_wetter, raw_store
+from scripts.config import SETTINGS
+
+
+# handler(run_id, raw_provider, raw_dir, processed_dir)
+Handler = Callable[[str, str, Path, Path], None]
+
+
+def _brightsky(run_id: str, raw_provider: str, raw_dir: Path, processed_dir: Path) -> None:
+    preprocess_brightsky.process_raw(run_id, raw_provider, raw_dir, processed_dir)
+
+
+def _hs_worms(run_id: str, raw_provider: str, raw_dir: Path, processed_dir: Path) -> None:
+    preprocess_hs_wetter.process_raw(run_id, raw_dir, processed_dir)
+
+
+def _hs_worms_stream(run_id: str, raw_provider: str, raw_dir: Path, processed_dir: Path) -> None:
+    preprocess_hs_wetter.process_stream(run_id, raw_provider, raw_dir, processed_dir)
+
+
+# raw provider (or prefix before "-<location>") -> preprocess step; exact names win
+HANDLERS: Dict[str, Handler] = {
+    "brightsky": _brightsky,
+    "hs-worms": _hs_worms,
+    "hs-worms-stream": _hs_worms_stream,
+}
+
+
+def handler_for(raw_provider: str) -> Optional[Handler]:
+    if raw_provider in HANDLERS:
+        return HANDLERS[raw_provider]
+    for name, handler in HANDLERS.items():
+        if raw_provider.startswith(f"{name}-"):
+            return handler
+    return None
+
+
+def discover(
+    raw_dir: Path,
+    providers: Optional[List[str]] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> List[Tuple[str, str]]:
+    """(run_id, raw_provider) pairs to reprocess, filtered by provider and run_id range (inclusive)."""
+    tasks = []
+    for run_id, raw_provider in raw_store.list_raw(raw_dir):
+        if handler_for(raw_provider) is None:
+            continue
+        if providers and not any(raw_provider == p or raw_provider.startswith(f"{p}-") for p in providers):
+            continue
+        if since and run_id < since:
+            continue
+        if until and run_id > until:
+            continue
+        tasks.append((run_id, raw_provider))
+    return tasks
+
+
+def _process_one(run_id: str, raw_provider: str, raw_dir: Path, processed_dir: Path) -> Tuple[str, str, Optional[str]]:
+    # directories are passed explicitly, so workers (also with spawn) and the
+    # in-process path use the driver's directories without patching SETTINGS
+    try:
+        handler = handler_for(raw_provider)
+        if handler is None:
+            raise ValueError(f"No preprocess step for provider {raw_provider!r}")
+        handler(run_id, raw_provider, raw_dir, processed_dir)
+    except Exception as e:
+        return run_id, raw_provider, f"{type(e).__name__}: {e}"
+    return run_id, raw_provider, None
+
+
+def reprocess(
+    tasks: List[Tuple[str, str]],
+    workers: int,
+    raw_dir: Path,
+    processed_dir: Path,
+) -> List[str]:
+    """
+    Run all tasks; workers <= 1 runs in-process.
+
+    Returns the failures as "run_id provider: error" strings.
+    """
+    failed: List[str] = []
+
+    def record(result: Tuple[str, str, Optional[str]]) -> None:
+        run_id, raw_provider, error = result
+        if error:
+            failed.append(f"{run_id} {raw_provider}: {error}")
+            print(f"FAILED {run_id} {raw_provider}: {error}")
+
+    processed_dir.mkdir(parents=True, exist_ok=True)
+    if workers <= 1:
+        for run_id, raw_provider in tasks:
+            record(_process_one(run_id, raw_provider, raw_dir, processed_dir))
+        return failed
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_process_one, run_id, raw_provider, raw_dir, processed_dir) for run_id, raw_provider in tasks
+        ]
+        for fut in as_completed(futures):
+            record(fut.result())
+    return failed
+
+
+def main(
+    providers: Optional[List[str]] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    workers: Optional[int] = None,
+) -> None:
+    workers = workers or int(os.getenv("REPROCESS_WORKERS", "0")) or os.cpu_count() or 1
+    tasks = discover(SETTINGS.raw_dir, providers, since, until)
+    print(f"Reprocess: {len(tasks)} raw files, {workers} workers")
+
+    t0 = time.perf_counter()
+    failed = reprocess(tasks, workers, SETTINGS.raw_dir, SETTINGS.processed_dir)
+    print(f"Reprocess done: {len(tasks) - len(failed)} ok, {len(failed)} failed in {time.perf_counter() - t0:.1f}s")
+
+    if failed:
+        raise RuntimeError(f"Reprocess failed for {len(failed)} raw files: {sorted(failed)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reprocess all raw files into the processed layer.")
+    parser.add_argument("--provider", action="append", default=None, help="limit to provider (repeatable)")
+    parser.add_argument("--since", default=None, help="first run_id (inclusive)")
+    parser.add_argument("--until", default=None, help="last run_id (inclusive)")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: REPROCESS_WORKERS or CPU count)")
+    args = parser.parse_args()
+    main(args.provider, args.since, args.until, args.workers)
@@ -0,0 +1,214 @@
+# See documentation:
+# docs/09_elasticsearch_index_design.md
+
+# ------------------------------------------------------------
+# Incremental hourly/daily rollups (after load_to_es)
+#
+# Only the (provider, source_id, hour/day) buckets touched by the
+# processed files of the run are recomputed from all-data and
+# upserted into weather-rollup-hourly / weather-rollup-daily
+# (deterministic doc_id per bucket -> index action replaces it).
+# Large (backfill) runs are split into windows (hourly: per day,
+# daily: per month) and station groups, so no single aggregation
+# exceeds search.max_buckets.
+# ------------------------------------------------------------
+
+import argparse
+import hashlib
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+from scripts import codec
+from scripts.config import SETTINGS
+from scripts.load_manifest import bump_generation
+from scripts.load_to_es import http_request, processed_files_for_run, read_processed, send_bulk
+
+ROLLUP_INDEX_PREFIX = "weather-rollup"
+INTERVALS = {"hourly": "hour", "daily": "day"}
+ROLLUP_FIELDS = ("temperature", "pressure_msl", "wind_speed", "precipitation")
+SUM_FIELDS = {"precipitation"}
+ROLLUP_CHUNK = 1000
+# histogram buckets per query; well below the ES default search.max_buckets (65,536)
+MAX_QUERY_BUCKETS = 10_000
+# upper bound of histogram buckets per station in one window (hours per day, days per month)
+WINDOW_BUCKETS = {"hourly": 24, "daily": 31}
+
+# (provider, source_id, bucket_start) of one interval
+Bucket = Tuple[str, str, datetime]
+
+
+def rollup_index(interval: str) -> str:
+    return f"{ROLLUP_INDEX_PREFIX}-{interval}"
+
+
+def bucket_start(ts: datetime, interval: str) -> datetime:
+    ts = ts.astimezone(timezone.utc)
+    if interval == "hourly":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _as_dict(doc: Any) -> Dict[str, Any]:
+    # raw (doc_id, line bytes) pair from NDJSON or a Parquet row
+    return codec.loads(doc[1]) if isinstance(doc, tuple) else doc
+
+
+def touched_buckets(files: Iterable[Path]) -> Dict[str, Set[Bucket]]:
+    """Buckets per interval that contain at least one document of the given processed files."""
+    touched: Dict[str, Set[Bucket]] = {interval: set() for interval in INTERVALS}
+    for path in files:
+        for doc in map(_as_dict, read_processed(path)):
+            ts = doc.get("timestamp")
+            if not ts:
+                continue
+            provider, source_id = str(doc.get("provider")), str(doc.get("source_id"))
+            when = datetime.fromisoformat(ts)
+            for interval in INTERVALS:
+                touched[interval].add((provider, source_id, bucket_start(when, interval)))
+    return touched
+
+
+def _window_key(start: datetime, interval: str) -> Tuple[int, ...]:
+    if interval == "hourly":
+        return start.year, start.month, start.day
+    return start.year, start.month
+
+
+def query_windows(buckets: Set[Bucket], interval: str) -> Iterator[Set[Bucket]]:
+    """
+    Split touched buckets into groups that each fit into one aggregation:
+    one time window (hourly: day, daily: month) and at most
+    MAX_QUERY_BUCKETS // WINDOW_BUCKETS[interval] stations.
+    """
+    per_window: Dict[Tuple[int, ...], Dict[Tuple[str, str], Set[Bucket]]] = defaultdict(lambda: defaultdict(set))
+    for b in buckets:
+        per_window[_window_key(b[2], interval)][(b[0], b[1])].add(b)
+
+    max_stations = max(1, MAX_QUERY_BUCKETS // WINDOW_BUCKETS[interval])
+    for key in sorted(per_window):
+        stations = sorted(per_window[key])
+        for i in range(0, len(stations), max_stations):
+            yield {b for station in stations[i:i + max_stations] for b in per_window[key][station]}
+
+
+def build_query(buckets: Set[Bucket], interval: str) -> Dict[str, Any]:
+    """One aggregation over the time range and stations of the touched buckets (see query_windows)."""
+    starts = [b[2] for b in buckets]
+    first = min(starts).replace(hour=0)
+    last = max(starts).replace(hour=0) + timedelta(days=1)
+    providers = sorted({b[0] for b in buckets})
+    sources = sorted({b[1] for b in buckets})
+    stats = {field: {"stats": {"field": field}} for field in ROLLUP_FIELDS}
+    return {
+        "size": 0,
+        "query": {
+            "bool": {
+                "filter": [
+                    {"range": {"timestamp": {"gte": first.isoformat(), "lt": last.isoformat()}}},
+                    {"terms": {"provider": providers}},
+                    {"terms": {"source_id": sources}},
+                ]
+            }
+        },
+        "aggs": {
+            "provider": {
+                "terms": {"field": "provider", "size": len(providers)},
+                "aggs": {
+                    "source": {
+                        "terms": {"field": "source_id", "size": len(sources)},
+                        "aggs": {
+                            "bucket": {
+                                "date_histogram": {
+                                    "field": "timestamp",
+                                    "calendar_interval": INTERVALS[interval],
+                                    "time_zone": "UTC",
+                                    "min_doc_count": 1,
+                                },
+                                "aggs": stats,
+                            }
+                        },
+                    }
+                },
+            }
+        },
+    }
+
+
+def rollup_doc_id(interval: str, provider: str, source_id: str, start: datetime) -> str:
+    return hashlib.sha256(f"{interval}|{provider}|{source_id}|{start.isoformat()}".encode("utf-8")).hexdigest()
+
+
+def rollup_docs(response: Dict[str, Any], buckets: Set[Bucket], interval: str) -> List[Dict[str, Any]]:
+    """Rollup documents for the touched buckets from an aggregation response."""
+    rolled_up_at = datetime.now(timezone.utc).isoformat()
+    docs = []
+    for p in response.get("aggregations", {}).get("provider", {}).get("buckets", []):
+        for s in p.get("source", {}).get("buckets", []):
+            for b in s.get("bucket", {}).get("buckets", []):
+                start = datetime.fromtimestamp(b["key"] / 1000, tz=timezone.utc)
+                if (p["key"], s["key"], start) not in buckets:
+                    continue
+                doc: Dict[str, Any] = {
+                    "doc_id": rollup_doc_id(interval, p["key"], s["key"], start),
+                    "interval": interval,
+                    "provider": p["key"],
+                    "source_id": s["key"],
+                    "bucket_start": start.isoformat(),
+                    "doc_count": b["doc_count"],
+                    "rolled_up_at": rolled_up_at,
+                }
+                for field in ROLLUP_FIELDS:
+                    st = b.get(field) or {}
+                    doc[f"{field}_min"] = st.get("min")
+                    doc[f"{field}_max"] = st.get("max")
+                    doc[f"{field}_avg"] = st.get("avg")
+                    if field in SUM_FIELDS:
+                        doc[f"{field}_sum"] = st.get("sum") if st.get("count") else None
+                docs.append(doc)
+    return docs
+
+
+def rollup_interval(buckets: Set[Bucket], interval: str) -> int:
+    es = SETTINGS.es_url.rstrip("/")
+    source = SETTINGS.alias_name or SETTINGS.index_name
+    index = rollup_index(interval)
+    bulk_url = f"{es}/_bulk?filter_path=took,errors,items.*.status,items.*.error"
+
+    n = 0
+    for window in query_windows(buckets, interval):
+        status, text = http_request("POST", f"{es}/{source}/_search", codec.dumps(build_query(window, interval)))
+        if status >= 300:
+            raise RuntimeError(f"Rollup query failed: status={status}, body={text[:200]}")
+        docs = rollup_docs(codec.loads(text), window, interval)
+
+        # own metric names (pipeline_rollup_*), the load stage counters stay untouched
+        for i in range(0, len(docs), ROLLUP_CHUNK):
+            send_bulk(bulk_url, index, docs[i:i + ROLLUP_CHUNK], partitioned=False, stage="rollup")
+        n += len(docs)
+    return n
+
+
+def main(run_id: str | None = None) -> None:
+    """Recompute the rollup buckets touched by the processed files of a run."""
+    files = processed_files_for_run(SETTINGS.processed_dir, run_id)
+    touched = touched_buckets(files)
+
+    for interval, buckets in touched.items():
+        if not buckets:
+            print(f"Rollup {interval}: nothing touched")
+            continue
+        n = rollup_interval(buckets, interval)
+        print(f"Rollup {interval}: {len(buckets)} touched buckets, upserted {n} docs into {rollup_index(interval)}")
+
+    if any(touched.values()):
+        # rollup indices changed after finalize_load: invalidate read caches again
+        bump_generation(SETTINGS.processed_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update hourly/daily rollups for a run.")
+    parser.add_argument("--run-id", default=None, help="Airflow run id (default: latest processed file)")
+    args = parser.parse_args()
+    main(args.run_id)
@@ -0,0 +1,236 @@
+# See documentation:
+# docs/06_ingestion_pipeline.md
+
+# ------------------------------------------------------------
+# Streaming mode for the HS-Worms station
+#
+# Long-running poller (instead of one reading per daily run):
+# - polls HS_WETTER_URL every HS_STREAM_INTERVAL seconds
+# - skips readings whose payload "ts" was already seen
+# - normalizes in memory (preprocess_hs_wetter.normalize)
+# - micro-batches documents into _bulk by count/bytes/age
+# - appends raw copies asynchronously to one file per day
+#   (data/raw/raw_<YYYY-MM-DD>__hs-worms-stream.ndjson) for audit/reprocessing
+# - bumps the load generation after each flush (read-service caches)
+# ------------------------------------------------------------
+
+import os
+import queue
+import signal
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from scripts import codec, load_to_es, raw_store
+from scripts.config import SETTINGS
+from scripts.http_cache import cached_get
+from scripts.load_manifest import bump_generation
+from scripts.preprocess_hs_wetter import normalize
+
+PROVIDER = "hs-worms"
+# raw provider of the daily stream files (reprocess_all: preprocess_hs_wetter.process_stream)
+RAW_PROVIDER = "hs-worms-stream"
+
+# documents kept for the next flush if _bulk fails, oldest are dropped beyond
+# this (the raw copies allow reprocessing them later)
+MAX_BUFFERED_DOCS = 10_000
+
+
+def fetch_payload(url: str, timeout: int = 10) -> Dict[str, Any]:
+    """
+    GET the current reading (no disk cache: the reading changes every poll,
+    a cache entry would only add a write + fsync per request).
+    """
+    body, ct, _ = cached_get(url, None, timeout=timeout, headers={"Accept": "application/json"})
+    if "json" not in ct:
+        raise RuntimeError(f"Unexpected Content-Type: {ct}, body starts: {body[:200]!r}")
+    return codec.loads(body)
+
+
+def send_to_es(docs: List[Dict[str, Any]]) -> None:
+    load_to_es.send_bulk(load_to_es.bulk_endpoint(), load_to_es.load_target(), docs)
+    # streamed readings must not hide behind cached read-service results
+    bump_generation(SETTINGS.processed_dir)
+
+
+class MicroBatcher:
+    """
+    Buffers documents and sends them as one _bulk request when
+    max_docs or max_bytes is reached or the oldest document is max_age_s old.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[List[Dict[str, Any]]], None],
+        max_docs: int,
+        max_bytes: int,
+        max_age_s: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.send = send
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.clock = clock
+        self.docs: List[Dict[str, Any]] = []
+        self.bytes = 0
+        self.first_at: Optional[float] = None
+        self.sent = 0
+
+    def add(self, doc: Dict[str, Any]) -> None:
+        if not self.docs:
+            self.first_at = self.clock()
+        self.docs.append(doc)
+        self.bytes += len(codec.dumps(doc))
+        if len(self.docs) >= self.max_docs or self.bytes >= self.max_bytes:
+            self.flush()
+
+    def deadline(self) -> Optional[float]:
+        """Clock time at which the buffered batch is due (None if empty)."""
+        return None if self.first_at is None else self.first_at + self.max_age_s
+
+    def due(self) -> bool:
+        deadline = self.deadline()
+        return deadline is not None and self.clock() >= deadline
+
+    def flush(self) -> bool:
+        if not self.docs:
+            return True
+        try:
+            self.send(self.docs)
+        except Exception as e:
+            print(f"Bulk flush failed ({len(self.docs)} docs kept): {e}")
+            if len(self.docs) > MAX_BUFFERED_DOCS:
+                dropped = len(self.docs) - MAX_BUFFERED_DOCS
+                self.docs = self.docs[dropped:]
+                self.bytes = sum(len(codec.dumps(d)) for d in self.docs)
+                print(f"Dropped {dropped} oldest buffered docs (raw copies remain)")
+            # retry after another max_age_s
+            self.first_at = self.clock()
+            return False
+        self.sent += len(self.docs)
+        self.docs = []
+        self.bytes = 0
+        self.first_at = None
+        return True
+
+
+class RawWriter:
+    """Appends raw copies on a background thread so polling never waits on disk."""
+
+    def __init__(self) -> None:
+        self.queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self.written = 0
+        self.thread = threading.Thread(target=self._run, name="hs-raw-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, run_id: str, raw: Dict[str, Any]) -> None:
+        self.queue.put((run_id, raw))
+
+    def _run(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            run_id, raw = item
+            try:
+                raw_store.append_raw(SETTINGS.raw_dir, run_id, RAW_PROVIDER, raw)
+                self.written += 1
+            except Exception as e:
+                print(f"Raw copy {run_id} failed: {e}")
+
+    def close(self) -> None:
+        self.queue.put(None)
+        self.thread.join()
+
+
+class HsStreamer:
+    def __init__(
+        self,
+        url: str,
+        station_id: str,
+        batcher: MicroBatcher,
+        raw_writer: RawWriter,
+        fetch: Callable[[str], Dict[str, Any]] = fetch_payload,
+    ) -> None:
+        self.url = url
+        self.station_id = station_id
+        self.batcher = batcher
+        self.raw_writer = raw_writer
+        self.fetch = fetch
+        self.last_ts: Optional[int] = None
+        self.duplicates = 0
+
+    def poll_once(self) -> Optional[Dict[str, Any]]:
+        """Fetch one reading; returns the new document or None (duplicate ts)."""
+        payload = self.fetch(self.url)
+        ts = payload.get("ts")
+        if ts is None:
+            raise RuntimeError("HS payload missing 'ts'")
+        ts = int(ts)
+        if self.last_ts is not None and ts <= self.last_ts:
+            self.duplicates += 1
+            return None
+        self.last_ts = ts
+
+        # raw run_id = measurement day: all readings of a day go into one file
+        run_id = datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d")
+        fetched_at = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self.raw_writer.submit(run_id, {"fetched_at": fetched_at, "provider": PROVIDER, "endpoint": self.url, "payload": payload})
+
+        doc = normalize(payload, self.station_id)
+        self.batcher.add(doc)
+        return doc
+
+    def run(self, interval_s: float, stop: threading.Event, max_polls: Optional[int] = None) -> None:
+        """Poll until stop is set (or max_polls reached); flushes the last batch on exit."""
+        clock = self.batcher.clock
+        next_poll = clock()
+        polls = 0
+        try:
+            while not stop.is_set():
+                if clock() >= next_poll:
+                    try:
+                        self.poll_once()
+                    except Exception as e:
+                        print(f"Poll failed: {e}")
+                    polls += 1
+                    next_poll += interval_s
+                    if max_polls is not None and polls >= max_polls:
+                        break
+                if self.batcher.due():
+                    self.batcher.flush()
+
+                deadline = self.batcher.deadline()
+                wake = next_poll if deadline is None else min(next_poll, deadline)
+                stop.wait(max(0.0, wake - clock()))
+        finally:
+            self.batcher.flush()
+            self.raw_writer.close()
+
+
+def main() -> None:
+    url = os.getenv("HS_WETTER_URL", "https://wetter.hs-worms.de/api/v3/data").strip()
+    station_id = os.getenv("HS_STATION_ID", "hs-worms")
+    interval_s = float(os.getenv("HS_STREAM_INTERVAL", "10"))
+
+    batcher = MicroBatcher(
+        send_to_es,
+        max_docs=int(os.getenv("HS_STREAM_BATCH_DOCS", "100")),
+        max_bytes=int(os.getenv("HS_STREAM_BATCH_BYTES", str(1024 * 1024))),
+        max_age_s=float(os.getenv("HS_STREAM_FLUSH_S", "2")),
+    )
+    streamer = HsStreamer(url, station_id, batcher, RawWriter())
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    print(f"Streaming HS: {url} every {interval_s}s")
+    streamer.run(interval_s, stop)
+    print(f"Stopped. Indexed {batcher.sent} docs, skipped {streamer.duplicates} duplicate readings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# See documentation:
+# docs/13_tests.md
+
+from pathlib import Path
+
+from benchmarks import bench_ingest, bench_load, synthetic
+from scripts import codec, load_to_es
+from scripts.preprocess_brightsky import iter_processed_docs
+from scripts.preprocess_hs_wetter import normalize
+
+
+def test_synthetic_data_matches_preprocessing_input() -> None:
+    raw = synthetic.brightsky_raw(30, stations=3)
+    docs = list(iter_processed_docs(raw))
+
+    assert len(docs) == 30
+    assert {d["source_id"] for d in docs} == {"1000", "1001", "1002"}
+    assert docs[3]["timestamp"] == "2026-01-01T01:00:00+00:00"
+    assert all(d["temperature"] is not None for d in docs)
+
+    hs = normalize(synthetic.hs_payloads(2)[1], "hs-worms")
+    assert hs["timestamp"] == "2026-01-01T00:01:00+00:00"
+    assert hs["wind_speed"] is not None
+
+    # deterministic for the same seed
+    assert synthetic.brightsky_raw(5) == synthetic.brightsky_raw(5)
+
+
+def test_suite_runs_all_cases_at_small_scale() -> None:
+    report = bench_ingest.run_suite(docs=200, stations=4, chunk_size=50, repeat=1)
+
+    assert set(report["results"]) == {
+        "iter_processed_docs",
+        "iter_ndjson_lines",
+        "hs_normalize",
+        "read_ndjson",
+        "read_ndjson_raw",
+        "chunked",
+        "build_bulk_body",
+        "build_bulk_body_raw",
+        "parse_bulk_response",
+    }
+    for r in report["results"].values():
+        assert r["docs"] == 200
+        assert r["docs_per_s"] > 0
+        assert r["peak_kib"] >= 0
+
+
+def test_compare_flags_regressions_against_baseline() -> None:
+    baseline = {"results": {"a": {"docs_per_s": 1000.0}, "b": {"docs_per_s": 1000.0}}}
+    current = {"results": {"a": {"docs_per_s": 850.0}, "b": {"docs_per_s": 700.0}, "new": {"docs_per_s": 1.0}}}
+
+    assert bench_ingest.compare(current, baseline, max_regression=0.2) == ["b"]
+
+
+def test_load_scenario_restores_loader_settings(tmp_path: Path) -> None:
+    processed = tmp_path / "processed" / "processed_bench__brightsky.ndjson"
+    processed.parent.mkdir()
+    processed.write_bytes(b"".join(codec.dumps(d) + b"\n" for d in iter_processed_docs(synthetic.brightsky_raw(20))))
+    before = load_to_es.SETTINGS
+
+    result = bench_load.run_scenario("sequential", processed, 20, latency_s=0.0, reject_rate=0.0, max_body_bytes=None)
+
+    assert result["bulk_requests"] == 1
+    assert load_to_es.SETTINGS is before
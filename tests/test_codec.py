@@ -0,0 +1,45 @@
+# See documentation:
+# docs/13_tests.md
+
+import json
+
+import pytest
+
+from scripts import codec
+
+
+DOC = {
+    "doc_id": "abc",
+    "provider": "hs-worms",
+    "temperature": 8.3,
+    "relative_humidity": 89,
+    "condition": "Regen ☔",
+    "icon": None,
+}
+
+
+def test_dumps_is_compact_utf8_and_round_trips() -> None:
+    data = codec.dumps(DOC)
+
+    assert isinstance(data, bytes)
+    assert data.startswith(b'{"doc_id":"abc",')
+    assert "☔".encode("utf-8") in data
+    assert codec.loads(data) == DOC
+    assert codec.loads(data.decode("utf-8")) == DOC
+    assert json.loads(data) == DOC
+
+
+def test_stdlib_fallback_is_byte_compatible(monkeypatch: pytest.MonkeyPatch) -> None:
+    fast = codec.dumps(DOC)
+
+    monkeypatch.setattr(codec, "orjson", None)
+
+    assert codec.dumps(DOC) == fast
+    assert codec.loads(fast) == DOC
+
+
+def test_dumps_indent_produces_equivalent_json() -> None:
+    data = codec.dumps(DOC, indent=True)
+
+    assert b"\n  " in data
+    assert codec.loads(data) == DOC
@@ -0,0 +1,61 @@
+# See documentation:
+# docs/13_tests.md
+
+from pathlib import Path
+
+import pytest
+
+from scripts import columnar
+from scripts.load_to_es import processed_files_for_run
+
+
+def test_template_fields_follow_index_mapping() -> None:
+    fields = dict(columnar.template_fields())
+
+    assert fields["doc_id"] == "keyword"
+    assert fields["timestamp"] == "date"
+    assert fields["temperature"] == "float"
+    assert fields["wind_direction"] == "integer"
+    assert list(fields)[:5] == ["doc_id", "provider", "source_id", "timestamp", "processed_at"]
+
+
+def test_processed_files_prefer_ndjson_and_fall_back_to_parquet(tmp_path: Path) -> None:
+    (tmp_path / "processed_2026-02-12__brightsky.ndjson").write_text("x\n", encoding="utf-8")
+    (tmp_path / "processed_2026-02-12__brightsky.parquet").write_bytes(b"PAR1")
+    (tmp_path / "processed_2026-02-12__hs-worms.parquet").write_bytes(b"PAR1")
+
+    files = processed_files_for_run(tmp_path, "2026-02-12")
+
+    assert [f.name for f in files] == [
+        "processed_2026-02-12__brightsky.ndjson",
+        "processed_2026-02-12__hs-worms.parquet",
+    ]
+
+
+def test_parquet_round_trip_matches_ndjson_documents(tmp_path: Path) -> None:
+    pytest.importorskip("pyarrow")
+    docs = [
+        {
+            "doc_id": f"id-{h}",
+            "provider": "brightsky" if h % 2 else "hs-worms",
+            "source_id": "7307",
+            "timestamp": f"2026-02-12T{h:02d}:00:00+00:00",
+            "processed_at": "2026-02-12T10:15:00.123456+00:00",
+            "temperature": 8.3,
+            "relative_humidity": 89,
+            "wind_direction": None,
+            "condition": "dry",
+        }
+        for h in range(4)
+    ]
+    out = columnar.write_parquet(docs, tmp_path / "processed_2026-02-12__brightsky.parquet")
+
+    back = list(columnar.read_parquet_docs(out))
+
+    assert len(back) == 4
+    for doc, row in zip(docs, back):
+        assert {k: row[k] for k in doc} == doc
+        assert row["solar"] is None
+
+    only = list(columnar.read_parquet_docs(out, filters=[("provider", "=", "brightsky")]))
+    assert [r["doc_id"] for r in only] == ["id-1", "id-3"]
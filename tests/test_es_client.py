@@ -0,0 +1,107 @@
+# See documentation:
+# docs/13_tests.md
+
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+import pytest
+
+from scripts.es_client import EsClient, EsConnectionError
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    peers: set = set()
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        gzipped = self.headers.get("Content-Encoding") == "gzip"
+        if gzipped:
+            body = gzip.decompress(body)
+        Handler.peers.add(self.client_address)
+        status = 404 if self.path.startswith("/missing") else 200
+        out = json.dumps({"path": self.path, "len": len(body), "gzip": gzipped}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            out = gzip.compress(out)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(out)))
+        if self.path.startswith("/close"):
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture()
+def server() -> Iterator[str]:
+    Handler.peers = set()
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_client_reuses_keep_alive_connection(server: str) -> None:
+    client = EsClient(server, timeout=5, pool_size=2)
+
+    for i in range(5):
+        status, text = client.request("POST", f"{server}/_bulk?n={i}", '{"a": 1}\n')
+        assert status == 200
+        assert json.loads(text)["path"] == f"/_bulk?n={i}"
+
+    assert len(Handler.peers) == 1
+    client.close()
+
+
+def test_client_returns_http_error_status(server: str) -> None:
+    client = EsClient(server, timeout=5, pool_size=1)
+
+    status, text = client.request("POST", "/missing/_refresh", "")
+
+    assert status == 404
+    assert json.loads(text)["len"] == 0
+    client.close()
+
+
+def test_client_reconnects_after_server_close(server: str) -> None:
+    client = EsClient(server, timeout=5, pool_size=1)
+
+    assert client.request("POST", "/close", "")[0] == 200
+    assert client.request("POST", "/after", "")[0] == 200
+    assert len(Handler.peers) == 2
+    client.close()
+
+
+def test_client_gzips_large_bodies_and_decodes_gzip_responses(server: str) -> None:
+    client = EsClient(server, timeout=5, pool_size=1, compress=True)
+    body = '{"index": {"_index": "all-data"}}\n' * 100
+
+    status, text = client.request("POST", "/_bulk", body, content_type="application/x-ndjson")
+
+    assert status == 200
+    resp = json.loads(text)
+    assert resp["gzip"] is True
+    assert resp["len"] == len(body)
+
+    # Small bodies stay uncompressed
+    status, text = client.request("POST", "/_refresh", "")
+    assert json.loads(text)["gzip"] is False
+    client.close()
+
+
+def test_client_raises_connection_error_when_unreachable() -> None:
+    client = EsClient("http://127.0.0.1:1", timeout=1, pool_size=1)
+
+    with pytest.raises(EsConnectionError):
+        client.request("GET", "/_cluster/health")
@@ -0,0 +1,161 @@
+# See documentation:
+# docs/13_tests.md
+
+import json
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from benchmarks.fake_es import FakeEs
+import scripts.load_to_es as lte
+from scripts import rollup
+from scripts.config import PROJECT_ROOT, Settings
+from scripts.read_service import ReadService, ResultCache
+
+PIPELINE = json.loads((PROJECT_ROOT / "db" / "elastic" / "ingest-pipeline.json").read_text(encoding="utf-8"))
+ALIASES = json.loads((PROJECT_ROOT / "db" / "elastic" / "aliases.json").read_text(encoding="utf-8"))
+
+
+def setup_cluster(es: FakeEs) -> None:
+    assert es.handle("PUT", f"/_ingest/pipeline/{lte.PIPELINE_NAME}", {}, json.dumps(PIPELINE).encode())[0] == 200
+    assert es.handle("POST", "/_aliases", {}, json.dumps(ALIASES).encode())[0] == 200
+
+
+def write_processed(path: Path, n: int) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    docs = (
+        {"doc_id": f"id-{i}", "provider": "brightsky", "source_id": "s1", "timestamp": f"2026-02-12T{i % 24:02d}:00:00+00:00", "temperature": i}
+        for i in range(n)
+    )
+    path.write_text("".join(json.dumps(d) + "\n" for d in docs), encoding="utf-8")
+
+
+@pytest.fixture()
+def processed(tmp_path: Path) -> Path:
+    f = tmp_path / "processed" / "processed_2026-02-12__brightsky.ndjson"
+    write_processed(f, 120)
+    return f
+
+
+def use_settings(monkeypatch: pytest.MonkeyPatch, tmp_path: Path, es: FakeEs, **kw) -> None:
+    settings = Settings(
+        raw_dir=tmp_path / "raw",
+        processed_dir=tmp_path / "processed",
+        es_url=es.url,
+        index_name="data-2026",
+        alias_name="all-data",
+        bulk_retry_base_s=0.001,
+        **kw,
+    )
+    monkeypatch.setattr(lte, "SETTINGS", settings)
+
+
+@pytest.fixture()
+def fake_es() -> Iterator[FakeEs]:
+    with FakeEs() as es:
+        setup_cluster(es)
+        yield es
+
+
+def test_load_files_end_to_end(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, fake_es: FakeEs, processed: Path) -> None:
+    use_settings(monkeypatch, tmp_path, fake_es)
+
+    total = lte.load_files([processed])
+
+    assert total is not None and total.created == 120
+    assert fake_es.count("all-data") == 120
+    assert fake_es.indices["data-2026"].settings["refresh_interval"] == "1s"
+    doc = fake_es.indices["data-2026"].docs["id-1"]
+    assert doc["timestamp"] == "2026-02-12T01:00:00.000Z"  # date processor of the ingest pipeline
+    assert doc["processed_at"].endswith("Z")
+
+    status, out = fake_es.handle("GET", "/all-data/_count", {}, json.dumps({"query": {"term": {"source_id": "s1"}}}).encode())
+    assert (status, out["count"]) == (200, 120)
+
+
+def test_docs_invisible_until_refresh(fake_es: FakeEs) -> None:
+    fake_es.handle("PUT", "/all-data/_settings", {}, b'{"index": {"refresh_interval": "-1"}}')
+    body = b'{"index":{"_index":"all-data","_id":"a"}}\n{"doc_id":"a"}\n'
+
+    status, out = fake_es.handle("POST", "/_bulk", {}, body)
+
+    assert status == 200 and out["items"][0]["index"]["status"] == 201
+    assert out["items"][0]["index"]["_index"] == "data-2026"
+    assert fake_es.count("all-data") == 0
+    fake_es.handle("POST", "/all-data/_refresh", {}, b"")
+    assert fake_es.count("all-data") == 1
+
+
+def test_rejections_are_retried_until_all_items_indexed(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, processed: Path
+) -> None:
+    with FakeEs(reject_rate=0.3, seed=7) as es:
+        setup_cluster(es)
+        use_settings(monkeypatch, tmp_path, es, bulk_max_retries=20)
+
+        total = lte.load_files([processed])
+
+        assert total is not None and total.items == 120
+        assert es.stats.rejected_items > 0
+        assert es.stats.bulk_items == 120 + es.stats.rejected_items
+        assert es.count("all-data") == 120
+
+
+def test_body_size_limit_returns_413(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, processed: Path) -> None:
+    with FakeEs(max_body_bytes=2048) as es:
+        setup_cluster(es)
+        use_settings(monkeypatch, tmp_path, es)
+
+        with pytest.raises(RuntimeError, match="status=413"):
+            lte.load_files([processed])
+        assert es.stats.too_large >= 1
+
+
+def test_parallel_workers_overlap_requests(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, processed: Path) -> None:
+    monkeypatch.setattr(lte, "CHUNK_SIZE", 10)
+    with FakeEs(latency_s=0.02) as es:
+        setup_cluster(es)
+        use_settings(monkeypatch, tmp_path, es, bulk_workers=4)
+
+        lte.load_files([processed])
+
+        assert es.stats.bulk_requests == 12
+        assert es.stats.max_in_flight >= 2
+        assert es.count("all-data") == 120
+
+
+def test_rollup_and_read_service_against_fake_es(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, fake_es: FakeEs, processed: Path
+) -> None:
+    use_settings(monkeypatch, tmp_path, fake_es)
+    monkeypatch.setattr(rollup, "SETTINGS", lte.SETTINGS)
+    lte.load_files([processed])
+
+    rollup.main("2026-02-12")
+
+    # 120 docs, hour = i % 24, temperature = i
+    hourly = fake_es.visible_docs("weather-rollup-hourly")
+    daily = fake_es.visible_docs("weather-rollup-daily")
+    assert len(hourly) == 24 and len(daily) == 1
+    first = next(d for d in hourly if d["bucket_start"] == "2026-02-12T00:00:00+00:00")
+    assert (first["doc_count"], first["temperature_min"], first["temperature_max"], first["temperature_avg"]) == (5, 0.0, 96.0, 48.0)
+    assert (daily[0]["doc_count"], daily[0]["temperature_avg"]) == (120, 59.5)
+
+    service = ReadService(ResultCache(max_entries=10, ttl_s=60), es_url=fake_es.url, index="all-data")
+    (latest,) = service.handle("/latest", {})
+    assert (latest["source_id"], latest["timestamp"]) == ("s1", "2026-02-12T23:00:00.000Z")
+    series = service.handle("/series", {"source_id": "s1", "interval": "hourly", "start": "2026-02-12T22:00:00+00:00"})
+    assert [d["bucket_start"] for d in series] == ["2026-02-12T22:00:00+00:00", "2026-02-12T23:00:00+00:00"]
+    assert service.handle("/by-provider", {}) == [
+        {"provider": "brightsky", "docs": 120, "stations": 1, "latest": "2026-02-12T23:00:00.000Z", "temperature_avg": 59.5}
+    ]
+
+
+def test_unsupported_aggregation_is_rejected(fake_es: FakeEs) -> None:
+    body = json.dumps({"size": 0, "aggs": {"p": {"percentiles": {"field": "temperature"}}}}).encode()
+
+    status, out = fake_es.handle("POST", "/all-data/_search", {}, body)
+
+    assert status == 400
+    assert "percentiles" in out["error"]["reason"]
@@ -0,0 +1,81 @@
+# See documentation:
+# docs/13_tests.md
+
+import json
+import urllib.parse
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+import scripts.fetch_brightsky as fb
+from scripts.config import Settings
+
+
+def test_date_windows_cover_range_without_overlap() -> None:
+    windows = fb.date_windows(date(2026, 1, 1), date(2026, 1, 25), 10)
+
+    assert windows == [
+        (date(2026, 1, 1), date(2026, 1, 10)),
+        (date(2026, 1, 11), date(2026, 1, 20)),
+        (date(2026, 1, 21), date(2026, 1, 25)),
+    ]
+
+
+def fake_api(calls: list):
+    def _http_get_json(url: str, timeout: int = 30) -> dict:
+        calls.append(url)
+        q = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+        first = datetime.fromisoformat(q["date"][0]).replace(tzinfo=timezone.utc)
+        last = datetime.fromisoformat(q["last_date"][0]).replace(tzinfo=timezone.utc)
+        weather = []
+        ts = first
+        # BrightSky includes the record at last_date
+        while ts <= last:
+            weather.append({"timestamp": ts.isoformat(), "source_id": 7307, "temperature": 1.0})
+            ts += timedelta(hours=1)
+        return {"weather": weather, "sources": [{"id": 7307}]}
+
+    return _http_get_json
+
+
+def test_backfill_writes_one_raw_file_per_day(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: list = []
+    monkeypatch.setattr(fb, "SETTINGS", Settings(raw_dir=tmp_path / "raw", processed_dir=tmp_path / "processed"))
+    monkeypatch.setattr(fb, "http_get_json", fake_api(calls))
+    monkeypatch.setenv("BRIGHTSKY_WINDOW_DAYS", "3")
+    monkeypatch.setenv("BRIGHTSKY_RATE_LIMIT", "0")
+
+    files = fb.backfill(date(2026, 2, 1), date(2026, 2, 7))
+
+    assert len(calls) == 3
+    assert [f.name for f in files] == [f"raw_2026-02-0{d}__brightsky.json" for d in range(1, 8)]
+    for f in files:
+        raw = json.loads(f.read_text(encoding="utf-8"))
+        day = f.name[len("raw_"):len("raw_") + 10]
+        assert raw["provider"] == "brightsky"
+        assert raw["date"] == day
+        assert len(raw["payload"]["weather"]) == 24
+        assert all(w["timestamp"].startswith(day) for w in raw["payload"]["weather"])
+        assert raw["payload"]["sources"] == [{"id": 7307}]
+
+
+def test_backfill_reports_failed_windows(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: list = []
+    ok = fake_api(calls)
+
+    def flaky(url: str, timeout: int = 30) -> dict:
+        if "&date=2026-02-04" in url:
+            raise RuntimeError("HTTP 500")
+        return ok(url, timeout)
+
+    monkeypatch.setattr(fb, "SETTINGS", Settings(raw_dir=tmp_path / "raw", processed_dir=tmp_path / "processed"))
+    monkeypatch.setattr(fb, "http_get_json", flaky)
+    monkeypatch.setenv("BRIGHTSKY_WINDOW_DAYS", "3")
+    monkeypatch.setenv("BRIGHTSKY_RATE_LIMIT", "0")
+
+    with pytest.raises(RuntimeError, match="1 windows"):
+        fb.backfill(date(2026, 2, 1), date(2026, 2, 7))
+
+    # the healthy windows are still written
+    assert len(list((tmp_path / "raw").glob("raw_*__brightsky.json"))) == 4
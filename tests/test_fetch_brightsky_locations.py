@@ -0,0 +1,121 @@
+# See documentation:
+# docs/13_tests.md
+
+import json
+import time
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+import scripts.fetch_brightsky as fb
+import scripts.preprocess_brightsky as br
+from scripts.config import Settings
+from scripts.load_to_es import processed_files_for_run
+
+
+def test_locations_from_env_and_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BRIGHTSKY_LOCATIONS", "worms:49.6:8.36, Mainz:50.0:8.27")
+    assert fb.locations() == [fb.Location("worms", "49.6", "8.36"), fb.Location("mainz", "50.0", "8.27")]
+
+    loc_file = tmp_path / "locations.json"
+    loc_file.write_text(json.dumps([{"name": "bingen", "lat": 49.97, "lon": 7.9}]), encoding="utf-8")
+    monkeypatch.setenv("BRIGHTSKY_LOCATIONS_FILE", str(loc_file))
+    assert fb.locations() == [fb.Location("bingen", "49.97", "7.9")]
+
+
+def test_locations_default_to_legacy_single_point(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.delenv("BRIGHTSKY_LOCATIONS", raising=False)
+    monkeypatch.delenv("BRIGHTSKY_LOCATIONS_FILE", raising=False)
+
+    (loc,) = fb.locations()
+
+    assert loc.raw_provider == "brightsky"
+
+
+@pytest.mark.parametrize("spec", ["a__b:1:2", "worms:1", "x:1:2,x:3:4"])
+def test_invalid_locations_raise(monkeypatch: pytest.MonkeyPatch, spec: str) -> None:
+    monkeypatch.setenv("BRIGHTSKY_LOCATIONS", spec)
+    monkeypatch.delenv("BRIGHTSKY_LOCATIONS_FILE", raising=False)
+
+    with pytest.raises(ValueError):
+        fb.locations()
+
+
+def test_fan_out_writes_one_raw_file_per_location_and_preprocesses_all(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    settings = Settings(raw_dir=tmp_path / "raw", processed_dir=tmp_path / "processed")
+    monkeypatch.setattr(fb, "SETTINGS", settings)
+    monkeypatch.setattr(br, "SETTINGS", settings)
+    monkeypatch.setenv("BRIGHTSKY_LOCATIONS", "worms:49.6:8.36,mainz:50.0:8.27,bingen:49.97:7.9")
+    monkeypatch.delenv("BRIGHTSKY_LOCATIONS_FILE", raising=False)
+    monkeypatch.setenv("BRIGHTSKY_RATE_LIMIT", "0")
+
+    def fake_get(url: str, timeout: int = 30) -> dict:
+        lat = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)["lat"][0]
+        return {"weather": [{"timestamp": "2026-02-12T00:00:00+00:00", "source_id": lat, "temperature": 1.0}]}
+
+    monkeypatch.setattr(fb, "http_get_json", fake_get)
+
+    written = fb.fetch_all("2026-02-12")
+    assert [f.name for f in written] == [
+        "raw_2026-02-12__brightsky-bingen.json",
+        "raw_2026-02-12__brightsky-mainz.json",
+        "raw_2026-02-12__brightsky-worms.json",
+    ]
+
+    br.main("2026-02-12")
+
+    processed = processed_files_for_run(settings.processed_dir, "2026-02-12")
+    assert [p.name for p in processed] == [
+        "processed_2026-02-12__brightsky-bingen.ndjson",
+        "processed_2026-02-12__brightsky-mainz.ndjson",
+        "processed_2026-02-12__brightsky-worms.ndjson",
+    ]
+    docs = [json.loads(p.read_text(encoding="utf-8")) for p in processed]
+    assert {d["provider"] for d in docs} == {"brightsky"}
+    assert sorted(d["source_id"] for d in docs) == ["49.6", "49.97", "50.0"]
+
+
+def test_fan_out_reports_failed_locations(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(fb, "SETTINGS", Settings(raw_dir=tmp_path / "raw", processed_dir=tmp_path / "processed"))
+    monkeypatch.setenv("BRIGHTSKY_LOCATIONS", "worms:49.6:8.36,mainz:50.0:8.27")
+    monkeypatch.delenv("BRIGHTSKY_LOCATIONS_FILE", raising=False)
+    monkeypatch.setenv("BRIGHTSKY_RATE_LIMIT", "0")
+
+    def flaky(url: str, timeout: int = 30) -> dict:
+        if "lat=50.0" in url:
+            raise RuntimeError("timeout")
+        return {"weather": []}
+
+    monkeypatch.setattr(fb, "http_get_json", flaky)
+
+    with pytest.raises(RuntimeError, match="brightsky-mainz"):
+        fb.main("2026-02-12")
+    assert [p.name for p in (tmp_path / "raw").iterdir()] == ["raw_2026-02-12__brightsky-worms.json"]
+
+
+def _limited_starts(state_path: Path, n: int) -> list:
+    limiter = fb.RateLimiter(20, state_path)
+    starts = []
+    for _ in range(n):
+        limiter.wait()
+        starts.append(time.time())
+    return starts
+
+
+def test_host_rate_limit_is_shared_across_processes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(fb, "SETTINGS", Settings(raw_dir=tmp_path / "raw", processed_dir=tmp_path / "processed"))
+    monkeypatch.setenv("BRIGHTSKY_RATE_LIMIT", "20")
+    limiter = fb.host_limiter("https://api.brightsky.dev/weather?lat=1")
+    assert limiter.state_path == tmp_path / "ratelimit" / "api.brightsky.dev.next"
+
+    # two mapped fetch tasks = two processes on the same state file
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        runs = [pool.submit(_limited_starts, limiter.state_path, 3) for _ in range(2)]
+        starts = sorted(t for run in runs for t in run.result())
+
+    # six starts need five intervals, no matter which process got which slot
+    assert starts[-1] - starts[0] >= 5 * limiter.interval * 0.9
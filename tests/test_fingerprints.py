@@ -0,0 +1,113 @@
+# See documentation:
+# docs/13_tests.md
+
+import json
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import scripts.load_to_es as lte
+from scripts import codec, fingerprints
+from scripts.config import Settings
+from scripts.fingerprints import FingerprintFilter, fingerprint, line_fingerprint
+
+
+def doc(doc_id: str, temperature: float, processed_at: str = "2026-02-12T00:00:00Z") -> dict:
+    return {"doc_id": doc_id, "processed_at": processed_at, "temperature": temperature, "provider": "brightsky"}
+
+
+def test_fingerprint_ignores_processed_at_and_key_order() -> None:
+    a = doc("x", 1.0, processed_at="2026-02-12T00:00:00Z")
+    b = {"temperature": 1.0, "provider": "brightsky", "doc_id": "x", "processed_at": "2026-02-13T00:00:00Z"}
+
+    assert fingerprint(a) == fingerprint(b)
+    assert fingerprint(a) != fingerprint(doc("x", 2.0))
+
+
+def test_filter_drops_duplicates_within_chunk_last_wins(tmp_path: Path) -> None:
+    f = FingerprintFilter(tmp_path / "fp.sqlite", "all-data")
+
+    out = f.filter([doc("a", 1.0), doc("b", 1.0), doc("a", 2.0)])
+
+    assert [(d["doc_id"], d["temperature"]) for d in out] == [("b", 1.0), ("a", 2.0)]
+    assert f.skipped_duplicates == 1
+    f.close()
+
+
+def test_filter_skips_unchanged_after_commit(tmp_path: Path) -> None:
+    path = tmp_path / "fp.sqlite"
+    first = FingerprintFilter(path, "all-data")
+    assert len(first.filter([doc("a", 1.0), doc("b", 1.0)])) == 2
+    first.commit()
+    first.close()
+
+    second = FingerprintFilter(path, "all-data")
+    line = json.dumps(doc("b", 5.0, processed_at="2026-03-01T00:00:00Z")).encode("utf-8")
+    out = second.filter([doc("a", 1.0, processed_at="2026-03-01T00:00:00Z"), ("b", line)])
+
+    assert out == [("b", line)]
+    assert second.skipped_unchanged == 1
+    second.close()
+
+    # other target: nothing known yet
+    other = FingerprintFilter(path, "data-archive")
+    assert len(other.filter([doc("a", 1.0)])) == 1
+    other.close()
+
+
+def test_uncommitted_fingerprints_are_not_persisted(tmp_path: Path) -> None:
+    path = tmp_path / "fp.sqlite"
+    first = FingerprintFilter(path, "all-data")
+    first.filter([doc("a", 1.0)])
+    first.close()
+
+    second = FingerprintFilter(path, "all-data")
+    assert len(second.filter([doc("a", 1.0)])) == 1
+    second.close()
+
+
+def test_raw_lines_are_fingerprinted_without_decoding(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    def _loads(data):
+        raise AssertionError("raw line was decoded")
+
+    monkeypatch.setattr(codec, "loads", _loads)
+    line = b'{"doc_id":"a","processed_at":"2026-02-12T00:00:00+00:00","temperature":1.0}'
+    rerun = b'{"doc_id":"a","processed_at":"2026-02-13T08:00:00+00:00","temperature":1.0}'
+    changed = b'{"doc_id":"a","processed_at":"2026-02-13T08:00:00+00:00","temperature":2.0}'
+
+    assert line_fingerprint(line) == line_fingerprint(rerun) != line_fingerprint(changed)
+
+    f = FingerprintFilter(tmp_path / "fp.sqlite", "all-data")
+    assert f.filter([("a", line)]) == [("a", line)]
+    f.commit()
+    assert f.filter([("a", rerun)]) == []
+    assert f.filter([("a", changed)]) == [("a", changed)]
+    f.close()
+
+
+def test_failed_load_closes_filter_without_commit(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    processed = tmp_path / "processed" / "processed_2026-02-12__brightsky.ndjson"
+    processed.parent.mkdir()
+    processed.write_text(json.dumps(doc("a", 1.0)) + "\n", encoding="utf-8")
+    monkeypatch.setattr(
+        lte, "SETTINGS", Settings(raw_dir=tmp_path / "raw", processed_dir=processed.parent, fingerprint_cache=True)
+    )
+    monkeypatch.setattr(lte, "http_request", lambda method, url, body=None, content_type="application/json": (500, "boom"))
+    opened: list = []
+
+    def _filter(path: Path, target: str) -> FingerprintFilter:
+        opened.append(FingerprintFilter(path, target))
+        return opened[-1]
+
+    monkeypatch.setattr(lte, "FingerprintFilter", _filter)
+
+    with pytest.raises(RuntimeError):
+        lte.load_files([processed])
+
+    (f,) = opened
+    with pytest.raises(sqlite3.ProgrammingError):
+        f.conn.execute("SELECT 1")
+    second = FingerprintFilter(fingerprints.fingerprint_path(processed.parent), "all-data")
+    assert len(second.filter([doc("a", 1.0)])) == 1
+    second.close()
@@ -0,0 +1,103 @@
+# See documentation:
+# docs/13_tests.md
+
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from scripts import http_cache
+from scripts.http_cache import cached_get, prune
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests: list = []
+    body = b'{"ts": 1700000000, "temperature": {"out": 3.8}}'
+
+    def do_GET(self) -> None:
+        Handler.requests.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture()
+def url() -> Iterator[str]:
+    Handler.requests = []
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}/api/v3/data"
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_revalidates_with_etag_and_reuses_body_on_304(url: str, tmp_path: Path) -> None:
+    body1, ct, source1 = cached_get(url, tmp_path / "cache")
+    body2, _, source2 = cached_get(url, tmp_path / "cache")
+
+    assert source1 == "network"
+    assert source2 == "304"
+    assert body1 == body2 == Handler.body
+    assert "json" in ct
+    assert Handler.requests == [None, '"v1"']
+
+
+def test_ttl_serves_from_cache_without_request(url: str, tmp_path: Path) -> None:
+    cached_get(url, tmp_path / "cache", ttl_s=60)
+    body, _, source = cached_get(url, tmp_path / "cache", ttl_s=60)
+
+    assert source == "ttl"
+    assert body == Handler.body
+    assert len(Handler.requests) == 1
+
+
+def test_disabled_cache_always_fetches(url: str) -> None:
+    cached_get(url, None)
+    _, _, source = cached_get(url, None)
+
+    assert source == "network"
+    assert Handler.requests == [None, None]
+
+
+def test_prune_removes_expired_entries_only(url: str, tmp_path: Path) -> None:
+    cache = tmp_path / "cache"
+    cached_get(url, cache)
+    cached_get(url.replace("/data", "/other"), cache)
+    old_meta = sorted(cache.glob("*.meta.json"))[0]
+    key = old_meta.name[: -len(".meta.json")]
+    os.utime(old_meta, (time.time() - 3600, time.time() - 3600))
+
+    assert prune(cache, max_age_s=600) == 1
+    assert not old_meta.exists()
+    assert not (cache / f"{key}.body").exists()
+    assert len(list(cache.glob("*.meta.json"))) == 1
+    assert len(list(cache.glob("*.body"))) == 1
+
+
+def test_cached_get_prunes_expired_entries(url: str, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = tmp_path / "cache"
+    cached_get(url.replace("/data", "/2026-01-01"), cache)
+    for path in cache.iterdir():
+        os.utime(path, (time.time() - 3600, time.time() - 3600))
+    monkeypatch.setattr(http_cache, "_LAST_PRUNE", {})
+
+    cached_get(url, cache, max_age_s=600)
+
+    # only the fresh entry remains
+    assert len(list(cache.glob("*.meta.json"))) == 1
+    assert len(list(cache.glob("*.body"))) == 1
@@ -0,0 +1,157 @@
+# See documentation:
+# docs/13_tests.md
+
+import json
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+import scripts.load_to_es as lte
+from scripts import index_routing
+from scripts.config import Settings
+
+
+def test_monthly_index_from_timestamp() -> None:
+    assert index_routing.monthly_index("2026-03-01T00:00:00+00:00") == "data-2026.03"
+    assert index_routing.monthly_index("2026-12-31T23:00:00+00:00", "weather") == "weather-2026.12"
+    with pytest.raises(ValueError):
+        index_routing.monthly_index("")
+
+
+def test_indices_for_range_cross_year_boundary() -> None:
+    assert index_routing.indices_for_range(date(2025, 11, 20), date(2026, 2, 1)) == [
+        "data-2025.11",
+        "data-2025.12",
+        "data-2026.01",
+        "data-2026.02",
+    ]
+
+
+def test_timestamp_of_line_fast_path_and_fallback() -> None:
+    assert index_routing.timestamp_of_line(b'{"doc_id":"a","timestamp":"2026-02-12T00:00:00+00:00"}') == "2026-02-12T00:00:00+00:00"
+    assert index_routing.timestamp_of_line(b'{"timestamp": "2026-02-12T01:00:00+00:00"}') == "2026-02-12T01:00:00+00:00"
+    assert index_routing.timestamp_of_line(b'{"doc_id": "a"}') is None
+
+
+def test_bulk_bodies_route_documents_by_month() -> None:
+    route = index_routing.router("monthly", "data")
+    docs = [
+        {"doc_id": "a", "timestamp": "2026-02-28T23:00:00+00:00"},
+        {"doc_id": "b", "timestamp": "2026-03-01T00:00:00+00:00"},
+    ]
+
+    body = lte.build_bulk_body("all-data", docs, route)
+    raw = lte.build_bulk_body_raw("all-data", [(d["doc_id"], json.dumps(d).encode()) for d in docs], route)
+
+    for text in (body, raw.decode()):
+        actions = [json.loads(ln) for ln in text.splitlines()[0::2]]
+        assert [a["index"]["_index"] for a in actions] == ["data-2026.02", "data-2026.03"]
+    assert index_routing.router("none", "data") is None
+
+
+def test_send_bulk_ensures_monthly_indices_on_alias(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        lte,
+        "SETTINGS",
+        Settings(raw_dir=tmp_path, processed_dir=tmp_path, index_partitioning="monthly", index_prefix="data"),
+    )
+    ensured: list = []
+    monkeypatch.setattr(lte, "ensure_indices", lambda es, indices, alias: ensured.append((sorted(set(indices)), alias)))
+
+    def _http_request(method, url, body=None, content_type="application/json"):
+        n = len([ln for ln in body.splitlines() if ln.strip()]) // 2
+        return 200, json.dumps({"took": 1, "errors": False, "items": [{"index": {"status": 201}}] * n})
+
+    monkeypatch.setattr(lte, "http_request", _http_request)
+    docs = [{"doc_id": str(i), "timestamp": f"2026-0{1 + i % 2}-10T00:00:00+00:00"} for i in range(4)]
+
+    result = lte.send_bulk("http://es/_bulk", "all-data", docs)
+
+    assert result.items == 4
+    assert ensured == [(["data-2026.01", "data-2026.02"], "all-data")]
+
+
+def test_raw_bulk_parses_each_timestamp_once(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(lte, "SETTINGS", Settings(raw_dir=tmp_path, processed_dir=tmp_path, index_partitioning="monthly"))
+    ensured: list = []
+    monkeypatch.setattr(lte, "ensure_indices", lambda es, indices, alias: ensured.append(sorted(indices)))
+    parsed: list = []
+
+    def _timestamp_of_line(line: bytes):
+        parsed.append(line)
+        return index_routing.timestamp_of_line(line)
+
+    monkeypatch.setattr(lte, "timestamp_of_line", _timestamp_of_line)
+
+    def _http_request(method, url, body=None, content_type="application/json"):
+        return 200, json.dumps({"took": 1, "errors": False, "items": [{"index": {"status": 201}}] * 3})
+
+    monkeypatch.setattr(lte, "http_request", _http_request)
+    docs = [
+        (str(i), json.dumps({"doc_id": str(i), "timestamp": f"2026-0{1 + i % 2}-10T00:00:00+00:00"}).encode())
+        for i in range(3)
+    ]
+
+    lte.send_bulk_once("http://es/_bulk", "all-data", docs)
+
+    assert len(parsed) == 3
+    assert ensured == [["data-2026.01", "data-2026.02"]]
+
+
+def test_switching_partitioning_does_not_skip_loaded_files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    processed = tmp_path / "processed"
+    f = processed / "processed_2026-02-12__brightsky.ndjson"
+    processed.mkdir()
+    f.write_text(json.dumps({"doc_id": "a", "timestamp": "2026-02-12T00:00:00+00:00"}) + "\n", encoding="utf-8")
+    bodies: list = []
+
+    def _http_request(method, url, body=None, content_type="application/json"):
+        bodies.append(body)
+        return 200, json.dumps({"took": 1, "errors": False, "items": [{"index": {"status": 201}}]})
+
+    monkeypatch.setattr(lte, "http_request", _http_request)
+    monkeypatch.setattr(lte, "ensure_indices", lambda es, indices, alias: list(indices))
+
+    monkeypatch.setattr(lte, "SETTINGS", Settings(processed_dir=processed, index_partitioning="none"))
+    assert lte.load_files([f], manage_refresh=False).items == 1
+    assert lte.load_files([f], manage_refresh=False) is None
+
+    monkeypatch.setattr(lte, "SETTINGS", Settings(processed_dir=processed, index_partitioning="monthly"))
+    assert lte.load_key() == "all-data@monthly:data"
+    assert lte.load_files([f], manage_refresh=False).items == 1
+    assert b'"_index":"data-2026.02"' in bodies[-1].replace(b" ", b"")
+
+
+def test_ensure_index_is_cached_per_cluster(monkeypatch: pytest.MonkeyPatch) -> None:
+    requests: list = []
+
+    class Client:
+        def request(self, method, url, body=None, content_type="application/json"):
+            requests.append(url)
+            return 200, "{}"
+
+    monkeypatch.setattr(index_routing, "_ENSURED", set())
+    monkeypatch.setattr(index_routing, "get_client", lambda url: Client())
+
+    index_routing.ensure_index("http://es-a:9200", "data-2026.02", "all-data")
+    index_routing.ensure_index("http://es-a:9200/", "data-2026.02", "all-data")
+    index_routing.ensure_index("http://es-b:9200", "data-2026.02", "all-data")
+
+    assert requests == [
+        "http://es-a:9200/data-2026.02",
+        "http://es-a:9200/_aliases",
+        "http://es-b:9200/data-2026.02",
+        "http://es-b:9200/_aliases",
+    ]
+
+
+def test_chunked_by_bytes_counts_routed_index_name() -> None:
+    route = index_routing.router("monthly", "weather-measurements")
+    line = json.dumps({"doc_id": "a", "timestamp": "2026-02-12T00:00:00+00:00"}).encode()
+    docs = [(f"id-{i}", line) for i in range(100)]
+    sizer = lte.AdaptiveBatchSizer(4096, 1024, 1 << 20, 1.0)
+
+    for part in lte.chunked_by_bytes(iter(docs), "x", sizer, route=route):
+        # the real body (with the routed, longer index name) respects the byte budget
+        assert len(lte.build_bulk_body_raw("x", part, route)) <= 4096
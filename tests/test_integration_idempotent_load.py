@@ -80,8 +80,8 @@ def test_bulk_load_is_idempotent(tmp_path: Path, monkeypatch: pytest.MonkeyPatch
     lte.main(run_id)
     after_first = es_get("/all-data/_count")["count"]
 
-    # load same run again
-    lte.main(run_id)
+    # load same run again (force: bypass the load manifest, really re-send)
+    lte.main(run_id, force=True)
     after_second = es_get("/all-data/_count")["count"]
 
     assert after_first >= before
@@ -0,0 +1,52 @@
+# See documentation:
+# docs/13_tests.md
+
+import pytest
+
+from scripts.load_to_es import AdaptiveBatchSizer, build_bulk_body, chunked_by_bytes
+
+
+def make_docs(n: int, pad: int = 200) -> list[dict]:
+    return [{"doc_id": f"id-{i}", "condition": "x" * pad} for i in range(n)]
+
+
+def test_chunked_by_bytes_respects_target_bytes() -> None:
+    sizer = AdaptiveBatchSizer(target_bytes=2000, min_bytes=1000, max_bytes=100_000, target_latency_s=1.0)
+
+    chunks = list(chunked_by_bytes(make_docs(50), "all-data", sizer))
+
+    assert sum(len(c) for c in chunks) == 50
+    for c in chunks:
+        assert len(build_bulk_body("all-data", c).encode("utf-8")) <= 2000
+
+
+def test_chunked_by_bytes_rejects_oversized_document() -> None:
+    sizer = AdaptiveBatchSizer(target_bytes=1000, min_bytes=500, max_bytes=1000, target_latency_s=1.0)
+
+    with pytest.raises(ValueError):
+        list(chunked_by_bytes(make_docs(1, pad=5000), "all-data", sizer))
+
+
+def test_sizer_shrinks_on_rejection_and_grows_with_headroom() -> None:
+    sizer = AdaptiveBatchSizer(target_bytes=1_000_000, min_bytes=100_000, max_bytes=4_000_000, target_latency_s=1.0)
+
+    sizer.observe(latency_s=0.2, took_ms=50, rejected=True)
+    assert sizer.target_bytes == 500_000
+
+    sizer.observe(latency_s=3.0, took_ms=2500, rejected=False)
+    assert sizer.target_bytes == 375_000
+
+    sizer.observe(latency_s=0.1, took_ms=20, rejected=False)
+    assert sizer.target_bytes > 375_000
+
+
+def test_sizer_stays_within_bounds() -> None:
+    sizer = AdaptiveBatchSizer(target_bytes=200_000, min_bytes=100_000, max_bytes=300_000, target_latency_s=1.0)
+
+    for _ in range(10):
+        sizer.observe(latency_s=0.0, took_ms=0, rejected=True)
+    assert sizer.target_bytes == 100_000
+
+    for _ in range(10):
+        sizer.observe(latency_s=0.0, took_ms=0, rejected=False)
+    assert sizer.target_bytes == 300_000
@@ -0,0 +1,38 @@
+# See documentation:
+# docs/13_tests.md
+
+import json
+
+from scripts.load_to_es import parse_bulk_result
+
+
+def test_parse_bulk_result_counts_statuses_and_failures() -> None:
+    # Shape of a response reduced by filter_path=took,errors,items.*.status,items.*.error
+    resp = {
+        "took": 12,
+        "errors": True,
+        "items": [
+            {"index": {"status": 201}},
+            {"index": {"status": 200}},
+            {"index": {"status": 400, "error": {"type": "mapper_parsing_exception"}}},
+            {"index": {"status": 201}},
+            {"index": {"status": 429, "error": {"type": "es_rejected_execution_exception"}}},
+        ],
+    }
+
+    result = parse_bulk_result(json.dumps(resp))
+
+    assert result is not None
+    assert result.took == 12
+    assert result.errors is True
+    assert result.items == 5
+    assert result.created == 2
+    assert result.updated == 1
+    assert result.status_counts[400] == 1
+    assert [(pos, status) for pos, status, _ in result.failures] == [(2, 400), (4, 429)]
+    assert result.failures[0][2]["type"] == "mapper_parsing_exception"
+
+
+def test_parse_bulk_result_empty_response_is_none() -> None:
+    assert parse_bulk_result("") is None
+    assert parse_bulk_result("{}") is None
@@ -0,0 +1,127 @@
+# See documentation:
+# docs/13_tests.md
+
+import json
+
+import pytest
+
+import scripts.load_to_es as lte
+from scripts.es_client import EsConnectionError
+
+
+def ids_in_body(body: str) -> list[str]:
+    lines = [ln for ln in body.splitlines() if ln.strip()]
+    return [json.loads(a)["index"]["_id"] for a in lines[0::2]]
+
+
+def ok(doc_id: str) -> dict:
+    return {"index": {"_id": doc_id, "status": 201}}
+
+
+def rejected(doc_id: str) -> dict:
+    return {
+        "index": {
+            "_id": doc_id,
+            "status": 429,
+            "error": {"type": "es_rejected_execution_exception", "reason": "queue full"},
+        }
+    }
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(lte.time, "sleep", lambda s: None)
+
+
+def test_only_rejected_items_are_resubmitted(monkeypatch: pytest.MonkeyPatch) -> None:
+    sent: list[list[str]] = []
+
+    def _http_request(method, url, body=None, content_type="application/json"):
+        ids = ids_in_body(body)
+        sent.append(ids)
+        if len(sent) == 1:
+            items = [rejected(i) if i == "id-1" else ok(i) for i in ids]
+        else:
+            items = [ok(i) for i in ids]
+        return 200, json.dumps({"took": 1, "errors": len(sent) == 1, "items": items})
+
+    monkeypatch.setattr(lte, "http_request", _http_request)
+    docs = [{"doc_id": f"id-{i}"} for i in range(3)]
+
+    total = lte.send_bulk("http://es/_bulk", "all-data", docs)
+
+    assert total.items == 3
+    assert total.status_counts == {201: 3}
+    assert sent == [["id-0", "id-1", "id-2"], ["id-1"]]
+
+
+def test_whole_request_429_is_retried(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls = {"n": 0}
+
+    def _http_request(method, url, body=None, content_type="application/json"):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            return 429, '{"error": "too many requests"}'
+        return 200, json.dumps({"took": 1, "errors": False, "items": [ok(i) for i in ids_in_body(body)]})
+
+    monkeypatch.setattr(lte, "http_request", _http_request)
+
+    assert lte.send_bulk("http://es/_bulk", "all-data", [{"doc_id": "a"}, {"doc_id": "b"}]).items == 2
+    assert calls["n"] == 2
+
+
+def test_connection_error_is_retried_with_backoff(monkeypatch: pytest.MonkeyPatch) -> None:
+    sent: list[list[str]] = []
+    delays: list[float] = []
+
+    def _http_request(method, url, body=None, content_type="application/json"):
+        sent.append(ids_in_body(body))
+        if len(sent) <= 2:
+            raise EsConnectionError("POST http://es:9200/_bulk failed: [Errno 111] Connection refused")
+        return 200, json.dumps({"took": 1, "errors": False, "items": [ok(i) for i in ids_in_body(body)]})
+
+    monkeypatch.setattr(lte, "http_request", _http_request)
+    monkeypatch.setattr(lte.time, "sleep", delays.append)
+
+    total = lte.send_bulk("http://es/_bulk", "all-data", [{"doc_id": "a"}, {"doc_id": "b"}])
+
+    assert total.items == 2
+    assert total.status_counts == {201: 2}
+    assert sent == [["a", "b"]] * 3
+    assert len(delays) == 2
+
+
+def test_permanent_item_error_fails_without_retry(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls = {"n": 0}
+
+    def _http_request(method, url, body=None, content_type="application/json"):
+        calls["n"] += 1
+        items = [
+            rejected("a"),
+            {"index": {"_id": "b", "status": 400, "error": {"type": "mapper_parsing_exception"}}},
+        ]
+        return 200, json.dumps({"took": 1, "errors": True, "items": items})
+
+    monkeypatch.setattr(lte, "http_request", _http_request)
+
+    with pytest.raises(RuntimeError, match="mapper_parsing_exception"):
+        lte.send_bulk("http://es/_bulk", "all-data", [{"doc_id": "a"}, {"doc_id": "b"}])
+    assert calls["n"] == 1
+
+
+def test_gives_up_after_max_retries(monkeypatch: pytest.MonkeyPatch) -> None:
+    def _http_request(method, url, body=None, content_type="application/json"):
+        items = [rejected(i) for i in ids_in_body(body)]
+        return 200, json.dumps({"took": 1, "errors": True, "items": items})
+
+    monkeypatch.setattr(lte, "http_request", _http_request)
+
+    with pytest.raises(RuntimeError, match="still rejected"):
+        lte.send_bulk("http://es/_bulk", "all-data", [{"doc_id": "a"}])
+
+
+def test_retry_delay_grows_and_is_capped() -> None:
+    for attempt in range(1, 12):
+        step = min(lte.MAX_RETRY_DELAY_S, 0.5 * 2 ** (attempt - 1))
+        delay = lte.retry_delay(attempt, 0.5)
+        assert step / 2 <= delay <= step
@@ -0,0 +1,122 @@
+# See documentation:
+# docs/13_tests.md
+
+import json
+from pathlib import Path
+
+import pytest
+
+import scripts.load_to_es as lte
+import scripts.preprocess_brightsky as br
+from scripts.config import Settings
+from scripts.load_manifest import LoadManifest, content_sha256, manifest_path
+
+
+@pytest.fixture()
+def bulk_calls(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> list:
+    calls: list = []
+
+    def _http_request(method, url, body=None, content_type="application/json"):
+        if "/_bulk" not in url:
+            return 200, "{}"
+        lines = [ln for ln in body.splitlines() if ln.strip()]
+        calls.append(len(lines) // 2)
+        items = [{"index": {"status": 201}} for _ in lines[0::2]]
+        return 200, json.dumps({"took": 1, "errors": False, "items": items})
+
+    monkeypatch.setattr(lte, "http_request", _http_request)
+    monkeypatch.setattr(lte, "SETTINGS", Settings(raw_dir=tmp_path / "raw", processed_dir=tmp_path / "processed"))
+    return calls
+
+
+def write_processed(path: Path, n: int) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(json.dumps({"doc_id": f"id-{i}", "temperature": i}) + "\n" for i in range(n)), encoding="utf-8")
+
+
+def test_unchanged_files_are_skipped_on_rerun(tmp_path: Path, bulk_calls: list) -> None:
+    f1 = tmp_path / "processed" / "processed_2026-02-12__brightsky.ndjson"
+    f2 = tmp_path / "processed" / "processed_2026-02-12__hs-worms.ndjson"
+    write_processed(f1, 3)
+    write_processed(f2, 1)
+
+    lte.main("2026-02-12")
+    assert sum(bulk_calls) == 4
+
+    manifest = LoadManifest(manifest_path(tmp_path / "processed"))
+    assert manifest.files[f1.name]["docs"] == 3
+    assert manifest.files[f1.name]["target"] == "all-data"
+
+    bulk_calls.clear()
+    lte.main("2026-02-12")
+    assert bulk_calls == []
+
+
+def test_changed_file_is_reloaded_and_force_reloads_all(tmp_path: Path, bulk_calls: list) -> None:
+    f1 = tmp_path / "processed" / "processed_2026-02-12__brightsky.ndjson"
+    f2 = tmp_path / "processed" / "processed_2026-02-12__hs-worms.ndjson"
+    write_processed(f1, 3)
+    write_processed(f2, 1)
+    lte.main("2026-02-12")
+
+    bulk_calls.clear()
+    write_processed(f1, 5)
+    lte.main("2026-02-12")
+    assert sum(bulk_calls) == 5
+
+    bulk_calls.clear()
+    lte.main("2026-02-12", force=True)
+    assert sum(bulk_calls) == 6
+
+
+def test_per_file_loads_merge_into_one_manifest(tmp_path: Path, bulk_calls: list) -> None:
+    f1 = tmp_path / "processed" / "processed_2026-02-12__brightsky-worms.ndjson"
+    f2 = tmp_path / "processed" / "processed_2026-02-12__brightsky-mainz.ndjson"
+    write_processed(f1, 2)
+    write_processed(f2, 3)
+
+    # two mapped load tasks opened the manifest before either saved
+    m1 = LoadManifest(manifest_path(tmp_path / "processed"))
+    m2 = LoadManifest(manifest_path(tmp_path / "processed"))
+    m1.record(f1, "a", 2, "all-data")
+    m2.record(f2, "b", 3, "all-data")
+    m1.save()
+    m2.save()
+
+    files = LoadManifest(manifest_path(tmp_path / "processed")).files
+    assert set(files) == {f1.name, f2.name}
+
+    assert lte.load_file(str(f1)) == 2
+    assert lte.load_file(str(f1)) == 0
+
+
+def test_re_preprocessed_file_is_not_reloaded(tmp_path: Path, bulk_calls: list, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(br, "SETTINGS", lte.SETTINGS)
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    weather = [{"timestamp": f"2026-02-12T{h:02d}:00:00+00:00", "source_id": 1, "temperature": h} for h in range(3)]
+    (raw_dir / "raw_2026-02-12__brightsky.json").write_text(
+        json.dumps({"provider": "brightsky", "payload": {"weather": weather}}), encoding="utf-8"
+    )
+    processed = tmp_path / "processed" / "processed_2026-02-12__brightsky.ndjson"
+    br.main("2026-02-12")
+    first = processed.read_bytes()
+    lte.main("2026-02-12")
+    assert sum(bulk_calls) == 3
+
+    # DAG retry / reprocess: same measurements, new processed_at
+    bulk_calls.clear()
+    br.main("2026-02-12")
+    assert processed.read_bytes() != first
+    lte.main("2026-02-12")
+    assert bulk_calls == []
+
+
+def test_content_digest_ignores_only_processed_at(tmp_path: Path) -> None:
+    a, b, c = (tmp_path / f"{n}.ndjson" for n in "abc")
+    a.write_text('{"doc_id":"x","processed_at":"2026-02-12T00:00:00+00:00","temperature":1}\n', encoding="utf-8")
+    b.write_text('{"doc_id":"x","processed_at":"2026-02-13T09:30:00+00:00","temperature":1}\n', encoding="utf-8")
+    c.write_text('{"doc_id":"x","processed_at":"2026-02-12T00:00:00+00:00","temperature":2}\n', encoding="utf-8")
+
+    assert content_sha256(a) == content_sha256(b)
+    assert content_sha256(a) != content_sha256(c)
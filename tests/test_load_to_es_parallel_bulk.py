@@ -0,0 +1,100 @@
+# See documentation:
+# docs/13_tests.md
+
+import json
+import threading
+import time
+
+import pytest
+
+import scripts.load_to_es as lte
+from scripts.config import Settings
+
+
+def fake_bulk_ok(calls: list, lock: threading.Lock, state: dict):
+    def _http_request(method, url, body=None, content_type="application/json"):
+        with lock:
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        time.sleep(0.01)
+        lines = [ln for ln in body.splitlines() if ln.strip()]
+        items = [
+            {"index": {"_id": json.loads(a)["index"]["_id"], "status": 201}}
+            for a in lines[0::2]
+        ]
+        with lock:
+            calls.append(len(items))
+            state["in_flight"] -= 1
+        return 200, json.dumps({"took": 1, "errors": False, "items": items})
+
+    return _http_request
+
+
+def make_chunks(n_chunks: int, size: int):
+    return [
+        [{"doc_id": f"id-{c}-{i}", "temperature": 1.0} for i in range(size)]
+        for c in range(n_chunks)
+    ]
+
+
+def test_bulk_load_parallel_counts_all_actions(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: list = []
+    lock = threading.Lock()
+    state = {"in_flight": 0, "max_in_flight": 0}
+    monkeypatch.setattr(lte, "http_request", fake_bulk_ok(calls, lock, state))
+
+    total = lte.bulk_load_parallel("http://es/_bulk", "all-data", iter(make_chunks(10, 3)), workers=4, max_in_flight=2)
+
+    assert total.items == 30
+    assert total.created == 30
+    assert len(calls) == 10
+    assert state["max_in_flight"] <= 2
+
+
+def test_bulk_load_parallel_raises_on_item_error(monkeypatch: pytest.MonkeyPatch) -> None:
+    def _http_request(method, url, body=None, content_type="application/json"):
+        resp = {
+            "took": 1,
+            "errors": True,
+            "items": [{"index": {"_id": "x", "status": 400, "error": {"type": "mapper_parsing_exception"}}}],
+        }
+        return 200, json.dumps(resp)
+
+    monkeypatch.setattr(lte, "http_request", _http_request)
+
+    with pytest.raises(RuntimeError, match="Bulk item error"):
+        lte.bulk_load_parallel("http://es/_bulk", "all-data", iter(make_chunks(3, 1)), workers=2, max_in_flight=2)
+
+
+def test_send_bulk_detects_item_count_mismatch(monkeypatch: pytest.MonkeyPatch) -> None:
+    def _http_request(method, url, body=None, content_type="application/json"):
+        return 200, json.dumps({"took": 1, "errors": False, "items": [{"index": {"status": 201}}]})
+
+    monkeypatch.setattr(lte, "http_request", _http_request)
+
+    with pytest.raises(RuntimeError, match="Bulk mismatch"):
+        lte.send_bulk("http://es/_bulk", "all-data", make_chunks(1, 2)[0])
+
+
+def test_load_files_honours_in_flight_cap_below_worker_count(tmp_path, monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: list = []
+    lock = threading.Lock()
+    state = {"in_flight": 0, "max_in_flight": 0}
+    monkeypatch.setattr(lte, "http_request", fake_bulk_ok(calls, lock, state))
+    monkeypatch.setattr(
+        lte,
+        "SETTINGS",
+        Settings(processed_dir=tmp_path / "processed", bulk_workers=8, bulk_max_in_flight=2, fingerprint_cache=False),
+    )
+    processed = tmp_path / "processed" / "processed_2026-02-12__brightsky.ndjson"
+    processed.parent.mkdir()
+    processed.write_text(
+        "".join(json.dumps({"doc_id": f"id-{i}", "temperature": 1.0}) + "\n" for i in range(10 * lte.CHUNK_SIZE)),
+        encoding="utf-8",
+    )
+
+    total = lte.load_files([processed], manage_refresh=False)
+
+    assert total.items == 10 * lte.CHUNK_SIZE
+    assert len(calls) == 10
+    assert state["max_in_flight"] <= 2
@@ -0,0 +1,47 @@
+# See documentation:
+# docs/13_tests.md
+
+import json
+from pathlib import Path
+
+import pytest
+
+from scripts import codec
+from scripts.load_to_es import build_bulk_body, build_bulk_body_raw, extract_doc_id, read_ndjson_raw
+
+
+def test_raw_bulk_body_matches_dict_bulk_body(tmp_path: Path) -> None:
+    docs = [
+        {"doc_id": "id-1", "provider": "brightsky", "temperature": 1.5, "condition": "dry"},
+        {"doc_id": "id-2", "provider": "hs-worms", "temperature": None, "icon": "Wolke ☁"},
+    ]
+    path = tmp_path / "processed_2026-02-12__brightsky.ndjson"
+    path.write_bytes(b"".join(codec.dumps(d) + b"\n" for d in docs))
+
+    raw_docs = list(read_ndjson_raw(path))
+
+    assert [doc_id for doc_id, _ in raw_docs] == ["id-1", "id-2"]
+    assert build_bulk_body_raw("all-data", raw_docs) == build_bulk_body("all-data", docs).encode("utf-8")
+
+
+def test_extract_doc_id_reads_stdlib_formatted_lines() -> None:
+    line = json.dumps({"doc_id": "abc123", "provider": "x"}).encode("utf-8")
+
+    assert extract_doc_id(line) == "abc123"
+
+
+def test_extract_doc_id_falls_back_when_not_first_key() -> None:
+    line = json.dumps({"provider": "x", "doc_id": "late-id"}).encode("utf-8")
+
+    assert extract_doc_id(line) == "late-id"
+
+
+def test_extract_doc_id_handles_escaped_ids() -> None:
+    line = json.dumps({"doc_id": 'a"b', "provider": "x"}).encode("utf-8")
+
+    assert extract_doc_id(line) == 'a"b'
+
+
+def test_extract_doc_id_raises_on_missing_doc_id() -> None:
+    with pytest.raises(ValueError):
+        extract_doc_id(b'{"provider": "missing-id"}')
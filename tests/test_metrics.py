@@ -0,0 +1,91 @@
+# See documentation:
+# docs/13_tests.md
+
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+from benchmarks.fake_es import FakeEs
+import scripts.load_to_es as lte
+from scripts import metrics
+from scripts.config import Settings
+
+
+@pytest.fixture(autouse=True)
+def clean_registry() -> None:
+    metrics.REGISTRY.reset()
+    yield
+    metrics.REGISTRY.reset()
+
+
+def test_render_prometheus_text_format() -> None:
+    reg = metrics.MetricsRegistry()
+    reg.inc("pipeline_fetch_bytes_total", 100, "Fetched bytes", provider="brightsky")
+    reg.inc("pipeline_fetch_bytes_total", 50, provider="brightsky")
+    reg.set("pipeline_freshness_seconds", 90.5, provider='hs"worms')
+    reg.observe("pipeline_load_bulk_seconds", 0.2, buckets=(0.1, 0.5))
+    reg.observe("pipeline_load_bulk_seconds", 0.7, buckets=(0.1, 0.5))
+
+    text = reg.render({"stage": "load"})
+
+    assert "# HELP pipeline_fetch_bytes_total Fetched bytes" in text
+    assert "# TYPE pipeline_fetch_bytes_total counter" in text
+    assert 'pipeline_fetch_bytes_total{provider="brightsky",stage="load"} 150' in text
+    assert 'pipeline_freshness_seconds{provider="hs\\"worms",stage="load"} 90.5' in text
+    assert "# TYPE pipeline_load_bulk_seconds histogram" in text
+    assert 'pipeline_load_bulk_seconds_bucket{stage="load",le="0.1"} 0' in text
+    assert 'pipeline_load_bulk_seconds_bucket{stage="load",le="0.5"} 1' in text
+    assert 'pipeline_load_bulk_seconds_bucket{stage="load",le="+Inf"} 2' in text
+    assert 'pipeline_load_bulk_seconds_count{stage="load"} 2' in text
+    assert text.endswith("\n")
+
+
+def test_flush_writes_textfile_and_returns_xcom_summary(tmp_path: Path) -> None:
+    processed = tmp_path / "processed"
+    metrics.record_preprocess("brightsky-worms", 48, 0.5)
+
+    summary = metrics.flush("preprocess", "brightsky-worms", processed_dir=processed)
+
+    assert summary['pipeline_preprocess_docs_total{provider="brightsky-worms"}'] == 48
+    assert summary['pipeline_preprocess_docs_per_second{provider="brightsky-worms"}'] == 96
+    json.dumps(summary)  # XCom-serialisable
+
+    text = (tmp_path / "metrics" / "preprocess__brightsky-worms.prom").read_text(encoding="utf-8")
+    assert 'pipeline_preprocess_docs_total{provider="brightsky-worms",stage="preprocess",unit="brightsky-worms"} 48' in text
+    assert "pipeline_stage_last_success_timestamp_seconds" in text
+    assert metrics.REGISTRY.snapshot() == {}
+
+
+def test_load_records_bulk_metrics_and_freshness(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    processed = tmp_path / "processed" / "processed_2026-02-12__brightsky.ndjson"
+    processed.parent.mkdir(parents=True)
+    docs = [
+        {"doc_id": f"id-{i}", "provider": "brightsky", "source_id": "s1", "timestamp": f"2026-02-12T{i:02d}:00:00+00:00"}
+        for i in range(20)
+    ]
+    processed.write_text("".join(json.dumps(d) + "\n" for d in docs), encoding="utf-8")
+    monkeypatch.setattr(lte, "CHUNK_SIZE", 5)
+
+    with FakeEs(reject_rate=0.2, seed=3) as es:
+        es.handle("POST", "/_aliases", {}, b'{"actions": [{"add": {"index": "data-2026", "alias": "all-data", "is_write_index": true}}]}')
+        es.handle("PUT", f"/_ingest/pipeline/{lte.PIPELINE_NAME}", {}, b'{"processors": []}')
+        monkeypatch.setattr(
+            lte,
+            "SETTINGS",
+            Settings(raw_dir=tmp_path / "raw", processed_dir=processed.parent, es_url=es.url, bulk_retry_base_s=0.001, bulk_max_retries=20),
+        )
+
+        lte.load_files([processed])
+        snap = metrics.REGISTRY.snapshot()
+
+        assert snap["pipeline_load_bulk_seconds"]["count"] == es.stats.bulk_requests
+        assert snap['pipeline_load_items_total{status="201"}'] == 20
+        assert snap["pipeline_load_rejected_items_total"] == es.stats.rejected_items > 0
+        assert snap["pipeline_load_es_took_seconds"]["count"] == es.stats.bulk_requests
+        assert "pipeline_load_refresh_seconds" in snap
+
+        # newest measurement 2026-02-12T19:00 -> searchable one hour later
+        lte.record_freshness("all-data", datetime(2026, 2, 12, 20, tzinfo=timezone.utc))
+        assert metrics.REGISTRY.snapshot()['pipeline_freshness_seconds{provider="brightsky"}'] == 3600
@@ -0,0 +1,85 @@
+# See documentation:
+# docs/13_tests.md
+
+from pathlib import Path
+
+import pytest
+
+import scripts.preprocess_brightsky as br
+from scripts import codec, raw_store
+from scripts.config import Settings
+
+
+def raw_with(weather: list) -> dict:
+    return {"provider": "brightsky", "payload": {"weather": weather}}
+
+
+def test_columnar_docs_match_row_wise_mapping() -> None:
+    weather = [
+        {"timestamp": f"2026-02-12T{h:02d}:00:00+00:00", "source_id": 7307, "temperature": 8.3 - h, "wind_direction": 180}
+        for h in range(24)
+    ]
+
+    docs = list(br.iter_processed_docs(raw_with(weather)))
+
+    assert len(docs) == 24
+    for w, doc in zip(weather, docs):
+        assert list(doc) == list(br.DOC_KEYS)
+        assert doc["doc_id"] == br.make_doc_id("brightsky", "7307", w["timestamp"])
+        assert doc["source_id"] == "7307"
+        assert doc["temperature"] == w["temperature"]
+        assert doc["wind_direction"] == 180
+        # missing fields become null
+        assert doc["solar"] is None
+
+
+def test_processed_at_is_shared_per_run() -> None:
+    weather = [{"timestamp": f"2026-02-12T{h:02d}:00:00+00:00", "source_id": 1} for h in range(3)]
+
+    docs = list(br.iter_processed_docs(raw_with(weather)))
+    fixed = list(br.iter_processed_docs(raw_with(weather), processed_at="2026-02-13T00:00:00+00:00"))
+
+    assert len({d["processed_at"] for d in docs}) == 1
+    assert {d["processed_at"] for d in fixed} == {"2026-02-13T00:00:00+00:00"}
+
+
+def test_missing_timestamp_and_source_are_normalized() -> None:
+    docs = list(br.iter_processed_docs(raw_with([{"timestamp": " 2026-02-12T00:00:00+00:00 "}, {}])))
+
+    assert [d["timestamp"] for d in docs] == ["2026-02-12T00:00:00+00:00", ""]
+    assert [d["source_id"] for d in docs] == ["unknown", "unknown"]
+    assert list(br.iter_processed_docs(raw_with([]))) == []
+
+
+def test_ndjson_lines_match_encoded_documents() -> None:
+    weather = [
+        {
+            "timestamp": f"2026-02-12T{h % 24:02d}:00:00+00:00",
+            "source_id": 7307 + h % 3,
+            "temperature": None if h == 5 else 8.25 - h,
+            "relative_humidity": 89,
+            "condition": "dry" if h % 2 else 'rain, "heavy"',
+            "icon": "partly-cloudy-day",
+            "sunshine": True if h == 1 else 0.0,
+        }
+        for h in range(30)
+    ]
+    raw = raw_with(weather)
+    at = "2026-02-13T00:00:00+00:00"
+
+    lines = list(br.iter_ndjson_lines(br.processed_columns(raw, at), block_rows=7))
+
+    assert lines == [codec.dumps(doc) + b"\n" for doc in br.iter_processed_docs(raw, at)]
+    assert list(br.iter_ndjson_lines(br.processed_columns(raw_with([])))) == []
+
+
+def test_process_raw_streams_lines_to_processed_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(br, "SETTINGS", Settings(raw_dir=tmp_path / "raw", processed_dir=tmp_path))
+    weather = [{"timestamp": f"2026-02-12T{h:02d}:00:00+00:00", "source_id": 1, "temperature": h} for h in range(3)]
+    monkeypatch.setattr(raw_store, "read_raw", lambda raw_dir, run_id, provider: raw_with(weather))
+
+    out = br.process_raw("2026-02-12", "brightsky")
+
+    docs = [codec.loads(line) for line in out.read_bytes().splitlines()]
+    assert [d["temperature"] for d in docs] == [0, 1, 2]
+    assert list(docs[0]) == list(br.DOC_KEYS)
@@ -0,0 +1,54 @@
+# See documentation:
+# docs/13_tests.md
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import scripts.fetch_brightsky as fb
+import scripts.preprocess_brightsky as br
+from scripts import providers
+from scripts.config import Settings
+
+
+def test_plan_has_one_unit_per_provider_partition(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("BRIGHTSKY_LOCATIONS", "worms:49.6:8.36,mainz:50.0:8.27")
+    monkeypatch.delenv("BRIGHTSKY_LOCATIONS_FILE", raising=False)
+
+    assert providers.plan() == [
+        {"provider": "brightsky", "partition": "worms"},
+        {"provider": "brightsky", "partition": "mainz"},
+        {"provider": "hs-worms", "partition": ""},
+    ]
+
+
+def test_fetch_and_preprocess_one_partition(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    settings = Settings(raw_dir=tmp_path / "raw", processed_dir=tmp_path / "processed")
+    monkeypatch.setattr(fb, "SETTINGS", settings)
+    monkeypatch.setattr(br, "SETTINGS", settings)
+    monkeypatch.setenv("BRIGHTSKY_LOCATIONS", "worms:49.6:8.36,mainz:50.0:8.27")
+    monkeypatch.delenv("BRIGHTSKY_LOCATIONS_FILE", raising=False)
+    monkeypatch.setenv("BRIGHTSKY_RATE_LIMIT", "0")
+    calls: list = []
+
+    def fake_get(url: str, timeout: int = 30) -> dict:
+        calls.append(url)
+        return {"weather": [{"timestamp": "2026-02-12T00:00:00+00:00", "source_id": 1}]}
+
+    monkeypatch.setattr(fb, "http_get_json", fake_get)
+
+    fetched = providers.fetch("2026-02-12", {"provider": "brightsky", "partition": "mainz"})
+    processed = providers.preprocess("2026-02-12", fetched)
+
+    assert fetched == {"provider": "brightsky", "raw_provider": "brightsky-mainz"}
+    assert len(calls) == 1 and "lat=50.0" in calls[0]
+    assert processed == str(settings.processed_dir / "processed_2026-02-12__brightsky-mainz.ndjson")
+    assert Path(processed).exists()
+
+
+def test_registry_import_is_light() -> None:
+    code = "import sys; import scripts.providers; print(sorted(m for m in sys.modules if m.startswith('scripts')))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "['scripts', 'scripts.providers']"
@@ -0,0 +1,84 @@
+# See documentation:
+# docs/13_tests.md
+
+from pathlib import Path
+
+import pytest
+
+import scripts.raw_store as rs
+from scripts.config import Settings
+
+
+def raw_doc(run_id: str) -> dict:
+    return {"fetched_at": run_id, "provider": "brightsky", "payload": {"weather": [{"temperature": 1.5}]}}
+
+
+@pytest.mark.parametrize("compression,suffix", [("none", ".json"), ("gzip", ".json.gz"), ("xz", ".json.xz")])
+def test_write_and_read_single_file(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, compression: str, suffix: str) -> None:
+    monkeypatch.setattr(rs, "SETTINGS", Settings(raw_dir=tmp_path, processed_dir=tmp_path, raw_compression=compression))
+
+    out = rs.write_raw(tmp_path, "2026-02-01", "brightsky", raw_doc("2026-02-01"))
+
+    assert out.name == f"raw_2026-02-01__brightsky{suffix}"
+    assert rs.read_raw(tmp_path, "2026-02-01", "brightsky") == raw_doc("2026-02-01")
+
+
+def test_compact_month_packs_files_and_reads_members_by_offset(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(rs, "SETTINGS", Settings(raw_dir=tmp_path, processed_dir=tmp_path, raw_compression="gzip"))
+    for day in ("2026-01-30", "2026-01-31", "2026-02-01"):
+        rs.write_raw(tmp_path, day, "brightsky", raw_doc(day))
+    # plain legacy file of the same month
+    (tmp_path / "raw_20260115T101500Z__hs-worms.json").write_bytes(b'{"provider": "hs-worms", "payload": {"ts": 1}}')
+
+    packed = rs.compact_before(tmp_path, "2026-02", compression="xz")
+
+    assert packed == {"2026-01": 3}
+    assert sorted(p.name for p in tmp_path.glob("raw_*")) == ["raw_2026-02-01__brightsky.json.gz"]
+    assert (tmp_path / "archive_2026-01.raw.xz").exists()
+    assert rs.read_raw(tmp_path, "2026-01-31", "brightsky") == raw_doc("2026-01-31")
+    assert rs.read_raw(tmp_path, "20260115T101500Z", "hs-worms")["payload"] == {"ts": 1}
+
+    # later files of the same month are appended to the existing archive
+    rs.write_raw(tmp_path, "2026-01-29", "brightsky", raw_doc("2026-01-29"))
+    assert rs.compact_month(tmp_path, "2026-01", compression="xz") == 1
+    assert rs.read_raw(tmp_path, "2026-01-29", "brightsky") == raw_doc("2026-01-29")
+    assert rs.read_raw(tmp_path, "2026-01-30", "brightsky") == raw_doc("2026-01-30")
+
+
+def test_stream_file_is_appended_and_packed_verbatim(tmp_path: Path) -> None:
+    for ts in (1, 2, 3):
+        out = rs.append_raw(tmp_path, "2026-01-31", "hs-worms-stream", {"provider": "hs-worms", "payload": {"ts": ts}})
+
+    assert out.name == "raw_2026-01-31__hs-worms-stream.ndjson"
+    assert rs.list_raw(tmp_path) == [("2026-01-31", "hs-worms-stream")]
+
+    assert rs.compact_month(tmp_path, "2026-01") == 1
+    assert not out.exists()
+    assert [raw["payload"]["ts"] for raw in rs.read_raw_lines(tmp_path, "2026-01-31", "hs-worms-stream")] == [1, 2, 3]
+
+
+def test_late_stream_appends_are_merged_into_archived_day(tmp_path: Path) -> None:
+    def append(ts: int) -> None:
+        rs.append_raw(tmp_path, "2026-01-31", "hs-worms-stream", {"provider": "hs-worms", "payload": {"ts": ts}})
+
+    def lines() -> list:
+        return [raw["payload"]["ts"] for raw in rs.read_raw_lines(tmp_path, "2026-01-31", "hs-worms-stream")]
+
+    append(1)
+    append(2)
+    assert rs.compact_month(tmp_path, "2026-01") == 1
+    append(3)
+
+    # archived lines + live stream file before the next compaction
+    assert lines() == [1, 2, 3]
+
+    assert rs.compact_month(tmp_path, "2026-01") == 1
+    assert lines() == [1, 2, 3]
+    append(4)
+    assert rs.compact_month(tmp_path, "2026-01") == 1
+    assert lines() == [1, 2, 3, 4]
+
+
+def test_read_raw_missing_raises(tmp_path: Path) -> None:
+    with pytest.raises(FileNotFoundError):
+        rs.read_raw(tmp_path, "2026-01-01", "brightsky")
@@ -0,0 +1,157 @@
+# See documentation:
+# docs/13_tests.md
+
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+import scripts.load_to_es as lte
+from scripts.config import Settings
+from scripts.load_manifest import read_generation
+from scripts.read_service import BadRequest, ReadService, ResultCache, make_handler
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cache_ttl_and_lru_eviction() -> None:
+    clock = FakeClock()
+    cache = ResultCache(max_entries=2, ttl_s=10, clock=clock)
+    calls: list = []
+
+    def loader(key):
+        return lambda: calls.append(key) or key
+
+    cache.get_or_load("a", loader("a"))
+    cache.get_or_load("b", loader("b"))
+    cache.get_or_load("a", loader("a"))  # hit, "b" becomes least recently used
+    cache.get_or_load("c", loader("c"))  # evicts "b"
+    cache.get_or_load("b", loader("b"))
+    assert calls == ["a", "b", "c", "b"]
+
+    clock.now = 11
+    cache.get_or_load("b", loader("b"))
+    assert calls == ["a", "b", "c", "b", "b"]
+
+
+def test_cache_dropped_when_load_generation_changes() -> None:
+    generation = ["1"]
+    cache = ResultCache(max_entries=10, ttl_s=60, generation=lambda: generation[0])
+    calls: list = []
+
+    cache.get_or_load("k", lambda: calls.append(1))
+    cache.get_or_load("k", lambda: calls.append(1))
+    generation[0] = "2"
+    cache.get_or_load("k", lambda: calls.append(1))
+
+    assert len(calls) == 2
+
+
+def test_concurrent_identical_requests_are_coalesced() -> None:
+    cache = ResultCache(max_entries=10, ttl_s=60)
+    release = threading.Event()
+    calls: list = []
+
+    def slow_loader():
+        calls.append(1)
+        release.wait(5)
+        return {"value": 42}
+
+    results: list = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", slow_loader))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    while cache.stats()["coalesced"] < 7:
+        threading.Event().wait(0.01)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert calls == [1]
+    assert results == [{"value": 42}] * 8
+
+
+def test_loader_errors_are_not_cached() -> None:
+    cache = ResultCache(max_entries=10, ttl_s=60)
+
+    def failing():
+        raise RuntimeError("es down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("k", failing)
+    assert cache.get_or_load("k", lambda: "ok") == "ok"
+
+
+def test_service_routes_and_caches_queries() -> None:
+    service = ReadService(ResultCache(max_entries=10, ttl_s=60), es_url="http://es", index="all-data")
+    searches: list = []
+
+    def search(index, body):
+        searches.append(index)
+        if "aggs" in body and "station" in body["aggs"]:
+            hit = {"_source": {"source_id": "s1", "temperature": 3.5}}
+            return {"aggregations": {"station": {"buckets": [{"key": "s1", "latest": {"hits": {"hits": [hit]}}}]}}}
+        return {"hits": {"hits": [{"_source": {"source_id": "s1", "bucket_start": "2026-02-12T00:00:00+00:00"}}]}}
+
+    service.search = search
+
+    assert service.handle("/latest", {}) == [{"source_id": "s1", "temperature": 3.5}]
+    assert service.handle("/latest", {}) == [{"source_id": "s1", "temperature": 3.5}]
+    service.handle("/series", {"source_id": "s1", "interval": "daily", "start": "2026-02-01T00:00:00Z"})
+
+    assert searches == ["all-data", "weather-rollup-daily"]
+    with pytest.raises(BadRequest):
+        service.handle("/series", {})
+    with pytest.raises(BadRequest):
+        service.handle("/series", {"source_id": "s1", "start": "yesterday"})
+
+
+def test_only_bad_parameters_are_client_errors() -> None:
+    service = ReadService(ResultCache(max_entries=8, ttl_s=60), es_url="http://es.invalid:9200", index="all-data")
+
+    def search(index, body):
+        raise ValueError("Expecting value: line 1 column 1 (char 0)")  # malformed ES response
+
+    service.search = search
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(service))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def status(path: str) -> int:
+        try:
+            with urllib.request.urlopen(base + path, timeout=5) as resp:
+                return resp.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    try:
+        assert status("/series?source_id=s1&start=yesterday") == 400
+        assert status("/series") == 400
+        assert status("/latest") == 502
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_finalize_load_bumps_generation(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    processed = tmp_path / "processed"
+    monkeypatch.setattr(lte, "SETTINGS", Settings(raw_dir=tmp_path / "raw", processed_dir=processed))
+    monkeypatch.setattr(lte, "set_refresh_interval", lambda target, value: None)
+    monkeypatch.setattr(lte, "refresh", lambda target: None)
+    monkeypatch.setattr(lte, "record_freshness", lambda target, searchable_at: None)
+
+    assert read_generation(processed) == ""
+    lte.finalize_load()
+    first = read_generation(processed)
+    lte.finalize_load()
+
+    assert first and read_generation(processed) != first
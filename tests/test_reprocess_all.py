@@ -0,0 +1,83 @@
+# See documentation:
+# docs/13_tests.md
+
+import json
+from pathlib import Path
+
+import pytest
+
+import scripts.preprocess_brightsky as br
+import scripts.preprocess_hs_wetter as hs
+import scripts.reprocess_all as ra
+from scripts import raw_store
+from scripts.config import Settings
+
+
+def write_raw_files(raw_dir: Path) -> None:
+    raw_dir.mkdir(parents=True)
+    for run_id, provider in [("2026-01-31", "brightsky"), ("2026-02-01", "brightsky-mainz"), ("2026-02-02", "brightsky")]:
+        weather = [{"timestamp": f"{run_id}T{h:02d}:00:00+00:00", "source_id": 7307, "temperature": h} for h in range(3)]
+        raw = {"provider": "brightsky", "payload": {"weather": weather}}
+        (raw_dir / f"raw_{run_id}__{provider}.json").write_text(json.dumps(raw), encoding="utf-8")
+    (raw_dir / "raw_2026-02-01__hs-worms.json").write_text(
+        json.dumps({"provider": "hs-worms", "payload": {"ts": 1769904000, "temperature": {"out": 3.8}}}), encoding="utf-8"
+    )
+    # broken payload: must fail without stopping the others
+    (raw_dir / "raw_2026-02-02__hs-worms.json").write_text(json.dumps({"payload": {}}), encoding="utf-8")
+    # January goes into a monthly archive
+    raw_store.compact_month(raw_dir, "2026-01")
+
+
+def read_docs(path: Path) -> list:
+    docs = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    for d in docs:
+        d.pop("processed_at")
+    return docs
+
+
+@pytest.fixture()
+def settings(tmp_path: Path) -> Settings:
+    s = Settings(raw_dir=tmp_path / "raw", processed_dir=tmp_path / "processed")
+    write_raw_files(s.raw_dir)
+    return s
+
+
+def test_discover_finds_single_files_and_archive_members(settings: Settings) -> None:
+    assert ra.discover(settings.raw_dir) == [
+        ("2026-01-31", "brightsky"),
+        ("2026-02-01", "brightsky-mainz"),
+        ("2026-02-01", "hs-worms"),
+        ("2026-02-02", "brightsky"),
+        ("2026-02-02", "hs-worms"),
+    ]
+    assert ra.discover(settings.raw_dir, providers=["hs-worms"], since="2026-02-02") == [("2026-02-02", "hs-worms")]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_reprocess_isolates_failures_and_matches_daily_outputs(
+    settings: Settings, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, workers: int
+) -> None:
+    tasks = ra.discover(settings.raw_dir)
+    module_settings = (br.SETTINGS, hs.SETTINGS)
+
+    failed = ra.reprocess(tasks, workers, settings.raw_dir, settings.processed_dir)
+
+    # directories are passed explicitly, the driver's module settings stay untouched
+    assert br.SETTINGS is module_settings[0] and hs.SETTINGS is module_settings[1]
+    assert len(failed) == 1 and failed[0].startswith("2026-02-02 hs-worms")
+    produced = sorted(p.name for p in settings.processed_dir.glob("*.ndjson"))
+    assert produced == [
+        "processed_2026-01-31__brightsky.ndjson",
+        "processed_2026-02-01__brightsky-mainz.ndjson",
+        "processed_2026-02-01__hs-worms.ndjson",
+        "processed_2026-02-02__brightsky.ndjson",
+    ]
+
+    # same output as the daily preprocess step
+    daily = tmp_path / "daily"
+    daily.mkdir()
+    monkeypatch.setattr(br, "SETTINGS", Settings(raw_dir=settings.raw_dir, processed_dir=daily))
+    for run_id in ("2026-01-31", "2026-02-01", "2026-02-02"):
+        br.main(run_id)
+    for p in daily.iterdir():
+        assert read_docs(p) == read_docs(settings.processed_dir / p.name)
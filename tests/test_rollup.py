@@ -0,0 +1,150 @@
+# See documentation:
+# docs/13_tests.md
+
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+from scripts import rollup
+from scripts.config import Settings
+
+
+def _ms(ts: str) -> int:
+    return int(datetime.fromisoformat(ts).timestamp() * 1000)
+
+
+def write_processed(path: Path, docs: list) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(json.dumps(d) + "\n" for d in docs), encoding="utf-8")
+
+
+DOCS = [
+    {"doc_id": "a", "provider": "brightsky", "source_id": "s1", "timestamp": "2026-02-12T10:00:00+00:00"},
+    {"doc_id": "b", "provider": "brightsky", "source_id": "s1", "timestamp": "2026-02-12T10:30:00+00:00"},
+    {"doc_id": "c", "provider": "hs-worms", "source_id": "hs-worms", "timestamp": "2026-02-13T01:10:00+00:00"},
+]
+
+
+def test_touched_buckets_per_interval(tmp_path: Path) -> None:
+    f = tmp_path / "processed_2026-02-12__brightsky.ndjson"
+    write_processed(f, DOCS)
+
+    touched = rollup.touched_buckets([f])
+
+    utc = timezone.utc
+    assert touched["hourly"] == {
+        ("brightsky", "s1", datetime(2026, 2, 12, 10, tzinfo=utc)),
+        ("hs-worms", "hs-worms", datetime(2026, 2, 13, 1, tzinfo=utc)),
+    }
+    assert touched["daily"] == {
+        ("brightsky", "s1", datetime(2026, 2, 12, tzinfo=utc)),
+        ("hs-worms", "hs-worms", datetime(2026, 2, 13, tzinfo=utc)),
+    }
+
+
+def test_build_query_limits_range_and_stations() -> None:
+    utc = timezone.utc
+    buckets = {
+        ("brightsky", "s1", datetime(2026, 2, 12, 10, tzinfo=utc)),
+        ("hs-worms", "hs-worms", datetime(2026, 2, 13, 1, tzinfo=utc)),
+    }
+
+    q = rollup.build_query(buckets, "hourly")
+
+    flt = q["query"]["bool"]["filter"]
+    assert flt[0]["range"]["timestamp"] == {"gte": "2026-02-12T00:00:00+00:00", "lt": "2026-02-14T00:00:00+00:00"}
+    assert flt[1]["terms"]["provider"] == ["brightsky", "hs-worms"]
+    hist = q["aggs"]["provider"]["aggs"]["source"]["aggs"]["bucket"]
+    assert hist["date_histogram"]["calendar_interval"] == "hour"
+    assert set(hist["aggs"]) == set(rollup.ROLLUP_FIELDS)
+
+
+def test_backfill_is_split_into_bounded_query_windows() -> None:
+    utc = timezone.utc
+    stations = [f"s{i}" for i in range(1000)]
+    # two days of hourly data for 1000 stations (48,000 buckets in one query before)
+    buckets = {
+        ("brightsky", s, datetime(2026, 2, 12, tzinfo=utc) + timedelta(hours=h)) for s in stations for h in range(48)
+    }
+
+    windows = list(rollup.query_windows(buckets, "hourly"))
+
+    assert set().union(*windows) == buckets
+    assert sum(len(w) for w in windows) == len(buckets)
+    for w in windows:
+        days = {b[2].date() for b in w}
+        assert len(days) == 1
+        assert len({b[1] for b in w}) * rollup.WINDOW_BUCKETS["hourly"] <= rollup.MAX_QUERY_BUCKETS
+
+    daily = {(p, s, day.replace(hour=0)) for p, s, day in buckets}
+    assert all(len({(b[2].year, b[2].month) for b in w}) == 1 for w in rollup.query_windows(daily, "daily"))
+
+
+def test_rollup_docs_keep_only_touched_buckets() -> None:
+    start = datetime(2026, 2, 12, 10, tzinfo=timezone.utc)
+    response = {
+        "aggregations": {
+            "provider": {
+                "buckets": [
+                    {
+                        "key": "brightsky",
+                        "source": {
+                            "buckets": [
+                                {
+                                    "key": "s1",
+                                    "bucket": {
+                                        "buckets": [
+                                            {
+                                                "key": _ms("2026-02-12T10:00:00+00:00"),
+                                                "doc_count": 2,
+                                                "temperature": {"count": 2, "min": 1.0, "max": 3.0, "avg": 2.0, "sum": 4.0},
+                                                "precipitation": {"count": 2, "min": 0.0, "max": 0.5, "avg": 0.25, "sum": 0.5},
+                                            },
+                                            # same station, not touched by this run
+                                            {"key": _ms("2026-02-12T11:00:00+00:00"), "doc_count": 1},
+                                        ]
+                                    },
+                                }
+                            ]
+                        },
+                    }
+                ]
+            }
+        }
+    }
+
+    docs = rollup.rollup_docs(response, {("brightsky", "s1", start)}, "hourly")
+
+    assert len(docs) == 1
+    doc = docs[0]
+    assert doc["bucket_start"] == "2026-02-12T10:00:00+00:00"
+    assert doc["doc_count"] == 2
+    assert (doc["temperature_min"], doc["temperature_max"], doc["temperature_avg"]) == (1.0, 3.0, 2.0)
+    assert doc["precipitation_sum"] == 0.5
+    assert doc["wind_speed_avg"] is None
+    assert doc["doc_id"] == rollup.rollup_doc_id("hourly", "brightsky", "s1", start)
+
+
+def test_main_upserts_into_rollup_indices(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    processed = tmp_path / "processed"
+    write_processed(processed / "processed_2026-02-12__brightsky.ndjson", DOCS[:2])
+    monkeypatch.setattr(rollup, "SETTINGS", Settings(raw_dir=tmp_path / "raw", processed_dir=processed))
+
+    def _http_request(method, url, body=None, content_type="application/json"):
+        q = json.loads(body)
+        interval = q["aggs"]["provider"]["aggs"]["source"]["aggs"]["bucket"]["date_histogram"]["calendar_interval"]
+        key = "2026-02-12T10:00:00+00:00" if interval == "hour" else "2026-02-12T00:00:00+00:00"
+        bucket = {"key": _ms(key), "doc_count": 2, "temperature": {"count": 2, "min": 1.0, "max": 2.0, "avg": 1.5, "sum": 3.0}}
+        agg = {"provider": {"buckets": [{"key": "brightsky", "source": {"buckets": [{"key": "s1", "bucket": {"buckets": [bucket]}}]}}]}}
+        return 200, json.dumps({"aggregations": agg})
+
+    sent: list = []
+    monkeypatch.setattr(rollup, "http_request", _http_request)
+    monkeypatch.setattr(rollup, "send_bulk", lambda url, index, docs, partitioned=True, stage="load": sent.append((index, docs, partitioned, stage)))
+
+    rollup.main("2026-02-12")
+
+    assert sorted(index for index, _, _, _ in sent) == ["weather-rollup-daily", "weather-rollup-hourly"]
+    assert all(len(docs) == 1 and partitioned is False and stage == "rollup" for _, docs, partitioned, stage in sent)
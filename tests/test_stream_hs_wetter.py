@@ -0,0 +1,112 @@
+# See documentation:
+# docs/13_tests.md
+
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+import scripts.preprocess_hs_wetter as hs
+import scripts.raw_store as rs
+import scripts.stream_hs_wetter as stream
+from scripts.config import Settings
+from scripts.load_manifest import read_generation
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def payload(ts: int, temp: float) -> dict:
+    return {"ts": ts, "temperature": {"out": temp}, "humidity": {"out": 80}, "wind": {"speed": {"kmh": 3.6}}}
+
+
+def test_micro_batcher_flushes_by_count_and_age() -> None:
+    sent: list = []
+    clock = FakeClock()
+    b = stream.MicroBatcher(sent.append, max_docs=3, max_bytes=1 << 20, max_age_s=2.0, clock=clock)
+
+    for i in range(4):
+        b.add({"doc_id": str(i)})
+    assert [len(batch) for batch in sent] == [3]
+
+    assert not b.due()
+    clock.now = 2.0
+    assert b.due()
+    b.flush()
+    assert [len(batch) for batch in sent] == [3, 1]
+    assert b.deadline() is None
+
+
+def test_failed_flush_keeps_docs_for_retry() -> None:
+    calls: list = []
+
+    def flaky(docs: list) -> None:
+        calls.append(list(docs))
+        if len(calls) == 1:
+            raise RuntimeError("HTTP 503")
+
+    b = stream.MicroBatcher(flaky, max_docs=10, max_bytes=1 << 20, max_age_s=1.0, clock=FakeClock())
+    b.add({"doc_id": "a"})
+
+    assert b.flush() is False
+    assert b.flush() is True
+    assert calls == [[{"doc_id": "a"}], [{"doc_id": "a"}]]
+    assert b.sent == 1
+
+
+def test_streamer_dedupes_on_ts_and_writes_raw_copies(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    settings = Settings(raw_dir=tmp_path / "raw", processed_dir=tmp_path / "processed")
+    monkeypatch.setattr(stream, "SETTINGS", settings)
+    readings = iter([payload(1770000000, 3.8), payload(1770000000, 3.8), payload(1770000060, 4.1)])
+    sent: list = []
+
+    batcher = stream.MicroBatcher(sent.extend, max_docs=100, max_bytes=1 << 20, max_age_s=60.0)
+    streamer = stream.HsStreamer("http://hs/api", "hs-worms", batcher, stream.RawWriter(), fetch=lambda url: next(readings))
+
+    streamer.run(interval_s=0.0, stop=threading.Event(), max_polls=3)
+
+    # same normalization as the daily preprocess step, last batch flushed on exit
+    assert [d["doc_id"] for d in sent] == [
+        hs.make_doc_id("hs-worms", "hs-worms", hs.unix_to_iso(1770000000)),
+        hs.make_doc_id("hs-worms", "hs-worms", hs.unix_to_iso(1770000060)),
+    ]
+    assert sent[1]["temperature"] == 4.1
+    assert sent[1]["wind_speed"] == pytest.approx(1.0)
+    assert streamer.duplicates == 1
+
+    # one appended raw file per day, not one file per reading
+    assert rs.list_raw(settings.raw_dir) == [("2026-02-02", "hs-worms-stream")]
+    lines = rs.read_raw_lines(settings.raw_dir, "2026-02-02", "hs-worms-stream")
+    assert [raw["payload"]["ts"] for raw in lines] == [1770000000, 1770000060]
+
+    # reprocessing the day yields the streamed documents again
+    monkeypatch.setattr(hs, "SETTINGS", settings)
+    hs.process_stream("2026-02-02")
+    processed = (settings.processed_dir / "processed_2026-02-02__hs-worms-stream.ndjson").read_text(encoding="utf-8")
+    assert [json.loads(line)["doc_id"] for line in processed.splitlines()] == [d["doc_id"] for d in sent]
+
+
+def test_successful_flush_bumps_load_generation(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    settings = Settings(raw_dir=tmp_path / "raw", processed_dir=tmp_path / "processed")
+    monkeypatch.setattr(stream, "SETTINGS", settings)
+    calls: list = []
+
+    def send_bulk(url, target, docs):
+        calls.append(len(docs))
+        if len(calls) == 1:
+            raise RuntimeError("HTTP 503")
+
+    monkeypatch.setattr(stream.load_to_es, "send_bulk", send_bulk)
+    batcher = stream.MicroBatcher(stream.send_to_es, max_docs=10, max_bytes=1 << 20, max_age_s=1.0, clock=FakeClock())
+    batcher.add({"doc_id": "a"})
+
+    assert batcher.flush() is False
+    assert read_generation(settings.processed_dir) == ""
+    assert batcher.flush() is True
+    assert read_generation(settings.processed_dir) != ""